@@ -1,11 +1,15 @@
 import os
+import queue
 import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
 
-def get_conn():
-    path = os.getenv("SQLITE_PATH", "backend/app/data/interviews.db")
-    os.makedirs(os.path.dirname(path), exist_ok=True)
-    conn = sqlite3.connect(path, check_same_thread=False)
-    conn.execute("""
+# Schema migrations, applied once at startup. Entry i upgrades PRAGMA user_version i -> i+1.
+# The first ones use IF NOT EXISTS so databases created before versioning upgrade cleanly.
+MIGRATIONS = [
+    """
     CREATE TABLE IF NOT EXISTS attempts (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
         created_at TEXT,
@@ -16,5 +20,349 @@ def get_conn():
         total_score INTEGER,
         breakdown_json TEXT
     )
-    """)
-    return conn
\ No newline at end of file
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS documents (
+        content_hash TEXT NOT NULL,
+        doc_type TEXT NOT NULL,
+        doc_id TEXT NOT NULL,
+        file_path TEXT,
+        pages INTEGER,
+        chunks INTEGER,
+        created_at TEXT,
+        PRIMARY KEY (content_hash, doc_type)
+    )
+    """,
+    # Breakdown scores as real columns, a filter index, and per role/company/day rollups kept
+    # current by a trigger so summaries and trends never scan `attempts`.
+    """
+    ALTER TABLE attempts ADD COLUMN relevance INTEGER;
+    ALTER TABLE attempts ADD COLUMN clarity INTEGER;
+    ALTER TABLE attempts ADD COLUMN technical_correctness INTEGER;
+    ALTER TABLE attempts ADD COLUMN structure INTEGER;
+    ALTER TABLE attempts ADD COLUMN impact INTEGER;
+    UPDATE attempts SET
+        relevance = json_extract(breakdown_json, '$.relevance'),
+        clarity = json_extract(breakdown_json, '$.clarity'),
+        technical_correctness = json_extract(breakdown_json, '$.technical_correctness'),
+        structure = json_extract(breakdown_json, '$.structure'),
+        impact = json_extract(breakdown_json, '$.impact')
+    WHERE breakdown_json IS NOT NULL AND json_valid(breakdown_json);
+    CREATE INDEX IF NOT EXISTS idx_attempts_role_company_created ON attempts(role, company, created_at);
+    CREATE TABLE attempt_rollups (
+        role TEXT NOT NULL,
+        company TEXT NOT NULL,
+        day TEXT NOT NULL,
+        attempts INTEGER NOT NULL,
+        total_sum INTEGER NOT NULL,
+        relevance_sum INTEGER NOT NULL,
+        clarity_sum INTEGER NOT NULL,
+        technical_correctness_sum INTEGER NOT NULL,
+        structure_sum INTEGER NOT NULL,
+        impact_sum INTEGER NOT NULL,
+        PRIMARY KEY (role, company, day)
+    );
+    INSERT INTO attempt_rollups
+    SELECT COALESCE(role, ''), COALESCE(company, ''), substr(created_at, 1, 10), COUNT(*),
+           COALESCE(SUM(total_score), 0), COALESCE(SUM(relevance), 0), COALESCE(SUM(clarity), 0),
+           COALESCE(SUM(technical_correctness), 0), COALESCE(SUM(structure), 0), COALESCE(SUM(impact), 0)
+    FROM attempts GROUP BY 1, 2, 3;
+    CREATE TRIGGER attempts_rollup AFTER INSERT ON attempts BEGIN
+        INSERT INTO attempt_rollups VALUES (
+            COALESCE(NEW.role, ''), COALESCE(NEW.company, ''), substr(NEW.created_at, 1, 10), 1,
+            COALESCE(NEW.total_score, 0), COALESCE(NEW.relevance, 0), COALESCE(NEW.clarity, 0),
+            COALESCE(NEW.technical_correctness, 0), COALESCE(NEW.structure, 0), COALESCE(NEW.impact, 0)
+        )
+        ON CONFLICT(role, company, day) DO UPDATE SET
+            attempts = attempts + 1,
+            total_sum = total_sum + excluded.total_sum,
+            relevance_sum = relevance_sum + excluded.relevance_sum,
+            clarity_sum = clarity_sum + excluded.clarity_sum,
+            technical_correctness_sum = technical_correctness_sum + excluded.technical_correctness_sum,
+            structure_sum = structure_sum + excluded.structure_sum,
+            impact_sum = impact_sum + excluded.impact_sum;
+    END
+    """,
+    # Candidate sessions: which resume/JD each session searches, and when it was last used
+    """
+    CREATE TABLE sessions (
+        session_id TEXT PRIMARY KEY,
+        created_at TEXT NOT NULL,
+        last_seen TEXT NOT NULL
+    );
+    CREATE INDEX idx_sessions_last_seen ON sessions(last_seen);
+    CREATE TABLE session_documents (
+        session_id TEXT NOT NULL,
+        doc_type TEXT NOT NULL,
+        doc_id TEXT NOT NULL,
+        PRIMARY KEY (session_id, doc_type)
+    );
+    CREATE INDEX idx_session_documents_doc ON session_documents(doc_id);
+    CREATE INDEX idx_documents_doc_id ON documents(doc_id);
+    """,
+    # Extracted PDF text per (file hash, page index), so re-ingesting the same bytes skips pypdf
+    """
+    CREATE TABLE page_texts (
+        content_hash TEXT NOT NULL,
+        page INTEGER NOT NULL,
+        text TEXT NOT NULL,
+        PRIMARY KEY (content_hash, page)
+    )
+    """,
+    # Background ingestion jobs; queued/running rows are picked up again after a restart
+    """
+    CREATE TABLE ingest_jobs (
+        job_id TEXT PRIMARY KEY,
+        session_id TEXT NOT NULL,
+        doc_type TEXT NOT NULL,
+        doc_id TEXT NOT NULL,
+        file_path TEXT NOT NULL,
+        content_hash TEXT NOT NULL,
+        status TEXT NOT NULL,
+        stage TEXT,
+        pages INTEGER NOT NULL DEFAULT 0,
+        chunks INTEGER NOT NULL DEFAULT 0,
+        stages_json TEXT NOT NULL DEFAULT '{}',
+        error TEXT,
+        created_at TEXT NOT NULL,
+        updated_at TEXT NOT NULL
+    );
+    CREATE INDEX idx_ingest_jobs_status ON ingest_jobs(status);
+    """,
+    # Structured per-document summary built at ingestion, used for question generation
+    """
+    CREATE TABLE document_digests (
+        doc_id TEXT PRIMARY KEY,
+        doc_type TEXT NOT NULL,
+        digest_json TEXT NOT NULL,
+        tokens INTEGER NOT NULL,
+        created_at TEXT NOT NULL
+    )
+    """,
+]
+
+BREAKDOWN_COLUMNS = ("relevance", "clarity", "technical_correctness", "structure", "impact")
+ATTEMPT_COLUMNS = (
+    "created_at", "role", "company", "question", "answer", "total_score", "breakdown_json", *BREAKDOWN_COLUMNS
+)
+
+
+def db_path() -> str:
+    return os.getenv("SQLITE_PATH", "backend/app/data/interviews.db")
+
+
+def _connect(path: str) -> sqlite3.Connection:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+    # WAL lets readers proceed while a write is in flight; NORMAL sync is durable across
+    # application crashes and only risks the last transactions on power loss.
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA busy_timeout=5000")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute(f"PRAGMA cache_size=-{int(os.getenv('SQLITE_CACHE_KB', '16000'))}")
+    conn.execute(f"PRAGMA mmap_size={int(os.getenv('SQLITE_MMAP_BYTES', str(128 * 1024 * 1024)))}")
+    return conn
+
+
+def migrate(conn: sqlite3.Connection):
+    (version,) = conn.execute("PRAGMA user_version").fetchone()
+    for i in range(version, len(MIGRATIONS)):
+        # Each migration and its version bump commit together; if a statement fails, `with conn`
+        # rolls the whole step back instead of leaving its transaction open
+        with conn:
+            conn.executescript(f"BEGIN;\n{MIGRATIONS[i].strip().rstrip(';')};\nPRAGMA user_version = {i + 1};\nCOMMIT;")
+
+
+class ConnectionPool:
+    """Bounded pool of SQLite connections; acquire() blocks when all are checked out."""
+
+    def __init__(self, path: str, size: int):
+        self.path = path
+        self.size = size
+        self._idle: queue.LifoQueue[sqlite3.Connection] = queue.LifoQueue()
+        self._created = 0
+        self._closed = False
+        self._lock = threading.Lock()
+
+    def acquire(self, timeout: float = 30.0) -> sqlite3.Connection:
+        if self._closed:
+            raise RuntimeError("SQLite connection pool is closed")
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._created < self.size:
+                self._created += 1
+                return _connect(self.path)
+        try:
+            return self._idle.get(timeout=timeout)
+        except queue.Empty:
+            raise TimeoutError(f"no SQLite connection available after {timeout}s (pool size {self.size})")
+
+    def release(self, conn: sqlite3.Connection):
+        with self._lock:
+            if not self._closed:
+                self._idle.put(conn)
+                return
+            self._created -= 1
+        conn.close()
+
+    def close(self):
+        """Close idle connections now; ones still checked out are closed as they are released."""
+        with self._lock:
+            self._closed = True
+            while True:
+                try:
+                    self._idle.get_nowait().close()
+                except queue.Empty:
+                    break
+                self._created -= 1
+
+    def stats(self) -> dict:
+        idle = self._idle.qsize()
+        return {"size": self.size, "open": self._created, "idle": idle, "in_use": self._created - idle}
+
+
+class AttemptWriter:
+    """
+    Background thread that groups `attempts` inserts into batched transactions.
+
+    submit() returns a Future resolved once the rows are committed, so callers still
+    get read-your-writes while concurrent requests share one commit.
+    """
+
+    def __init__(self, pool: ConnectionPool, max_batch: int = 256, max_delay: float = 0.01):
+        self.pool = pool
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self._queue: queue.Queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="attempt-writer", daemon=True)
+        self.batches = 0
+        self.rows = 0
+        self._thread.start()
+
+    def submit(self, rows: list[tuple]) -> Future:
+        fut: Future = Future()
+        self._queue.put((rows, fut))
+        return fut
+
+    def stop(self):
+        self._queue.put(None)
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            pending = [item]
+            count = len(item[0])
+            deadline = time.monotonic() + self.max_delay
+            stop = False
+            while count < self.max_batch:
+                remaining = deadline - time.monotonic()
+                try:
+                    nxt = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if nxt is None:
+                    stop = True
+                    break
+                pending.append(nxt)
+                count += len(nxt[0])
+            self._write(pending)
+            if stop:
+                return
+
+    def _write(self, pending: list):
+        rows = [row for batch, _ in pending for row in batch]
+        conn = None
+        try:
+            conn = self.pool.acquire()
+            with conn:
+                conn.executemany(
+                    f"INSERT INTO attempts({', '.join(ATTEMPT_COLUMNS)}) VALUES({', '.join('?' * len(ATTEMPT_COLUMNS))})",
+                    rows,
+                )
+        except Exception as e:
+            for _, fut in pending:
+                fut.set_exception(e)
+            return
+        finally:
+            if conn is not None:
+                self.pool.release(conn)
+        self.batches += 1
+        self.rows += len(rows)
+        for _, fut in pending:
+            fut.set_result(len(rows))
+
+    def stats(self) -> dict:
+        return {"queued": self._queue.qsize(), "batches": self.batches, "rows": self.rows}
+
+
+_pool: ConnectionPool | None = None
+_writer: AttemptWriter | None = None
+_init_lock = threading.Lock()
+
+
+def init_db():
+    """Open the pool, run migrations once and start the attempt writer. Idempotent."""
+    global _pool, _writer
+    if _pool is not None:
+        return
+    with _init_lock:
+        if _pool is not None:
+            return
+        pool = ConnectionPool(db_path(), size=int(os.getenv("SQLITE_POOL_SIZE", "8")))
+        conn = pool.acquire()
+        try:
+            migrate(conn)
+        finally:
+            pool.release(conn)
+        _writer = AttemptWriter(
+            pool,
+            max_batch=int(os.getenv("SQLITE_WRITE_BATCH", "256")),
+            max_delay=float(os.getenv("SQLITE_WRITE_DELAY_MS", "10")) / 1000,
+        )
+        _pool = pool
+
+
+def close_db():
+    global _pool, _writer
+    with _init_lock:
+        if _writer is not None:
+            _writer.stop()
+            _writer = None
+        if _pool is not None:
+            _pool.close()
+            _pool = None
+
+
+@contextmanager
+def connection():
+    """Borrow a pooled connection; uncommitted work is rolled back if the block raises."""
+    init_db()
+    # Released to the pool it came from, even if close_db()/init_db() swapped pools meanwhile
+    pool = _pool
+    conn = pool.acquire()
+    try:
+        yield conn
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        pool.release(conn)
+
+
+def submit_attempts(rows: list[tuple]) -> Future:
+    """Queue attempt rows (in ATTEMPT_COLUMNS order) for the next batched transaction."""
+    init_db()
+    return _writer.submit(rows)
+
+
+def db_stats() -> dict:
+    if _pool is None:
+        return {"initialized": False}
+    return {"initialized": True, "pool": _pool.stats(), "writer": _writer.stats()}
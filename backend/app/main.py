@@ -1,9 +1,90 @@
-from fastapi import FastAPI
+import asyncio
+import logging
+import os
+import time
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
 
 from app.routers import upload, interview, evaluation, analytics
+from app.db import init_db, close_db, db_stats
+from app.services import vectorstore
+from app.services import metrics
+from app.services.concurrency import run_in_stage, shutdown_executor, stage_stats
+from app.services.sessions import cleanup_expired_sessions
+from app.services.ingest import start_ingest_workers, stop_ingest_workers, ingest_stats
+from app.services.context import context_stats
+from app.services.llmcache import close_llm_cache, llm_cache_stats
+from app.services.llm import backend_loaded, get_backend, llm_client_stats
+from app.services.resilience import CircuitOpenError
+
+
+logger = logging.getLogger(__name__)
+
+
+async def session_cleanup_loop(interval: float):
+    # TTL cleanup: drop idle sessions and the vectors/files of documents only they used
+    while True:
+        try:
+            await run_in_stage("db", cleanup_expired_sessions)
+        except Exception:
+            logger.exception("session cleanup failed")
+        await asyncio.sleep(interval)
+
+
+# Liveness is "/" (the process answers); readiness is "/ready" (startup done and, when a
+# preload was requested, the embedder, vector store and LLM client are loaded).
+_readiness = {"started": False, "preload": "off", "preload_seconds": None}
+
+
+def preload_resources():
+    """Import and load what the first request would otherwise pay for: torch + the embedder, Chroma, the LLM SDK."""
+    t0 = time.perf_counter()
+    vectorstore.warmup()
+    get_backend()
+    _readiness["preload_seconds"] = round(time.perf_counter() - t0, 3)
+
 
-app = FastAPI(title="AI Interview Assistant")
+async def background_preload():
+    _readiness["preload"] = "running"
+    try:
+        await run_in_stage("embed", preload_resources)
+        _readiness["preload"] = "done"
+    except Exception:
+        _readiness["preload"] = "failed"
+        logger.exception("background preload failed")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # One-time schema migration + connection pool + batched attempt writer
+    init_db()
+    # Heavy dependencies are imported lazily. WARMUP_ON_STARTUP=1 loads them before serving;
+    # "background" starts serving at once and loads them right after (see /ready).
+    warmup = os.getenv("WARMUP_ON_STARTUP", "0")
+    if warmup == "1":
+        preload_resources()
+        _readiness["preload"] = "done"
+    # Background ingestion; also resumes jobs interrupted by the last shutdown
+    await start_ingest_workers()
+    cleanup = asyncio.create_task(session_cleanup_loop(float(os.getenv("SESSION_CLEANUP_INTERVAL", "600"))))
+    preload = asyncio.create_task(background_preload()) if warmup == "background" else None
+    _readiness["started"] = True
+    yield
+    _readiness["started"] = False
+    cleanup.cancel()
+    if preload is not None:
+        preload.cancel()
+    await stop_ingest_workers()
+    shutdown_executor()
+    vectorstore.close_resources()
+    close_llm_cache()
+    close_db()
+
+
+app = FastAPI(title="AI Interview Assistant", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -13,6 +94,32 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def request_timing(request: Request, call_next):
+    # Per-request stage breakdown (parse/encode/query/llm/...) as a Server-Timing header.
+    # Streamed responses send headers first, so their header only covers work done before the stream.
+    timings, token = metrics.begin_request()
+    t0 = time.perf_counter()
+    try:
+        response = await call_next(request)
+    finally:
+        metrics.end_request(token)
+    elapsed = time.perf_counter() - t0
+    # Labelled by handler ("interview.generate_questions"): included routers only know their own path
+    endpoint = request.scope.get("endpoint")
+    handler = f"{endpoint.__module__.rsplit('.', 1)[-1]}.{endpoint.__name__}" if endpoint else "unmatched"
+    metrics.observe("http_request_seconds", elapsed, method=request.method, handler=handler, status=response.status_code)
+    response.headers["Server-Timing"] = metrics.server_timing(timings, elapsed)
+    return response
+
+@app.exception_handler(CircuitOpenError)
+async def circuit_open(request: Request, exc: CircuitOpenError):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(max(1, int(exc.retry_after)))},
+    )
+
 app.include_router(upload.router, prefix="/upload", tags=["upload"])
 app.include_router(interview.router, prefix="/interview", tags=["interview"])
 app.include_router(evaluation.router, prefix="/evaluation", tags=["evaluation"])
@@ -20,4 +127,25 @@ app.include_router(analytics.router, prefix="/analytics", tags=["analytics"])
 
 @app.get("/")
 def health():
-    return {"status": "ok"}
\ No newline at end of file
+    return {"status": "ok"}
+
+@app.get("/ready")
+def ready():
+    resources = vectorstore.resource_stats()
+    body = {
+        "ready": _readiness["started"] and _readiness["preload"] in ("off", "done"),
+        **_readiness,
+        "embedder_loaded": bool(resources["embedders"]),
+        "vector_store_open": bool(resources["chroma_dirs"]),
+        "llm_backend_loaded": backend_loaded(),
+    }
+    return body if body["ready"] else JSONResponse(status_code=503, content=body)
+
+@app.get("/stats")
+def stats():
+    return {"resources": vectorstore.resource_stats(), "llm_cache": llm_cache_stats(), "llm_client": llm_client_stats(), "db": db_stats(), "ingest": ingest_stats(), "context": context_stats(), "stages": stage_stats()}
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    # Stage/request histograms and token counters, plus every numeric /stats value as a gauge
+    return PlainTextResponse(metrics.render(stats()), media_type="text/plain; version=0.0.4")
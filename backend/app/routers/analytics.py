@@ -1,32 +1,171 @@
+import csv
+import io
 import json
+from datetime import datetime, timedelta
 from fastapi import APIRouter
-from app.db import get_conn
+from fastapi.responses import StreamingResponse
+from app.db import connection, BREAKDOWN_COLUMNS
 
 router = APIRouter()
 
+
+def _rollup_filter(role: str | None, company: str | None, since: str | None = None) -> tuple[str, list]:
+    clauses, params = [], []
+    if role is not None:
+        clauses.append("role = ?")
+        params.append(role)
+    if company is not None:
+        clauses.append("company = ?")
+        params.append(company)
+    if since is not None:
+        clauses.append("day >= ?")
+        params.append(since)
+    return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+
+def _averages(count: int, total_sum: int, dim_sums) -> dict:
+    return {
+        "attempts": int(count or 0),
+        "avg_score": float(total_sum or 0) / count if count else 0.0,
+        "cat_avgs": {k: (float(s or 0) / count if count else 0.0) for k, s in zip(BREAKDOWN_COLUMNS, dim_sums)},
+    }
+
+
+def _attempt_filter(role: str | None, company: str | None, since: str | None, until: str | None,
+                    before_id: int | None = None) -> tuple[str, list]:
+    clauses, params = [], []
+    for clause, value in (
+        ("role = ?", role),
+        ("company = ?", company),
+        ("created_at >= ?", since),
+        ("created_at < ?", until),
+        ("id < ?", before_id),
+    ):
+        if value is not None:
+            clauses.append(clause)
+            params.append(value)
+    return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+
+def _attempt_item(r) -> dict:
+    return {
+        "id": r[0],
+        "created_at": r[1],
+        "role": r[2],
+        "company": r[3],
+        "question": r[4],
+        "total_score": r[5],
+        "breakdown": {k: v or 0 for k, v in zip(BREAKDOWN_COLUMNS, r[6:])},
+    }
+
+
+HISTORY_SELECT = f"SELECT id, created_at, role, company, question, total_score, {', '.join(BREAKDOWN_COLUMNS)} FROM attempts"
+
+
 @router.get("/history")
-def history(limit: int = 50):
-    conn = get_conn()
-    cur = conn.execute(
-        "SELECT created_at, role, company, question, total_score, breakdown_json FROM attempts ORDER BY id DESC LIMIT ?",
-        (limit,),
-    )
-    rows = cur.fetchall()
-    out = []
-    for r in rows:
-        out.append({
-            "created_at": r[0],
-            "role": r[1],
-            "company": r[2],
-            "question": r[3],
-            "total_score": r[4],
-            "breakdown": json.loads(r[5] or "{}"),
-        })
-    return {"items": out}
+def history(
+    limit: int = 50,
+    before_id: int | None = None,
+    role: str | None = None,
+    company: str | None = None,
+    since: str | None = None,
+    until: str | None = None,
+):
+    """
+    Newest attempts first. Pass the returned `next_cursor` as `before_id` to get the next page;
+    keyset pagination costs the same on page 1000 as on page 1.
+    """
+    limit = max(1, min(limit, 500))
+    where, params = _attempt_filter(role, company, since, until, before_id)
+    with connection() as conn:
+        rows = conn.execute(f"{HISTORY_SELECT}{where} ORDER BY id DESC LIMIT ?", (*params, limit)).fetchall()
+    out = [_attempt_item(r) for r in rows]
+    next_cursor = out[-1]["id"] if len(out) == limit else None
+    return {"items": out, "next_cursor": next_cursor}
+
+
+EXPORT_FIELDS = ["id", "created_at", "role", "company", "question", "answer", "total_score", *BREAKDOWN_COLUMNS]
+
+
+def _export_rows(where: str, params: list, batch: int = 500):
+    # Keyset pages by id, each on a pooled connection borrowed only for that query: a slow or
+    # abandoned download holds no connection or read transaction between batches.
+    # Memory stays flat however large the table is.
+    last_id = 0
+    while True:
+        page_where = f"{where} AND id > ?" if where else " WHERE id > ?"
+        with connection() as conn:
+            rows = conn.execute(
+                f"SELECT {', '.join(EXPORT_FIELDS)} FROM attempts{page_where} ORDER BY id LIMIT ?",
+                (*params, last_id, batch),
+            ).fetchall()
+        if not rows:
+            return
+        yield rows
+        if len(rows) < batch:
+            return
+        last_id = rows[-1][0]
+
+
+def _ndjson(batches):
+    for rows in batches:
+        yield "".join(json.dumps(dict(zip(EXPORT_FIELDS, r))) + "\n" for r in rows)
+
+
+def _csv(batches):
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(EXPORT_FIELDS)
+    for rows in batches:
+        writer.writerows(rows)
+        yield buf.getvalue()
+        buf.seek(0)
+        buf.truncate()
+    if buf.tell():
+        yield buf.getvalue()
+
+
+@router.get("/export")
+def export(
+    format: str = "ndjson",
+    role: str | None = None,
+    company: str | None = None,
+    since: str | None = None,
+    until: str | None = None,
+):
+    """Stream every matching attempt (oldest first) as NDJSON or CSV."""
+    if format not in ("ndjson", "csv"):
+        return {"error": "format must be ndjson or csv"}
+    where, params = _attempt_filter(role, company, since, until)
+    batches = _export_rows(where, params)
+    if format == "csv":
+        return StreamingResponse(
+            _csv(batches),
+            media_type="text/csv",
+            headers={"Content-Disposition": 'attachment; filename="attempts.csv"'},
+        )
+    return StreamingResponse(_ndjson(batches), media_type="application/x-ndjson")
+
 
 @router.get("/summary")
-def summary():
-    conn = get_conn()
-    cur = conn.execute("SELECT COUNT(*), AVG(total_score) FROM attempts")
-    count, avg = cur.fetchone()
-    return {"attempts": int(count or 0), "avg_score": float(avg or 0.0)}
\ No newline at end of file
+def summary(role: str | None = None, company: str | None = None):
+    # Reads the per-day rollups kept by the attempts trigger, not the attempts table
+    where, params = _rollup_filter(role, company)
+    sums = ", ".join(f"SUM({k}_sum)" for k in BREAKDOWN_COLUMNS)
+    with connection() as conn:
+        row = conn.execute(f"SELECT SUM(attempts), SUM(total_sum), {sums} FROM attempt_rollups{where}", params).fetchone()
+    return _averages(row[0], row[1], row[2:])
+
+
+@router.get("/trends")
+def trends(role: str | None = None, company: str | None = None, days: int = 30):
+    """Per-day attempt counts and averages over the last `days` days."""
+    since = (datetime.utcnow() - timedelta(days=max(days, 1) - 1)).date().isoformat()
+    where, params = _rollup_filter(role, company, since)
+    sums = ", ".join(f"SUM({k}_sum)" for k in BREAKDOWN_COLUMNS)
+    with connection() as conn:
+        rows = conn.execute(
+            f"SELECT day, SUM(attempts), SUM(total_sum), {sums} FROM attempt_rollups{where} GROUP BY day ORDER BY day",
+            params,
+        ).fetchall()
+    return {"since": since, "points": [{"day": r[0], **_averages(r[1], r[2], r[3:])} for r in rows]}
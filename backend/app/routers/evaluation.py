@@ -1,61 +1,60 @@
-import os
+import asyncio
 import json
+import os
 from datetime import datetime
-from fastapi import APIRouter
+from fastapi import APIRouter, Response
+from fastapi.responses import StreamingResponse
 from dotenv import load_dotenv
 
-from app.schemas import ScoreRequest, ScoreResponse
-from app.services.vectorstore import get_embedder, get_chroma_client, get_collection, query
+from app.schemas import ScoreRequest, ScoreResponse, ScoreBatchRequest, ScoreBatchResponse, ScoredItem
+from app.services.vectorstore import default_embedder, default_collection, query_many
 from app.services.prompts import SCORE_PROMPT
-from app.services.llm import call_llm
-from app.db import get_conn
+from app.services.llm import acall_llm
+from app.services.concurrency import run_in_stage, stage_limit
+from app.services.streaming import JsonStreamParser, sse_event
+from app.services.sessions import session_scope
+from app.services.context import Context, build_context
+from app.services.metrics import stage
+from app.db import submit_attempts
 
 load_dotenv()
 router = APIRouter()
 
+BREAKDOWN_KEYS = ["relevance", "clarity", "technical_correctness", "structure", "impact"]
 
-@router.post("/score", response_model=ScoreResponse)
-def score_answer(req: ScoreRequest):
-    embed_model = os.getenv("EMBED_MODEL", "all-MiniLM-L6-v2")
-    chroma_dir = os.getenv("CHROMA_DIR", "backend/app/data/chroma_db")
-
-    embedder = get_embedder(embed_model)
-    chroma_client = get_chroma_client(chroma_dir)
-    collection = get_collection(chroma_client)
-
-    # Retrieve evidence from resume + JD
-    hits = query(collection, embedder, f"{req.question}\n{req.answer}", k=8)
-    context = "\n\n".join([
-        f"(source={h['meta'].get('source')}, page={h['meta'].get('page')}) {h['text']}"
-        for h in hits
-        if h.get("text")
-    ])[:12000]
-
-    prompt = SCORE_PROMPT.format(
-        role=req.role,
-        company=req.company or "N/A",
-        question=req.question,
-        answer=req.answer,
-        context=context,
-    )
 
-    # OpenAI JSON mode: returns dict
-    out = call_llm(prompt, json_mode=True)
+def _render_hit(h: dict) -> str:
+    return f"(source={h['meta'].get('source')}, page={h['meta'].get('page')}) {h['text']}"
 
-    breakdown = out.get("breakdown", {}) if isinstance(out, dict) else {}
-    strengths = out.get("strengths", []) if isinstance(out, dict) else []
-    improvements = out.get("improvements", []) if isinstance(out, dict) else []
-    improved_answer = (out.get("improved_answer", "") if isinstance(out, dict) else "") or ""
 
+def _retrieve_contexts(pairs: list[tuple[str, str]], doc_ids: list[str] | None = None) -> list[Context]:
+    """Retrieve evidence from resume + JD for every (question, answer) pair in one search call."""
+    embedder = default_embedder()
+    collection = default_collection()
+
+    hit_lists = query_many(collection, embedder, [f"{q}\n{a}" for q, a in pairs], k=8, doc_ids=doc_ids)
+    return [build_context(hits, render=_render_hit) for hits in hit_lists]
+
+
+def _clean_breakdown(breakdown) -> dict:
     # Ensure breakdown keys exist and are ints
-    keys = ["relevance", "clarity", "technical_correctness", "structure", "impact"]
+    breakdown = breakdown if isinstance(breakdown, dict) else {}
     clean_breakdown = {}
-    for k in keys:
+    for k in BREAKDOWN_KEYS:
         try:
             clean_breakdown[k] = int(breakdown.get(k, 0))
         except Exception:
             clean_breakdown[k] = 0
+    return clean_breakdown
+
 
+def _clean_result(out) -> dict:
+    breakdown = out.get("breakdown", {}) if isinstance(out, dict) else {}
+    strengths = out.get("strengths", []) if isinstance(out, dict) else []
+    improvements = out.get("improvements", []) if isinstance(out, dict) else []
+    improved_answer = (out.get("improved_answer", "") if isinstance(out, dict) else "") or ""
+
+    clean_breakdown = _clean_breakdown(breakdown)
     total = int(sum(clean_breakdown.values()))
 
     # Defaults + limit list sizes
@@ -63,29 +62,138 @@ def score_answer(req: ScoreRequest):
     improvements = improvements[:5] if improvements else ["Add more concrete examples and measurable impact."]
     improved_answer = improved_answer.strip() or "Try structuring your answer using Situation–Task–Action–Result (STAR)."
 
+    return {
+        "total_score": total,
+        "breakdown": clean_breakdown,
+        "strengths": strengths,
+        "improvements": improvements,
+        "improved_answer": improved_answer,
+    }
+
+
+def _score_prompt(role: str, company: str | None, question: str, answer: str, context: str) -> str:
+    return SCORE_PROMPT.format(
+        role=role,
+        company=company or "N/A",
+        question=question,
+        answer=answer,
+        context=context,
+    )
+
+
+async def _score_one(role: str, company: str | None, question: str, answer: str, context: str) -> dict:
+    prompt = _score_prompt(role, company, question, answer, context)
+
+    # OpenAI JSON mode: returns dict
+    async with stage_limit("llm"):
+        out = await acall_llm(prompt, json_mode=True)
+    return _clean_result(out)
+
+
+def _attempt_rows(role: str, company: str, pairs: list[tuple[str, str]], results: list[dict]) -> list[tuple]:
+    now = datetime.utcnow().isoformat()
+    return [
+        (now, role, company, question, answer, r["total_score"], json.dumps(r["breakdown"]),
+         *(r["breakdown"][k] for k in BREAKDOWN_KEYS))
+        for (question, answer), r in zip(pairs, results)
+    ]
+
+
+async def _save_attempts(rows: list[tuple]):
+    """Store attempts; rows from concurrent requests are committed together by the background writer."""
+    with stage("db_write"):
+        await asyncio.wrap_future(submit_attempts(rows))
+
+
+@router.post("/score", response_model=ScoreResponse)
+async def score_answer(req: ScoreRequest, response: Response):
+    doc_ids = await session_scope(req.session_id)
+    [context] = await run_in_stage("query", _retrieve_contexts, [(req.question, req.answer)], doc_ids)
+    response.headers["X-Context-Tokens"] = str(context.tokens)
+
+    result = await _score_one(req.role, req.company, req.question, req.answer, context.text)
+
     # Store attempt in SQLite
-    conn = get_conn()
-    conn.execute(
-        """
-        INSERT INTO attempts(created_at, role, company, question, answer, total_score, breakdown_json)
-        VALUES(?,?,?,?,?,?,?)
-        """,
-        (
-            datetime.utcnow().isoformat(),
-            req.role,
-            req.company or "",
-            req.question,
-            req.answer,
-            total,
-            json.dumps(clean_breakdown),
-        ),
+    await _save_attempts(_attempt_rows(req.role, req.company or "", [(req.question, req.answer)], [result]))
+
+    return ScoreResponse(**result)
+
+
+@router.post("/score/stream")
+async def score_answer_stream(req: ScoreRequest):
+    """
+    Server-Sent Events variant of /score.
+
+    Events, in the order the model produces them: `breakdown` (scores + total), `strengths`,
+    `improvements`, one `token` per piece of `improved_answer`, then `result` with the full
+    ScoreResponse once the attempt has been stored.
+    """
+    doc_ids = await session_scope(req.session_id)
+    [context] = await run_in_stage("query", _retrieve_contexts, [(req.question, req.answer)], doc_ids)
+    prompt = _score_prompt(req.role, req.company, req.question, req.answer, context.text)
+
+    async def events():
+        parser = JsonStreamParser(string_keys=["improved_answer"])
+        out = {}
+        try:
+            async with stage_limit("llm"):
+                async for delta in await acall_llm(prompt, json_mode=True, stream=True):
+                    for kind, key, value in parser.feed(delta):
+                        if kind == "delta" and key == "improved_answer":
+                            yield sse_event("token", {"text": value})
+                        elif kind == "value":
+                            out[key] = value
+                            if key == "breakdown":
+                                clean_breakdown = _clean_breakdown(value)
+                                yield sse_event("breakdown", {"breakdown": clean_breakdown, "total_score": sum(clean_breakdown.values())})
+                            elif key in ("strengths", "improvements"):
+                                yield sse_event(key, {key: _clean_result(out)[key]})
+        except Exception as e:
+            yield sse_event("error", {"detail": str(e)})
+            return
+
+        result = _clean_result(out)
+        await _save_attempts(_attempt_rows(req.role, req.company or "", [(req.question, req.answer)], [result]))
+        yield sse_event("result", ScoreResponse(**result).model_dump())
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Context-Tokens": str(context.tokens)},
+    )
+
+
+@router.post("/score_batch", response_model=ScoreBatchResponse)
+async def score_batch(req: ScoreBatchRequest, response: Response):
+    items = [it for it in req.items if it.question.strip() and it.answer.strip()]
+    if not items:
+        return ScoreBatchResponse(results=[], answered=0, total_sum=0, avg_score=0.0, cat_avgs={k: 0.0 for k in BREAKDOWN_KEYS})
+
+    # One embedding pass + one Chroma query for the whole interview
+    doc_ids = await session_scope(req.session_id)
+    contexts = await run_in_stage("query", _retrieve_contexts, [(it.question, it.answer) for it in items], doc_ids)
+    response.headers["X-Context-Tokens"] = str(sum(c.tokens for c in contexts))
+
+    # Score concurrently, at most SCORE_BATCH_FANOUT LLM calls in flight for this request
+    fanout = asyncio.Semaphore(int(os.getenv("SCORE_BATCH_FANOUT", "4")))
+
+    async def _bounded(it, context):
+        async with fanout:
+            return await _score_one(req.role, req.company, it.question, it.answer, context.text)
+
+    results = await asyncio.gather(*[_bounded(it, ctx) for it, ctx in zip(items, contexts)])
+
+    await _save_attempts(_attempt_rows(req.role, req.company or "", [(it.question, it.answer) for it in items], results))
+
+    total_sum = sum(r["total_score"] for r in results)
+    cat_avgs = {
+        k: round(sum(r["breakdown"][k] for r in results) / len(results), 2)
+        for k in BREAKDOWN_KEYS
+    }
+    return ScoreBatchResponse(
+        results=[ScoredItem(question=it.question, **r) for it, r in zip(items, results)],
+        answered=len(results),
+        total_sum=total_sum,
+        avg_score=round(total_sum / len(results), 2),
+        cat_avgs=cat_avgs,
     )
-    conn.commit()
-
-    return ScoreResponse(
-        total_score=total,
-        breakdown=clean_breakdown,
-        strengths=strengths,
-        improvements=improvements,
-        improved_answer=improved_answer,
-    )
\ No newline at end of file
@@ -1,73 +1,155 @@
 import os
-from fastapi import APIRouter
+
+from fastapi import APIRouter, Response
+from fastapi.responses import StreamingResponse
 from dotenv import load_dotenv
 
 from app.schemas import GenerateRequest, GenerateResponse, Question
-from app.services.vectorstore import get_embedder, get_chroma_client, get_collection, query
+from app.services.vectorstore import default_embedder, default_collection, query
 from app.services.prompts import QUESTION_PROMPT
-from app.services.llm import call_llm
+from app.services.llm import acall_llm
+from app.services.concurrency import run_in_stage, stage_limit
+from app.services.sessions import session_scope
+from app.services.context import Context, build_context, interleave
+from app.services.digest import load_digests, render_digest
+from app.services.metrics import inc
+from app.services.streaming import JsonStreamParser, sse_event
 
 load_dotenv()
 router = APIRouter()
 
 
-@router.post("/generate", response_model=GenerateResponse)
-def generate_questions(req: GenerateRequest):
-    embed_model = os.getenv("EMBED_MODEL", "all-MiniLM-L6-v2")
-    chroma_dir = os.getenv("CHROMA_DIR", "backend/app/data/chroma_db")
-
-    embedder = get_embedder(embed_model)
-    chroma_client = get_chroma_client(chroma_dir)
-    collection = get_collection(chroma_client)
+def _retrieve_context(role: str, doc_ids: list[str] | None = None) -> Context:
+    embedder = default_embedder()
+    collection = default_collection()
 
     # Pull context from both resume + JD
     resume_hits = query(
         collection, embedder,
-        f"{req.role} skills projects experience", k=6,
-        source_filter="resume"
+        f"{role} skills projects experience", k=6,
+        source_filter="resume", doc_ids=doc_ids
     )
     jd_hits = query(
         collection, embedder,
-        f"{req.role} requirements responsibilities tech stack", k=6,
-        source_filter="jd"
+        f"{role} requirements responsibilities tech stack", k=6,
+        source_filter="jd", doc_ids=doc_ids
+    )
+
+    # Scores from two searches aren't comparable: alternate sources so both make it into the budget
+    return build_context(interleave(resume_hits, jd_hits), keep_order=True)
+
+
+def question_context_mode() -> str:
+    return os.getenv("QUESTION_CONTEXT", "digest")
+
+
+def _digest_context(doc_ids: list[str]) -> Context | None:
+    """Prompt context from the session's precomputed digests; None if any document lacks one."""
+    digests = load_digests(doc_ids)
+    if len(digests) < len(doc_ids):
+        return None
+    # Resume first, then JD, same order as the retrieved context
+    ordered = sorted(digests.values(), key=lambda d: d["doc_type"] != "resume")
+    context = build_context([{"text": render_digest(d)} for d in ordered])
+    context.source = "digest"
+    return context
+
+
+def _clean_question(item) -> Question | None:
+    if not isinstance(item, dict):
+        return None
+    q = (item.get("question") or "").strip()
+    if not q:
+        return None
+    return Question(
+        type=(item.get("type") or "general").strip(),
+        question=q
+    )
+
+
+def _fallback_question(role: str) -> Question:
+    return Question(
+        type="general",
+        question=f"Tell me about yourself and why you are a good fit for {role}."
     )
 
-    context = "\n\n".join([h["text"] for h in (resume_hits + jd_hits) if h.get("text")])
+
+async def _build_prompt(req: GenerateRequest) -> tuple[str, Context]:
+    doc_ids = await session_scope(req.session_id)
+    context = None
+    # A session's documents don't change after upload: use their digests, no vector search
+    if doc_ids and question_context_mode() == "digest":
+        context = await run_in_stage("db", _digest_context, doc_ids)
+    if context is None:
+        # Embedding + Chroma search are blocking: keep them off the event loop
+        context = await run_in_stage("query", _retrieve_context, req.role, doc_ids)
+    inc("question_context_total", source=context.source)
 
     prompt = QUESTION_PROMPT.format(
         role=req.role,
         company=req.company or "N/A",
-        context=context[:12000]
+        context=context.text
     )
+    return prompt, context
+
+
+@router.post("/generate", response_model=GenerateResponse)
+async def generate_questions(req: GenerateRequest, response: Response):
+    prompt, context = await _build_prompt(req)
+    response.headers["X-Context-Tokens"] = str(context.tokens)
+    response.headers["X-Context-Source"] = context.source
 
     # OpenAI JSON mode: returns a dict like {"questions": [...]}
-    out = call_llm(prompt, json_mode=True)
+    async with stage_limit("llm"):
+        out = await acall_llm(prompt, json_mode=True)
 
     raw_questions = out.get("questions", [])
-    questions: list[Question] = []
-
-    for item in raw_questions:
-        if not isinstance(item, dict):
-            continue
-        q = (item.get("question") or "").strip()
-        if not q:
-            continue
-        questions.append(
-            Question(
-                type=(item.get("type") or "general").strip(),
-                question=q
-            )
-        )
+    questions = [q for q in (_clean_question(item) for item in raw_questions) if q]
 
     # Fallback if model returns nothing
     if not questions:
-        questions = [
-            Question(
-                type="general",
-                question=f"Tell me about yourself and why you are a good fit for {req.role}."
-            )
-        ]
+        questions = [_fallback_question(req.role)]
 
     # Respect requested number, but ensure at least 3 for a decent interview set
     limit = max(3, req.num_questions)
-    return GenerateResponse(questions=questions[:limit])
\ No newline at end of file
+    return GenerateResponse(questions=questions[:limit])
+
+
+@router.post("/generate/stream")
+async def generate_questions_stream(req: GenerateRequest):
+    """
+    Server-Sent Events variant of /generate.
+
+    Emits `question` events as soon as each question parses out of the streamed completion,
+    then one `done` event with the full list (same shape as GenerateResponse).
+    """
+    prompt, context = await _build_prompt(req)
+    limit = max(3, req.num_questions)
+
+    async def events():
+        questions: list[Question] = []
+        parser = JsonStreamParser(array_keys=["questions"])
+        try:
+            async with stage_limit("llm"):
+                async for delta in await acall_llm(prompt, json_mode=True, stream=True):
+                    for kind, key, value in parser.feed(delta):
+                        if kind != "item" or key != "questions" or len(questions) >= limit:
+                            continue
+                        q = _clean_question(value)
+                        if q:
+                            questions.append(q)
+                            yield sse_event("question", {"index": len(questions) - 1, **q.model_dump()})
+        except Exception as e:
+            yield sse_event("error", {"detail": str(e)})
+            return
+
+        if not questions:
+            questions = [_fallback_question(req.role)]
+            yield sse_event("question", {"index": 0, **questions[0].model_dump()})
+        yield sse_event("done", GenerateResponse(questions=questions).model_dump())
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Context-Tokens": str(context.tokens), "X-Context-Source": context.source},
+    )
@@ -1,39 +1,249 @@
+import hashlib
 import os
 import uuid
-from fastapi import APIRouter, UploadFile, File
+from fastapi import APIRouter, Request
+from fastapi.responses import JSONResponse
 from dotenv import load_dotenv
+from python_multipart.exceptions import MultipartParseError
+from python_multipart.multipart import MultipartParser, parse_options_header
 
-from app.services.parsing import pdf_to_text
-from app.services.vectorstore import get_embedder, get_chroma_client, get_collection, upsert_document
+from app.services.sessions import new_session_id, attach_document
+from app.services.ingest import get_job, reserve_ingest, submit_job, update_job, wait_for_job
+from app.services.concurrency import run_in_stage
 
 load_dotenv()
 router = APIRouter()
 
-@router.post("/{doc_type}")
-async def upload_doc(doc_type: str, file: UploadFile = File(...)):
-    if doc_type not in ["resume", "jd"]:
-        return {"error": "doc_type must be resume or jd"}
+# Multipart framing and headers allowed on top of UPLOAD_MAX_BYTES
+MULTIPART_SLACK = 64 * 1024
+
+# The body is parsed by hand (see _spool_upload), so describe it for /docs explicitly
+UPLOAD_BODY_SCHEMA = {
+    "requestBody": {
+        "required": True,
+        "content": {"multipart/form-data": {"schema": {
+            "type": "object",
+            "properties": {"file": {"type": "string", "format": "binary"}},
+            "required": ["file"],
+        }}},
+    }
+}
+
+
+class UploadTooLarge(Exception):
+    pass
+
+
+class BadUpload(Exception):
+    pass
+
+
+def upload_max_bytes() -> int:
+    return int(os.getenv("UPLOAD_MAX_BYTES", str(20 * 1024 * 1024)))
 
+
+def upload_chunk_bytes() -> int:
+    return int(os.getenv("UPLOAD_CHUNK_BYTES", str(1024 * 1024)))
+
+
+def _uploads_dir() -> str:
     data_dir = os.getenv("DATA_DIR", "backend/app/data")
     uploads_dir = os.path.join(data_dir, "uploads")
     os.makedirs(uploads_dir, exist_ok=True)
+    return uploads_dir
+
+
+async def _spool_upload(request: Request, tmp_path: str, max_bytes: int, chunk_bytes: int) -> str | None:
+    """
+    Stream the multipart body straight into `tmp_path`: the `file` part is hashed and written
+    as it arrives, once, and reading stops as soon as it exceeds `max_bytes`, whether or not
+    the client sent a Content-Length. Returns the sha256, or None if there was no `file` part.
+    """
+    content_type, params = parse_options_header(request.headers.get("content-type"))
+    if content_type != b"multipart/form-data" or b"boundary" not in params:
+        raise BadUpload("expected a multipart/form-data body with a `file` field")
+
+    digest = hashlib.sha256()
+    buf = bytearray()
+    part = {"field": b"", "value": b"", "headers": {}, "is_file": False, "found": False, "size": 0}
+
+    def on_header_field(data: bytes, start: int, end: int):
+        part["field"] += data[start:end]
+
+    def on_header_value(data: bytes, start: int, end: int):
+        part["value"] += data[start:end]
 
+    def on_header_end():
+        part["headers"][part["field"].lower()] = part["value"]
+        part["field"], part["value"] = b"", b""
+
+    def on_headers_finished():
+        _, options = parse_options_header(part["headers"].get(b"content-disposition"))
+        # Only the first `file` part is kept; any other fields are ignored
+        part["is_file"] = options.get(b"name") == b"file" and not part["found"]
+        part["found"] = part["found"] or part["is_file"]
+        part["headers"] = {}
+
+    def on_part_data(data: bytes, start: int, end: int):
+        if part["is_file"]:
+            part["size"] += end - start
+            if part["size"] > max_bytes:
+                raise UploadTooLarge(f"file exceeds UPLOAD_MAX_BYTES ({max_bytes} bytes)")
+            buf.extend(data[start:end])
+
+    def on_part_end():
+        part["is_file"] = False
+
+    def write(out, data: bytes):
+        digest.update(data)
+        out.write(data)
+
+    parser = MultipartParser(params[b"boundary"], {
+        "on_header_field": on_header_field,
+        "on_header_value": on_header_value,
+        "on_header_end": on_header_end,
+        "on_headers_finished": on_headers_finished,
+        "on_part_data": on_part_data,
+        "on_part_end": on_part_end,
+    })
+    # Whole body, framing and other fields included, is capped too
+    body_limit = max_bytes + MULTIPART_SLACK
+    received = 0
+    try:
+        with open(tmp_path, "wb") as out:
+            async for chunk in request.stream():
+                received += len(chunk)
+                if received > body_limit:
+                    raise UploadTooLarge(f"file exceeds UPLOAD_MAX_BYTES ({max_bytes} bytes)")
+                parser.write(chunk)
+                # Hash and write in UPLOAD_CHUNK_BYTES pieces off the event loop
+                if len(buf) >= chunk_bytes:
+                    await run_in_stage("io", write, out, bytes(buf))
+                    buf.clear()
+            parser.finalize()
+            if buf:
+                await run_in_stage("io", write, out, bytes(buf))
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    if not part["found"]:
+        os.remove(tmp_path)
+        return None
+    return digest.hexdigest()
+
+
+def _remove_quietly(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+@router.post("/{doc_type}", openapi_extra=UPLOAD_BODY_SCHEMA)
+async def upload_doc(
+    request: Request,
+    doc_type: str,
+    session_id: str | None = None,
+    wait: bool = False,
+):
+    """
+    Store a resume or JD (multipart field `file`) for a candidate session (a new one unless
+    `session_id` is given) and queue its ingestion. Returns a job_id right away; poll
+    /upload/jobs/{job_id} until it is done, or pass wait=true to block until then. Retrieval
+    for a session only searches its own resume and JD.
+    """
+    if doc_type not in ["resume", "jd"]:
+        return {"error": "doc_type must be resume or jd"}
+    session_id = session_id or new_session_id()
+
+    # The body is read by _spool_upload, not by FastAPI, so this runs before any of it arrives
+    max_bytes = upload_max_bytes()
+    declared = request.headers.get("content-length")
+    if declared and declared.isdigit() and int(declared) > max_bytes + MULTIPART_SLACK:
+        return JSONResponse(status_code=413, content={"error": f"file exceeds UPLOAD_MAX_BYTES ({max_bytes} bytes)"})
+
+    # Stream to a temp file in fixed-size chunks; memory per upload is one chunk, not the file
+    uploads_dir = _uploads_dir()
+    tmp_path = os.path.join(uploads_dir, f".{uuid.uuid4().hex}.part")
+    try:
+        digest = await _spool_upload(request, tmp_path, max_bytes, upload_chunk_bytes())
+    except UploadTooLarge as e:
+        return JSONResponse(status_code=413, content={"error": str(e)})
+    except (BadUpload, MultipartParseError) as e:
+        return JSONResponse(status_code=400, content={"error": str(e) or "malformed multipart body"})
+    if digest is None:
+        return JSONResponse(status_code=422, content={"error": "missing multipart field `file`"})
+
+    try:
+        return await _register_upload(session_id, doc_type, digest, tmp_path, uploads_dir, wait)
+    finally:
+        # Removed on every path that didn't move it into place (dedup hit, errors, cancellation)
+        _remove_quietly(tmp_path)
+
+
+async def _register_upload(session_id: str, doc_type: str, digest: str, tmp_path: str, uploads_dir: str, wait: bool):
     doc_id = str(uuid.uuid4())
     file_path = os.path.join(uploads_dir, f"{doc_id}_{doc_type}.pdf")
+    kind, found = await run_in_stage("db", reserve_ingest, session_id, doc_type, doc_id, file_path, digest)
 
-    content = await file.read()
-    with open(file_path, "wb") as f:
-        f.write(content)
-
-    pages = pdf_to_text(file_path)
+    # Identical bytes were already ingested: no parsing, no embedding
+    if kind == "document":
+        await run_in_stage("db", attach_document, session_id, doc_type, found["doc_id"])
+        return {
+            "status": "uploaded",
+            "job_id": None,
+            "session_id": session_id,
+            "doc_type": doc_type,
+            "doc_id": found["doc_id"],
+            "pages": found["pages"],
+            "deduplicated": True,
+        }
 
-    embed_model = os.getenv("EMBED_MODEL", "all-MiniLM-L6-v2")
-    chroma_dir = os.getenv("CHROMA_DIR", "backend/app/data/chroma_db")
+    job_id, doc_id = found["job_id"], found["doc_id"]
+    if kind == "job":
+        # Same bytes are being ingested for another upload: share that job instead of starting one
+        await run_in_stage("db", attach_document, session_id, doc_type, doc_id)
+    else:
+        try:
+            # Atomic rename: a document's file is either complete or absent
+            os.replace(tmp_path, file_path)
+        except BaseException:
+            # Don't leave a queued job (which later uploads of these bytes would join) without a file
+            await run_in_stage("db", update_job, job_id, {"status": "failed", "error": "could not store upload"})
+            raise
+        submit_job(job_id)
+    if not wait:
+        return {
+            "status": "queued",
+            "job_id": job_id,
+            "session_id": session_id,
+            "doc_type": doc_type,
+            "doc_id": doc_id,
+            "deduplicated": kind == "job",
+        }
 
-    embedder = get_embedder(embed_model)
-    client = get_chroma_client(chroma_dir)
-    collection = get_collection(client)
+    await wait_for_job(job_id)
+    job = await run_in_stage("db", get_job, job_id)
+    return {
+        "status": "uploaded" if job["status"] == "done" else job["status"],
+        "job_id": job_id,
+        "session_id": session_id,
+        "doc_type": doc_type,
+        "doc_id": doc_id,
+        "pages": job["pages"],
+        "deduplicated": kind == "job",
+        "error": job["error"],
+    }
 
-    upsert_document(collection, embedder, doc_type=doc_type, pages=pages, doc_id=doc_id)
 
-    return {"status": "uploaded", "doc_type": doc_type, "doc_id": doc_id, "pages": len(pages)}
\ No newline at end of file
+@router.get("/jobs/{job_id}")
+async def job_status(job_id: str):
+    """Ingestion progress: status, current stage, pages/chunks so far and per-stage seconds."""
+    job = await run_in_stage("db", get_job, job_id)
+    if not job:
+        return JSONResponse(status_code=404, content={"error": "unknown job_id"})
+    job.pop("file_path")
+    job.pop("content_hash")
+    # Uploads of the same file share a job; don't hand one session's id to another
+    job.pop("session_id")
+    return job
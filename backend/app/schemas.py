@@ -4,6 +4,7 @@ from typing import List, Optional, Dict
 class GenerateRequest(BaseModel):
     role: str
     company: Optional[str] = None
+    session_id: Optional[str] = None  # from /upload; None searches every stored document
     num_questions: int = 10
 
 class Question(BaseModel):
@@ -16,6 +17,7 @@ class GenerateResponse(BaseModel):
 class ScoreRequest(BaseModel):
     role: str
     company: Optional[str] = None
+    session_id: Optional[str] = None
     question: str
     answer: str
 
@@ -24,4 +26,24 @@ class ScoreResponse(BaseModel):
     breakdown: Dict[str, int]
     strengths: List[str]
     improvements: List[str]
-    improved_answer: str
\ No newline at end of file
+    improved_answer: str
+
+class ScoreItem(BaseModel):
+    question: str
+    answer: str
+
+class ScoreBatchRequest(BaseModel):
+    role: str
+    company: Optional[str] = None
+    session_id: Optional[str] = None
+    items: List[ScoreItem]
+
+class ScoredItem(ScoreResponse):
+    question: str
+
+class ScoreBatchResponse(BaseModel):
+    results: List[ScoredItem]
+    answered: int
+    total_sum: int
+    avg_score: float
+    cat_avgs: Dict[str, float]
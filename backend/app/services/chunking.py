@@ -1,11 +1,173 @@
-def chunk_text(text: str, chunk_size: int = 900, overlap: int = 150) -> list[str]:
-    text = (text or "").strip()
-    if not text:
+import os
+import re
+from typing import Callable
+
+# A counter maps words to their token counts in one call (one batched tokenizer pass).
+TokenCounter = Callable[[list[str]], list[int]]
+
+BULLET_RE = re.compile(r"^\s*(?:[•●▪◦‣∙·\-–*]|\d{1,2}[.)])\s*")
+SENTENCE_END_RE = re.compile(r"(?<=[.!?])\s+(?=[\"'(\[]?[A-Z0-9])")
+WORD_PIECE_RE = re.compile(r"\w+|[^\w\s]")
+
+
+def chunk_max_tokens() -> int:
+    return int(os.getenv("CHUNK_MAX_TOKENS", "200"))
+
+
+def chunk_overlap_tokens() -> int:
+    return int(os.getenv("CHUNK_OVERLAP_TOKENS", "0"))
+
+
+def approx_token_counts(words: list[str]) -> list[int]:
+    # Fallback when no tokenizer is available: one token per word piece / punctuation mark
+    return [max(1, len(WORD_PIECE_RE.findall(w))) for w in words]
+
+
+def is_heading(line: str) -> bool:
+    """
+    Resume/JD section titles: markdown headings, short all-caps lines ("EDUCATION", "KEY SKILLS")
+    or short lines ending in ':'.
+    """
+    if line.startswith("#"):
+        return True
+    words = line.split()
+    if not words or len(words) > 6 or BULLET_RE.match(line):
+        return False
+    letters = [c for c in line if c.isalpha()]
+    if len(letters) >= 3 and all(c.isupper() for c in letters):
+        return True
+    return line.endswith(":") and len(line) <= 60
+
+
+def logical_units(text: str) -> list[tuple[str, str]]:
+    """
+    Rejoin PDF-wrapped lines into logical units: ("heading", text), ("bullet", text) or
+    ("para", text). A unit ends at a blank line, a heading or the next bullet. pypdf leaves a
+    trailing space on soft-wrapped lines, which is how a wrapped line is told from a new one.
+    """
+    units: list[list] = []
+    wrapped = False
+    for raw in text.splitlines():
+        line = raw.strip()
+        continues = wrapped or line[:1].islower()
+        wrapped = raw[-1:].isspace()
+        if not line:
+            units.append(None)
+            continue
+        if is_heading(line):
+            units.append(["heading", line])
+            units.append(None)
+        elif BULLET_RE.match(line) and BULLET_RE.sub("", line):
+            units.append(["bullet", line])
+        elif continues and units and units[-1] is not None:
+            units[-1][1] += " " + line
+        else:
+            units.append(["para", line])
+    return [(u[0], u[1]) for u in units if u is not None]
+
+
+def _segments(units: list[tuple[str, str]]) -> list[tuple[str, str, bool]]:
+    """Split units into sentences: (kind, text, starts_unit)."""
+    out = []
+    for kind, text in units:
+        if kind == "heading":
+            out.append((kind, text, True))
+            continue
+        for i, sentence in enumerate(SENTENCE_END_RE.split(text)):
+            if sentence.strip():
+                out.append((kind, sentence.strip(), i == 0))
+    return out
+
+
+def _split_long(words: list[str], counts: list[int], max_tokens: int) -> list[tuple[list[str], int]]:
+    """Hard-split a single sentence that is longer than the limit, on word boundaries."""
+    pieces, cur, cur_tokens = [], [], 0
+    for w, n in zip(words, counts):
+        if cur and cur_tokens + n > max_tokens:
+            pieces.append((cur, cur_tokens))
+            cur, cur_tokens = [], 0
+        cur.append(w)
+        cur_tokens += n
+    if cur:
+        pieces.append((cur, cur_tokens))
+    return pieces
+
+
+def chunk_text(
+    text: str,
+    max_tokens: int | None = None,
+    overlap_tokens: int | None = None,
+    count_tokens: TokenCounter | None = None,
+) -> list[str]:
+    """
+    Split text into chunks of at most `max_tokens` tokens along sentence, bullet and section
+    boundaries. Headings always start a new chunk; a sentence is only cut when it alone
+    exceeds the limit. `overlap_tokens` repeats trailing whole sentences of the previous
+    chunk (same section only).
+
+    Token counts are summed per word, which is exact for whitespace-pretokenized tokenizers
+    (WordPiece, as used by MiniLM) and lets one batched tokenizer call cover the whole text.
+    """
+    max_tokens = max_tokens or chunk_max_tokens()
+    overlap_tokens = chunk_overlap_tokens() if overlap_tokens is None else overlap_tokens
+    count_tokens = count_tokens or approx_token_counts
+
+    segments = _segments(logical_units(text or ""))
+    if not segments:
         return []
-    chunks = []
-    start = 0
-    while start < len(text):
-        end = min(len(text), start + chunk_size)
-        chunks.append(text[start:end])
-        start = max(end - overlap, start + 1)
-    return chunks
\ No newline at end of file
+    vocab = sorted({w for _, s, _ in segments for w in s.split()})
+    word_tokens = dict(zip(vocab, count_tokens(vocab)))
+
+    chunks: list[str] = []
+    cur: list[tuple[str, int, bool]] = []  # (text, tokens, starts_unit)
+    cur_tokens = 0
+    cur_headings = 0  # leading heading segments in `cur`, so stacked headings stay with their content
+
+    def flush(carry: bool):
+        nonlocal cur, cur_tokens, cur_headings
+        if not cur:
+            return
+        chunks.append(_join(cur))
+        keep: list[tuple[str, int, bool]] = []
+        if carry and overlap_tokens > 0:
+            kept = 0
+            for seg in reversed(cur):
+                if kept + seg[1] > overlap_tokens:
+                    break
+                keep.insert(0, seg)
+                kept += seg[1]
+        cur, cur_tokens = keep, sum(s[1] for s in keep)
+        cur_headings = 0
+
+    for kind, sentence, starts_unit in segments:
+        words = sentence.split()
+        counts = [word_tokens[w] for w in words]
+        tokens = sum(counts)
+        if kind == "heading" and len(cur) > cur_headings:
+            flush(carry=False)
+        if tokens > max_tokens:
+            flush(carry=False)
+            # The last piece stays open so the following sentences can fill up its chunk
+            for piece_words, piece_tokens in _split_long(words, counts, max_tokens):
+                flush(carry=False)
+                cur, cur_tokens = [(" ".join(piece_words), piece_tokens, True)], piece_tokens
+            continue
+        if cur_tokens + tokens > max_tokens:
+            flush(carry=True)
+            # Overlap must never push a chunk over the limit
+            while cur and cur_tokens + tokens > max_tokens:
+                cur_tokens -= cur.pop(0)[1]
+        if kind == "heading" and len(cur) == cur_headings:
+            cur_headings += 1
+        cur.append((sentence, tokens, starts_unit or not cur))
+        cur_tokens += tokens
+    flush(carry=False)
+    return chunks
+
+
+def _join(segments: list[tuple[str, int, bool]]) -> str:
+    # New units (headings, bullets, paragraphs) go on their own line; sentences of one unit share a line
+    out = ""
+    for text, _, starts_unit in segments:
+        out += ("\n" if starts_unit else " ") + text if out else text
+    return out
@@ -0,0 +1,90 @@
+import asyncio
+import contextvars
+import functools
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+# Default in-flight limits per pipeline stage. CPU-heavy stages get small limits so a
+# burst of uploads can't starve queries; the LLM stage is network-bound and gets more.
+DEFAULT_STAGE_LIMITS = {
+    "parse": 4,
+    "embed": 2,
+    "query": 8,
+    "llm": 16,
+    "db": 8,
+    "io": 16,  # upload spooling: short file writes, kept apart from the long ingest "parse" slots
+}
+
+_executor: ThreadPoolExecutor | None = None
+_process_pool: ProcessPoolExecutor | None = None
+_executor_lock = threading.Lock()
+_semaphores: dict[str, asyncio.Semaphore] = {}
+
+
+def stage_limit_value(stage: str) -> int:
+    return int(os.getenv(f"STAGE_LIMIT_{stage.upper()}", str(DEFAULT_STAGE_LIMITS.get(stage, 4))))
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """Bounded pool for blocking work (PDF parsing, encoding, Chroma and SQLite calls)."""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                workers = int(os.getenv("CPU_WORKERS", str(min(8, (os.cpu_count() or 2) + 2))))
+                _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="pipeline")
+    return _executor
+
+
+def get_process_pool() -> ProcessPoolExecutor | None:
+    """Worker processes for CPU-bound work that holds the GIL (PDF text extraction); None if PARSE_WORKERS<=1."""
+    global _process_pool
+    if _process_pool is None:
+        workers = int(os.getenv("PARSE_WORKERS", str(min(4, os.cpu_count() or 1))))
+        if workers <= 1:
+            return None
+        with _executor_lock:
+            if _process_pool is None:
+                # spawn, not fork: the parent has live threads (executor, SQLite writer)
+                _process_pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+    return _process_pool
+
+
+def stage_limit(stage: str) -> asyncio.Semaphore:
+    """Semaphore capping how many requests may be inside `stage` at once."""
+    sem = _semaphores.get(stage)
+    if sem is None:
+        sem = _semaphores[stage] = asyncio.Semaphore(stage_limit_value(stage))
+    return sem
+
+
+async def run_in_stage(stage: str, fn, *args, **kwargs):
+    """Run a blocking callable on the bounded executor, under the stage's concurrency limit."""
+    async with stage_limit(stage):
+        loop = asyncio.get_running_loop()
+        # Carry context variables (the request's stage timings) into the worker thread
+        ctx = contextvars.copy_context()
+        return await loop.run_in_executor(get_executor(), ctx.run, functools.partial(fn, *args, **kwargs))
+
+
+def stage_stats() -> dict:
+    """In-flight count and limit per stage that has been used since startup."""
+    return {
+        name: {"limit": stage_limit_value(name), "in_flight": stage_limit_value(name) - sem._value}
+        for name, sem in _semaphores.items()
+    }
+
+
+def shutdown_executor():
+    global _executor, _process_pool
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=True, cancel_futures=True)
+            _executor = None
+        if _process_pool is not None:
+            _process_pool.shutdown(wait=True, cancel_futures=True)
+            _process_pool = None
+    # Semaphores are bound to the event loop that used them; start fresh on the next startup
+    _semaphores.clear()
@@ -0,0 +1,114 @@
+import os
+import re
+import threading
+from dataclasses import dataclass
+from typing import Callable
+
+_WORD_RE = re.compile(r"\w+")
+
+_lock = threading.Lock()
+_stats = {"built": 0, "tokens_sent": 0, "chunks_sent": 0, "chunks_dropped_overlap": 0, "chunks_dropped_budget": 0}
+
+
+def context_token_budget() -> int:
+    return int(os.getenv("CONTEXT_TOKEN_BUDGET", "3000"))
+
+
+def context_max_overlap() -> float:
+    return float(os.getenv("CONTEXT_MAX_OVERLAP", "0.6"))
+
+
+def estimate_tokens(text: str) -> int:
+    # Same ~4 characters per token heuristic the LLM client uses for rate limiting
+    return (len(text) + 3) // 4
+
+
+@dataclass
+class Context:
+    text: str
+    tokens: int
+    chunks: int
+    dropped_overlap: int
+    dropped_budget: int
+    source: str = "retrieval"
+
+
+def _shingles(text: str, n: int = 5) -> set:
+    words = _WORD_RE.findall(text.lower())
+    if len(words) < n:
+        return {tuple(words)} if words else set()
+    return {tuple(words[i:i + n]) for i in range(len(words) - n + 1)}
+
+
+def _overlaps(a: set, b: set, threshold: float) -> bool:
+    # Containment of the smaller chunk in the larger: catches duplicates and sliding-window overlap
+    if not a or not b:
+        return False
+    return len(a & b) / min(len(a), len(b)) >= threshold
+
+
+def interleave(*hit_lists: list[dict]) -> list[dict]:
+    """
+    Merge hit lists from separate searches (resume, JD) by taking the best remaining hit of
+    each in turn, so a tight budget is shared between sources instead of going to whichever
+    one happens to score higher. Pass the result to build_context(..., keep_order=True).
+    """
+    ranked = [sorted(hits, key=lambda h: -h.get("score", 0.0)) for hits in hit_lists]
+    out = []
+    for i in range(max((len(r) for r in ranked), default=0)):
+        out.extend(r[i] for r in ranked if i < len(r))
+    return out
+
+
+def build_context(
+    hits: list[dict],
+    budget_tokens: int | None = None,
+    render: Callable[[dict], str] = lambda h: h["text"],
+    separator: str = "\n\n",
+    keep_order: bool = False,
+) -> Context:
+    """
+    Assemble prompt context from retrieval hits: best (highest score) first, or in the given
+    order with keep_order=True, dropping chunks that mostly repeat one already chosen, and
+    adding whole chunks only while they fit in the token budget (CONTEXT_TOKEN_BUDGET).
+    Nothing is cut mid-chunk.
+    """
+    budget = context_token_budget() if budget_tokens is None else budget_tokens
+    ranked = [h for h in hits if h.get("text")]
+    if not keep_order:
+        ranked.sort(key=lambda h: -h.get("score", 0.0))
+    threshold = context_max_overlap()
+    sep_tokens = estimate_tokens(separator)
+
+    parts, chosen = [], []
+    used = dropped_overlap = dropped_budget = 0
+    for h in ranked:
+        shingles = _shingles(h["text"])
+        if any(_overlaps(shingles, prev, threshold) for prev in chosen):
+            dropped_overlap += 1
+            continue
+        piece = render(h)
+        cost = estimate_tokens(piece) + (sep_tokens if parts else 0)
+        if used + cost > budget:
+            # A smaller, lower-ranked chunk may still fit
+            dropped_budget += 1
+            continue
+        parts.append(piece)
+        chosen.append(shingles)
+        used += cost
+
+    ctx = Context(separator.join(parts), used, len(parts), dropped_overlap, dropped_budget)
+    with _lock:
+        _stats["built"] += 1
+        _stats["tokens_sent"] += ctx.tokens
+        _stats["chunks_sent"] += ctx.chunks
+        _stats["chunks_dropped_overlap"] += ctx.dropped_overlap
+        _stats["chunks_dropped_budget"] += ctx.dropped_budget
+    return ctx
+
+
+def context_stats() -> dict:
+    with _lock:
+        out = dict(_stats)
+    out["avg_tokens"] = out["tokens_sent"] / out["built"] if out["built"] else 0.0
+    return out
@@ -0,0 +1,171 @@
+import json
+import os
+import re
+from datetime import datetime
+
+from app.db import connection
+from app.services.chunking import BULLET_RE, logical_units
+from app.services.context import estimate_tokens
+from app.services.parsing import cached_pages
+
+SKILL_HEADING_RE = re.compile(r"skill|technolog|tool|stack|language|framework|librar|database|platform", re.I)
+REQUIREMENT_HEADING_RE = {
+    "jd": re.compile(r"require|qualification|responsibilit|must|what you|you will|looking for|nice to have", re.I),
+    "resume": re.compile(r"project|experience|employment|\bwork|internship|achievement", re.I),
+}
+# Contact details and referees never help question generation
+SKIP_HEADING_RE = re.compile(r"reference|referee|contact|personal|declaration", re.I)
+BOLD_RE = re.compile(r"\*\*([^*]{2,40}?)\s*\*\*")
+SPLIT_RE = re.compile(r"\s*(?:[,;|/]|\bor\b|\band\b)\s*")
+# A skill is a name ("Power BI", "Feature Engineering"), not a phrase ("Knowledge of data governance")
+PHRASE_WORDS = frozenset("a an the of in on with to for is are as at by".split())
+
+
+def digest_max_tokens() -> int:
+    return int(os.getenv("DIGEST_MAX_TOKENS", "600"))
+
+
+def _clean(text: str) -> str:
+    text = BULLET_RE.sub("", text.replace("**", "")).strip()
+    return text.lstrip("#").strip().rstrip(":").strip()
+
+
+def _clip(text: str, words: int = 24) -> str:
+    parts = text.split()
+    return " ".join(parts[:words]) + (" ..." if len(parts) > words else "")
+
+
+def _sections(text: str) -> list[tuple[str, list[str]]]:
+    """(heading, items) in document order; text before the first heading goes under ''."""
+    sections: list[tuple[str, list[str]]] = [("", [])]
+    for kind, unit in logical_units(text):
+        if kind == "heading":
+            sections.append((_clean(unit), []))
+        elif _clean(unit):
+            sections[-1][1].append(_clean(unit))
+    return [(h, items) for h, items in sections if h or items]
+
+
+def _skills(text: str, sections: list[tuple[str, list[str]]]) -> list[str]:
+    found: dict[str, str] = {}
+
+    def add(term: str):
+        term = term.strip(" .()[]-–")
+        words = term.lower().split()
+        if 1 < len(term) <= 40 and len(words) <= 4 and not PHRASE_WORDS.intersection(words) and term.lower() not in found:
+            found[term.lower()] = term
+
+    for heading, items in sections:
+        if not SKILL_HEADING_RE.search(heading):
+            continue
+        # Lists only ("Pandas, NumPy, Scikit-learn"): not sentences, and not a lone short line,
+        # which in a skills section is a sub-heading ("Frameworks & Libraries")
+        for item in items:
+            terms = [t for t in SPLIT_RE.split(re.sub(r"[()]", ",", item.split(":", 1)[-1])) if t]
+            if len(terms) > 1 and all(len(t.split()) <= 4 for t in terms):
+                for term in terms:
+                    add(term)
+    # JDs mark the important tools in bold: "**Python** (pandas, numpy)". A line that is only
+    # bold text is a heading, and so is a bold term ending in ':'. All-caps names (SQL, AWS)
+    # are skills here, so is_heading() can't be the test.
+    for line in text.splitlines():
+        terms = BOLD_RE.findall(line)
+        if not terms or not BOLD_RE.sub("", line).strip(" :"):
+            continue
+        for term in terms:
+            if not term.rstrip().endswith(":"):
+                add(term)
+    return list(found.values())
+
+
+def build_digest(text: str, doc_type: str) -> dict:
+    """
+    Compact structured summary of a resume or JD, built once at ingestion: title, skills,
+    key requirements (JD) or projects/experience (resume), and the first items of every
+    other section. Trimmed to DIGEST_MAX_TOKENS when rendered.
+    """
+    sections = _sections(text)
+    pattern = REQUIREMENT_HEADING_RE.get(doc_type, REQUIREMENT_HEADING_RE["jd"])
+    title = next((items[0] for h, items in sections if not h and items), None) or (sections[0][0] if sections else "")
+    requirements, other = [], []
+    for heading, items in sections:
+        if not heading or heading == title or SKIP_HEADING_RE.search(heading):
+            continue
+        if pattern.search(heading):
+            requirements.extend(_clip(i) for i in items)
+        elif not SKILL_HEADING_RE.search(heading):
+            other.append({"heading": heading, "items": [_clip(i, 16) for i in items[:2]]})
+    digest = {
+        "doc_type": doc_type,
+        "title": _clip(title, 12),
+        "skills": _skills(text, sections),
+        "requirements": requirements,
+        "sections": other,
+    }
+    return _fit(digest, digest_max_tokens())
+
+
+def render_digest(digest: dict) -> str:
+    label = "KEY REQUIREMENTS" if digest["doc_type"] == "jd" else "PROJECTS & EXPERIENCE"
+    lines = [f"[{digest['doc_type'].upper()} DIGEST] {digest['title']}".rstrip()]
+    if digest["skills"]:
+        lines.append("SKILLS: " + ", ".join(digest["skills"]))
+    if digest["requirements"]:
+        lines.append(label + ":")
+        lines.extend(f"- {r}" for r in digest["requirements"])
+    for section in digest["sections"]:
+        lines.append(f"{section['heading']}: " + "; ".join(section["items"]))
+    return "\n".join(lines)
+
+
+def _fit(digest: dict, max_tokens: int) -> dict:
+    # Drop from the least useful end first: other sections, then requirements, then skills
+    while estimate_tokens(render_digest(digest)) > max_tokens:
+        for key in ("sections", "requirements", "skills"):
+            if digest[key]:
+                digest[key].pop()
+                break
+        else:
+            break
+    return digest
+
+
+def store_digest(doc_id: str, doc_type: str, digest: dict):
+    with connection() as conn:
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO document_digests(doc_id, doc_type, digest_json, tokens, created_at) VALUES(?,?,?,?,?)",
+                (doc_id, doc_type, json.dumps(digest), estimate_tokens(render_digest(digest)), datetime.utcnow().isoformat()),
+            )
+
+
+def delete_digests(doc_ids: list[str]):
+    if not doc_ids:
+        return
+    with connection() as conn:
+        with conn:
+            conn.execute(f"DELETE FROM document_digests WHERE doc_id IN ({','.join('?' * len(doc_ids))})", doc_ids)
+
+
+def load_digests(doc_ids: list[str]) -> dict[str, dict]:
+    """
+    Digests by doc_id. Documents ingested before digests existed get one built from their
+    cached page text on first use; those without cached text are simply missing.
+    """
+    if not doc_ids:
+        return {}
+    marks = ",".join("?" * len(doc_ids))
+    with connection() as conn:
+        rows = conn.execute(f"SELECT doc_id, digest_json FROM document_digests WHERE doc_id IN ({marks})", doc_ids).fetchall()
+        out = {doc_id: json.loads(raw) for doc_id, raw in rows}
+        missing = [d for d in doc_ids if d not in out]
+        docs = conn.execute(
+            f"SELECT doc_id, doc_type, content_hash FROM documents WHERE doc_id IN ({','.join('?' * len(missing))})", missing
+        ).fetchall() if missing else []
+    for doc_id, doc_type, file_hash in docs:
+        pages = cached_pages(file_hash)
+        if not pages:
+            continue
+        out[doc_id] = build_digest("\n".join(pages[i] for i in sorted(pages)), doc_type)
+        store_digest(doc_id, doc_type, out[doc_id])
+    return out
@@ -0,0 +1,42 @@
+import hashlib
+import os
+from datetime import datetime
+
+from app.db import connection
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def find_document(content_hash: str, doc_type: str) -> dict | None:
+    """Return the already-ingested document with these exact bytes, if any."""
+    with connection() as conn:
+        return lookup_document(conn, content_hash, doc_type)
+
+
+def lookup_document(conn, content_hash: str, doc_type: str) -> dict | None:
+    """find_document on a connection the caller holds (e.g. inside its own transaction)."""
+    row = conn.execute(
+        "SELECT doc_id, file_path, pages, chunks FROM documents WHERE content_hash = ? AND doc_type = ?",
+        (content_hash, doc_type),
+    ).fetchone()
+    if not row:
+        return None
+    doc_id, file_path, pages, chunks = row
+    # A document whose file was cleaned up by hand must be ingested again
+    if file_path and not os.path.exists(file_path):
+        return None
+    return {"doc_id": doc_id, "file_path": file_path, "pages": pages, "chunks": chunks}
+
+
+def register_document(content_hash: str, doc_type: str, doc_id: str, file_path: str, pages: int, chunks: int):
+    with connection() as conn:
+        with conn:
+            conn.execute(
+                """
+                INSERT OR REPLACE INTO documents(content_hash, doc_type, doc_id, file_path, pages, chunks, created_at)
+                VALUES(?,?,?,?,?,?,?)
+                """,
+                (content_hash, doc_type, doc_id, file_path, pages, chunks, datetime.utcnow().isoformat()),
+            )
@@ -0,0 +1,173 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+
+class EmbeddingCache:
+    """
+    Two-tier cache of embedding vectors keyed by (model name, text hash).
+
+    - memory: LRU of at most `max_items` vectors
+    - disk (optional): SQLite table of at most `max_disk_items` vectors, evicting least recently used
+    """
+
+    def __init__(self, max_items: int = 4096, disk_path: str | None = None, max_disk_items: int = 100_000):
+        self.max_items = max_items
+        self.max_disk_items = max_disk_items
+        self._mem: OrderedDict[str, np.ndarray] = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk = None
+        self._disk_writes = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        if disk_path:
+            os.makedirs(os.path.dirname(disk_path) or ".", exist_ok=True)
+            self._disk = sqlite3.connect(disk_path, check_same_thread=False)
+            self._disk.execute("PRAGMA journal_mode=WAL")
+            self._disk.execute("""
+            CREATE TABLE IF NOT EXISTS embeddings (
+                key TEXT PRIMARY KEY,
+                dim INTEGER,
+                vec BLOB,
+                last_used REAL
+            )
+            """)
+            self._disk.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_last_used ON embeddings(last_used)")
+            self._disk.commit()
+
+    @staticmethod
+    def key(model_name: str, text: str) -> str:
+        return model_name + ":" + hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def get_many(self, model_name: str, texts: list[str]) -> dict[int, np.ndarray]:
+        """Return {index: vector} for every text that is cached."""
+        found: dict[int, np.ndarray] = {}
+        pending: dict[str, list[int]] = {}
+        with self._lock:
+            for i, text in enumerate(texts):
+                k = self.key(model_name, text)
+                vec = self._mem.get(k)
+                if vec is not None:
+                    self._mem.move_to_end(k)
+                    found[i] = vec
+                    self.hits += 1
+                else:
+                    pending.setdefault(k, []).append(i)
+
+            if pending and self._disk is not None:
+                keys = list(pending)
+                for start in range(0, len(keys), 500):
+                    part = keys[start:start + 500]
+                    rows = self._disk.execute(
+                        f"SELECT key, dim, vec FROM embeddings WHERE key IN ({','.join('?' * len(part))})",
+                        part,
+                    ).fetchall()
+                    for k, dim, blob in rows:
+                        vec = np.frombuffer(blob, dtype=np.float32).reshape(dim)
+                        self._remember(k, vec)
+                        for i in pending.pop(k):
+                            found[i] = vec
+                            self.hits += 1
+                            self.disk_hits += 1
+                    if rows:
+                        self._disk.execute(
+                            f"UPDATE embeddings SET last_used = ? WHERE key IN ({','.join('?' * len(rows))})",
+                            [time.time()] + [r[0] for r in rows],
+                        )
+                self._disk.commit()
+
+            self.misses += sum(len(v) for v in pending.values())
+        return found
+
+    def put_many(self, model_name: str, texts: list[str], vectors: np.ndarray):
+        now = time.time()
+        rows = []
+        with self._lock:
+            for text, vec in zip(texts, vectors):
+                k = self.key(model_name, text)
+                vec = np.asarray(vec, dtype=np.float32)
+                self._remember(k, vec)
+                rows.append((k, int(vec.shape[0]), vec.tobytes(), now))
+            if self._disk is not None and rows:
+                self._disk.executemany("INSERT OR REPLACE INTO embeddings(key, dim, vec, last_used) VALUES(?,?,?,?)", rows)
+                self._disk_writes += len(rows)
+                # Size-based eviction: checking on every write would cost a COUNT(*) each time
+                if self._disk_writes >= 1000:
+                    self._disk_writes = 0
+                    self._evict_disk()
+                self._disk.commit()
+
+    def _remember(self, k: str, vec: np.ndarray):
+        self._mem[k] = vec
+        self._mem.move_to_end(k)
+        while len(self._mem) > self.max_items:
+            self._mem.popitem(last=False)
+            self.evictions += 1
+
+    def _evict_disk(self):
+        (count,) = self._disk.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+        extra = count - self.max_disk_items
+        if extra > 0:
+            self._disk.execute(
+                "DELETE FROM embeddings WHERE key IN (SELECT key FROM embeddings ORDER BY last_used LIMIT ?)",
+                (extra,),
+            )
+            self.evictions += extra
+
+    def clear(self):
+        with self._lock:
+            self._mem.clear()
+            if self._disk is not None:
+                self._disk.execute("DELETE FROM embeddings")
+                self._disk.commit()
+
+    def close(self):
+        with self._lock:
+            if self._disk is not None:
+                self._disk.close()
+                self._disk = None
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "memory_items": len(self._mem),
+            "max_items": self.max_items,
+            "disk_enabled": self._disk is not None,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+_cache: EmbeddingCache | None = None
+_cache_lock = threading.Lock()
+
+
+def get_embedding_cache() -> EmbeddingCache:
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = EmbeddingCache(
+                    max_items=int(os.getenv("EMBED_CACHE_SIZE", "4096")),
+                    disk_path=os.getenv("EMBED_CACHE_PATH") or None,
+                    max_disk_items=int(os.getenv("EMBED_CACHE_DISK_MAX", "100000")),
+                )
+    return _cache
+
+
+def close_embedding_cache():
+    global _cache
+    with _cache_lock:
+        if _cache is not None:
+            _cache.close()
+            _cache = None
@@ -0,0 +1,258 @@
+import asyncio
+import json
+import logging
+import os
+import time
+import uuid
+from datetime import datetime
+
+from app.db import connection
+from app.services.concurrency import run_in_stage, stage_limit
+from app.services.digest import build_digest, delete_digests, store_digest
+from app.services.documents import lookup_document, register_document
+from app.services.metrics import observe_stage, stage
+from app.services.parsing import iter_pages
+from app.services.sessions import attach_document, detach_document
+from app.services.vectorstore import default_collection, default_embedder, delete_documents, upsert_document
+
+logger = logging.getLogger(__name__)
+
+JOB_COLUMNS = (
+    "job_id", "session_id", "doc_type", "doc_id", "file_path", "content_hash", "status", "stage",
+    "pages", "chunks", "stages_json", "error", "created_at", "updated_at",
+)
+
+
+def _insert_job(conn, session_id: str, doc_type: str, doc_id: str, file_path: str, content_hash: str) -> str:
+    job_id = uuid.uuid4().hex
+    now = datetime.utcnow().isoformat()
+    conn.execute(
+        "INSERT INTO ingest_jobs(job_id, session_id, doc_type, doc_id, file_path, content_hash, status, stage, "
+        "created_at, updated_at) VALUES(?,?,?,?,?,?,?,?,?,?)",
+        (job_id, session_id, doc_type, doc_id, file_path, content_hash, "queued", "queued", now, now),
+    )
+    return job_id
+
+
+def reserve_ingest(session_id: str, doc_type: str, doc_id: str, file_path: str, content_hash: str) -> tuple[str, dict]:
+    """
+    Dedup an upload and queue it in one IMMEDIATE transaction, so concurrent uploads of the
+    same bytes serialize here and only the first is ingested. Returns ("document", doc) for
+    an already-ingested copy, ("job", job) for one still queued or running, or ("created",
+    {"job_id", "doc_id"}) when a new job was queued for `doc_id`.
+    """
+    with connection() as conn:
+        # connection() rolls this back if anything raises
+        conn.execute("BEGIN IMMEDIATE")
+        result = _reserve(conn, session_id, doc_type, doc_id, file_path, content_hash)
+        conn.commit()
+    return result
+
+
+def _reserve(conn, session_id: str, doc_type: str, doc_id: str, file_path: str, content_hash: str) -> tuple[str, dict]:
+    existing = lookup_document(conn, content_hash, doc_type)
+    if existing:
+        return "document", existing
+    row = conn.execute(
+        "SELECT job_id, doc_id FROM ingest_jobs WHERE content_hash = ? AND doc_type = ? "
+        "AND status IN ('queued', 'running') ORDER BY created_at LIMIT 1",
+        (content_hash, doc_type),
+    ).fetchone()
+    if row:
+        return "job", {"job_id": row[0], "doc_id": row[1]}
+    job_id = _insert_job(conn, session_id, doc_type, doc_id, file_path, content_hash)
+    return "created", {"job_id": job_id, "doc_id": doc_id}
+
+
+def get_job(job_id: str) -> dict | None:
+    with connection() as conn:
+        row = conn.execute(f"SELECT {', '.join(JOB_COLUMNS)} FROM ingest_jobs WHERE job_id = ?", (job_id,)).fetchone()
+    if not row:
+        return None
+    job = dict(zip(JOB_COLUMNS, row))
+    job["stages"] = json.loads(job.pop("stages_json") or "{}")
+    return job
+
+
+def update_job(job_id: str, fields: dict, stages: dict | None = None):
+    fields = {**fields, "updated_at": datetime.utcnow().isoformat()}
+    if stages is not None:
+        fields["stages_json"] = json.dumps(stages)
+    with connection() as conn:
+        with conn:
+            conn.execute(
+                f"UPDATE ingest_jobs SET {', '.join(f'{k} = ?' for k in fields)} WHERE job_id = ?",
+                (*fields.values(), job_id),
+            )
+
+
+def pending_job_ids() -> list[str]:
+    """Jobs a previous process queued or was running when it stopped, oldest first."""
+    with connection() as conn:
+        rows = conn.execute(
+            "SELECT job_id FROM ingest_jobs WHERE status IN ('queued', 'running') ORDER BY created_at"
+        ).fetchall()
+    return [r[0] for r in rows]
+
+
+def _ingest(job: dict, stages: dict) -> tuple[int, int, dict]:
+    """
+    Streamed parse + embed for one job, then the document digest from the same page text.
+    Records per-stage seconds and page progress in `stages`.
+    """
+    parse = stages["parse"] = {"seconds": 0.0, "pages": 0}
+    embed = stages["embed"] = {"seconds": 0.0, "chunks": 0}
+    texts = []
+    last_report = time.monotonic()
+
+    def timed_pages():
+        nonlocal last_report
+        pages = iter_pages(job["file_path"], job["content_hash"])
+        while True:
+            t0 = time.perf_counter()
+            page = next(pages, None)
+            parse["seconds"] += time.perf_counter() - t0
+            if page is None:
+                return
+            observe_stage("parse", time.perf_counter() - t0)
+            texts.append(page["text"])
+            parse["pages"] += 1
+            if time.monotonic() - last_report > 0.5:
+                update_job(job["job_id"], {"pages": parse["pages"]}, stages)
+                last_report = time.monotonic()
+            yield page
+
+    t0 = time.perf_counter()
+    chunks = upsert_document(
+        default_collection(), default_embedder(),
+        doc_type=job["doc_type"], pages=timed_pages(), doc_id=job["doc_id"],
+    )
+    # Parsing and embedding interleave; whatever wasn't spent extracting pages was chunking/encoding/upserting
+    embed["seconds"] = time.perf_counter() - t0 - parse["seconds"]
+    embed["chunks"] = chunks
+
+    t0 = time.perf_counter()
+    with stage("digest"):
+        digest = build_digest("\n".join(texts), job["doc_type"])
+    stages["digest"] = {"seconds": time.perf_counter() - t0, "skills": len(digest["skills"])}
+    return parse["pages"], chunks, digest
+
+
+def _discard(job: dict):
+    delete_documents(default_collection(), [job["doc_id"]])
+    delete_digests([job["doc_id"]])
+    # Uploads of the same bytes that joined this job while it ran were attached up front
+    detach_document(job["doc_id"])
+    if os.path.exists(job["file_path"]):
+        os.remove(job["file_path"])
+
+
+async def run_job(job_id: str):
+    job = await run_in_stage("db", get_job, job_id)
+    if not job or job["status"] not in ("queued", "running"):
+        return
+    stages = job["stages"]
+    stages.setdefault("queued", {"seconds": (datetime.utcnow() - datetime.fromisoformat(job["created_at"])).total_seconds()})
+    await run_in_stage("db", update_job, job_id, {"status": "running", "stage": "ingest"}, stages)
+    try:
+        # Parse and embed overlap as one streamed step, so it holds a slot in both stages
+        async with stage_limit("parse"):
+            pages, chunks, digest = await run_in_stage("embed", _ingest, job, stages)
+        await run_in_stage("db", update_job, job_id, {"stage": "register", "pages": pages, "chunks": chunks}, stages)
+
+        t0 = time.perf_counter()
+        with stage("db_write"):
+            await run_in_stage(
+                "db", register_document,
+                job["content_hash"], job["doc_type"], job["doc_id"], job["file_path"], pages, chunks,
+            )
+            await run_in_stage("db", store_digest, job["doc_id"], job["doc_type"], digest)
+            await run_in_stage("db", attach_document, job["session_id"], job["doc_type"], job["doc_id"])
+        stages["register"] = {"seconds": time.perf_counter() - t0}
+        await run_in_stage("db", update_job, job_id, {"status": "done", "stage": "done"}, stages)
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        logger.exception("ingest job %s failed", job_id)
+        await run_in_stage("db", update_job, job_id, {"status": "failed", "error": str(e)}, stages)
+        await run_in_stage("db", _discard, job)
+
+
+class IngestQueue:
+    """
+    Pool of asyncio workers draining ingestion jobs. Job state lives in SQLite, so the queue
+    itself can be rebuilt from pending_job_ids() after a restart.
+    """
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self._queue: asyncio.Queue[str] = asyncio.Queue()
+        self._done: dict[str, asyncio.Event] = {}
+        self._tasks: list[asyncio.Task] = []
+        self.completed = 0
+
+    def start(self):
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        # Jobs still running stay 'running' in the table and are resumed on next startup
+        for t in self._tasks:
+            t.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def submit(self, job_id: str):
+        self._done.setdefault(job_id, asyncio.Event())
+        self._queue.put_nowait(job_id)
+
+    async def wait(self, job_id: str):
+        event = self._done.get(job_id)
+        if event is not None:
+            await event.wait()
+
+    async def _worker(self):
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await run_job(job_id)
+            except Exception:
+                logger.exception("ingest worker error on job %s", job_id)
+            finally:
+                self.completed += 1
+                event = self._done.pop(job_id, None)
+                if event is not None:
+                    event.set()
+
+    def stats(self) -> dict:
+        return {"workers": self.workers, "queued": self._queue.qsize(), "completed": self.completed}
+
+
+_queue: IngestQueue | None = None
+
+
+async def start_ingest_workers():
+    """Start the worker pool and re-queue jobs left unfinished by the previous process."""
+    global _queue
+    _queue = IngestQueue(int(os.getenv("INGEST_WORKERS", "2")))
+    _queue.start()
+    for job_id in await run_in_stage("db", pending_job_ids):
+        _queue.submit(job_id)
+
+
+async def stop_ingest_workers():
+    global _queue
+    if _queue is not None:
+        await _queue.stop()
+        _queue = None
+
+
+def submit_job(job_id: str):
+    _queue.submit(job_id)
+
+
+async def wait_for_job(job_id: str):
+    await _queue.wait(job_id)
+
+
+def ingest_stats() -> dict:
+    return _queue.stats() if _queue is not None else {"workers": 0}
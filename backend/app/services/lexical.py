@@ -0,0 +1,135 @@
+import math
+import os
+import re
+import sqlite3
+import threading
+from collections import Counter
+
+# Keeps skill-style tokens whole: "c++", "c#", "node.js", "ci/cd" -> "ci", "cd"
+TOKEN_RE = re.compile(r"[a-z0-9][a-z0-9+#]*(?:\.[a-z0-9]+)*")
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or that the this to was were will with "
+    "you your we our i my me they their he she his her them us".split()
+)
+
+
+def tokenize(text: str) -> list[str]:
+    return [t for t in TOKEN_RE.findall((text or "").lower()) if t not in STOPWORDS]
+
+
+class BM25Index:
+    """
+    Persistent BM25 inverted index over chunk ids, stored in SQLite next to the Chroma data.
+
+    postings(term, chunk_id, tf) + per-term document frequency + per-chunk length, so scoring a
+    query only touches the postings of its own terms. Chunks carry doc_id/source so searches
+    can be restricted to one session's documents like the vector search.
+    """
+
+    def __init__(self, path: str, k1: float = 1.2, b: float = 0.75):
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._conn.executescript("""
+        PRAGMA journal_mode=WAL;
+        PRAGMA synchronous=NORMAL;
+        CREATE TABLE IF NOT EXISTS chunks (id TEXT PRIMARY KEY, doc_id TEXT, source TEXT, length INTEGER);
+        CREATE INDEX IF NOT EXISTS idx_chunks_doc ON chunks(doc_id);
+        CREATE TABLE IF NOT EXISTS postings (term TEXT, chunk_id TEXT, tf INTEGER, PRIMARY KEY (term, chunk_id)) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS idx_postings_chunk ON postings(chunk_id);
+        CREATE TABLE IF NOT EXISTS terms (term TEXT PRIMARY KEY, df INTEGER) WITHOUT ROWID;
+        """)
+        self.queries = 0
+
+    def add(self, ids: list[str], texts: list[str], metadatas: list[dict]):
+        with self._lock, self._conn:
+            self._remove(ids)
+            for cid, text, meta in zip(ids, texts, metadatas):
+                tf = Counter(tokenize(text))
+                self._conn.execute(
+                    "INSERT INTO chunks(id, doc_id, source, length) VALUES(?,?,?,?)",
+                    (cid, meta.get("doc_id"), meta.get("source"), sum(tf.values())),
+                )
+                self._conn.executemany("INSERT INTO postings(term, chunk_id, tf) VALUES(?,?,?)", [(t, cid, n) for t, n in tf.items()])
+                self._conn.executemany(
+                    "INSERT INTO terms(term, df) VALUES(?, 1) ON CONFLICT(term) DO UPDATE SET df = df + 1",
+                    [(t,) for t in tf],
+                )
+
+    def delete_documents(self, doc_ids: list[str]):
+        if not doc_ids:
+            return
+        with self._lock, self._conn:
+            marks = ",".join("?" * len(doc_ids))
+            ids = [r[0] for r in self._conn.execute(f"SELECT id FROM chunks WHERE doc_id IN ({marks})", doc_ids)]
+            self._remove(ids)
+
+    def _remove(self, ids: list[str]):
+        for i in range(0, len(ids), 500):
+            batch = ids[i:i + 500]
+            marks = ",".join("?" * len(batch))
+            terms = self._conn.execute(
+                f"SELECT term, COUNT(*) FROM postings WHERE chunk_id IN ({marks}) GROUP BY term", batch
+            ).fetchall()
+            if not terms:
+                self._conn.execute(f"DELETE FROM chunks WHERE id IN ({marks})", batch)
+                continue
+            self._conn.executemany("UPDATE terms SET df = df - ? WHERE term = ?", [(n, t) for t, n in terms])
+            self._conn.execute("DELETE FROM terms WHERE df <= 0")
+            self._conn.execute(f"DELETE FROM postings WHERE chunk_id IN ({marks})", batch)
+            self._conn.execute(f"DELETE FROM chunks WHERE id IN ({marks})", batch)
+
+    def search(self, text: str, k: int, source_filter: str | None = None, doc_ids: list[str] | None = None) -> list[tuple[str, float]]:
+        """Top-k (chunk_id, score) for `text`, best first."""
+        terms = sorted(set(tokenize(text)))
+        if not terms or (doc_ids is not None and not doc_ids):
+            return []
+        with self._lock:
+            self.queries += 1
+            n, total = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(length), 0) FROM chunks").fetchone()
+            if not n:
+                return []
+            avgdl = total / n
+            marks = ",".join("?" * len(terms))
+            df = dict(self._conn.execute(f"SELECT term, df FROM terms WHERE term IN ({marks})", terms))
+            sql = (
+                "SELECT p.chunk_id, p.term, p.tf, c.length FROM postings p JOIN chunks c ON c.id = p.chunk_id "
+                f"WHERE p.term IN ({marks})"
+            )
+            params: list = list(terms)
+            if source_filter:
+                sql += " AND c.source = ?"
+                params.append(source_filter)
+            if doc_ids is not None:
+                sql += f" AND c.doc_id IN ({','.join('?' * len(doc_ids))})"
+                params.extend(doc_ids)
+            rows = self._conn.execute(sql, params).fetchall()
+
+        scores: dict[str, float] = {}
+        for cid, term, tf, length in rows:
+            idf = math.log(1 + (n - df[term] + 0.5) / (df[term] + 0.5))
+            norm = tf * (self.k1 + 1) / (tf + self.k1 * (1 - self.b + self.b * length / avgdl))
+            scores[cid] = scores.get(cid, 0.0) + idf * norm
+        return sorted(scores.items(), key=lambda kv: -kv[1])[:k]
+
+    def stats(self) -> dict:
+        with self._lock:
+            chunks = self._conn.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+            terms = self._conn.execute("SELECT COUNT(*) FROM terms").fetchone()[0]
+        return {"path": self.path, "chunks": chunks, "terms": terms, "queries": self.queries}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def reciprocal_rank_fusion(rankings: list[list[str]], k: int = 60) -> list[tuple[str, float]]:
+    """Merge ranked id lists: score(id) = sum over lists of 1 / (k + rank)."""
+    scores: dict[str, float] = {}
+    for ranking in rankings:
+        for rank, cid in enumerate(ranking, start=1):
+            scores[cid] = scores.get(cid, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda kv: -kv[1])
@@ -1,17 +1,71 @@
+import asyncio
 import os
 import json
-from typing import Any, Dict, Union, Optional
+import threading
+import time
+from typing import Any, AsyncIterator, Dict, Iterator, Union, Optional
 
+import httpx
 from dotenv import load_dotenv
-from openai import OpenAI
+
+from app.services.llm_backends import backend_kind, default_model_name, make_backend
+from app.services.concurrency import run_in_stage
+from app.services.llmcache import get_llm_cache, llm_cache_enabled
+from app.services.metrics import inc, observe_stage
+from app.services.resilience import CircuitBreaker, RateLimiter, backoff_delay
 
 load_dotenv()
 
-# Initialize OpenAI client using environment variable
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+# Client tuning (see README "Backend tuning")
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "30"))            # per attempt
+LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "5"))
+LLM_DEADLINE = float(os.getenv("LLM_DEADLINE", "60"))          # per call, across retries
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+LLM_BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", "0.5"))
+LLM_BACKOFF_CAP = float(os.getenv("LLM_BACKOFF_CAP", "8"))
+LLM_EXPECTED_COMPLETION_TOKENS = int(os.getenv("LLM_EXPECTED_COMPLETION_TOKENS", "600"))
+
+
+def _http_limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=int(os.getenv("LLM_MAX_CONNECTIONS", "64")),
+        max_keepalive_connections=int(os.getenv("LLM_MAX_KEEPALIVE", "32")),
+        keepalive_expiry=float(os.getenv("LLM_KEEPALIVE_EXPIRY", "30")),
+    )
+
+
+# Backend selected by LLM_BACKEND: openai (default), local (OpenAI-compatible server) or stub.
+# Built on first use so importing the app doesn't import the openai SDK.
+_backend = None
+_backend_lock = threading.Lock()
 
 # Default model (good balance of speed/cost/quality)
-DEFAULT_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+DEFAULT_MODEL = default_model_name()
+
+limiter = RateLimiter(
+    requests_per_min=float(os.getenv("LLM_RPM", "0")),
+    tokens_per_min=float(os.getenv("LLM_TPM", "0")),
+)
+breaker = CircuitBreaker(
+    failure_threshold=int(os.getenv("LLM_BREAKER_THRESHOLD", "5")),
+    reset_timeout=float(os.getenv("LLM_BREAKER_RESET", "30")),
+)
+_client_stats = {"calls": 0, "retries": 0, "failures": 0, "throttled_seconds": 0.0}
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                _backend = make_backend(
+                    timeout=httpx.Timeout(LLM_TIMEOUT, connect=LLM_CONNECT_TIMEOUT), limits=_http_limits()
+                )
+    return _backend
+
+
+def backend_loaded() -> bool:
+    return _backend is not None
 
 
 def call_llm(
@@ -20,19 +74,291 @@ def call_llm(
     model: str = DEFAULT_MODEL,
     temperature: float = 0.2,
     json_mode: bool = True,
-) -> Union[str, Dict[str, Any]]:
+    use_cache: bool = True,
+    stream: bool = False,
+    timeout: Optional[float] = None,
+) -> Union[str, Dict[str, Any], Iterator[str]]:
     """
-    Call OpenAI with a prompt.
+    Call the configured LLM backend (OpenAI by default) with a prompt.
 
     - If json_mode=True: forces the model to return VALID JSON and returns a dict.
     - If json_mode=False: returns plain text string.
+    - If stream=True: returns an iterator of raw text deltas instead (the caller parses them).
+    - use_cache=False skips the response cache (when LLM_CACHE_ENABLED=1) for this call.
+    - timeout: overall deadline in seconds for this call including retries (default LLM_DEADLINE).
 
     This is safer for production apps, especially for demo stability.
     """
+    messages = _messages(prompt)
+
+    cache, key = _cache_for(prompt, model, temperature, json_mode, use_cache)
+    cached = cache.get(key) if cache else None
+    if cached is not None:
+        return iter([cached]) if stream else _parse(cached, json_mode)
+
+    kwargs: Dict[str, Any] = {"model": model, "messages": messages, "temperature": temperature}
+    # JSON Mode (recommended for your question generation + scoring)
+    if json_mode:
+        kwargs["response_format"] = {"type": "json_object"}  # forces valid JSON
+
+    if stream:
+        return _iter_deltas(cache, key, model, kwargs, timeout)
+
+    t0 = time.perf_counter()
+    resp = _create(kwargs, timeout)
+    content = resp.choices[0].message.content or ""
+    _store(cache, key, model, content, resp.usage, time.perf_counter() - t0)
+    return _parse(content, json_mode)
+
+
+async def acall_llm(
+    prompt: str,
+    *,
+    model: str = DEFAULT_MODEL,
+    temperature: float = 0.2,
+    json_mode: bool = True,
+    use_cache: bool = True,
+    stream: bool = False,
+    timeout: Optional[float] = None,
+) -> Union[str, Dict[str, Any], AsyncIterator[str]]:
+    """
+    Async variant of call_llm (same arguments and return values).
+
+    Uses AsyncOpenAI so waiting on the completion doesn't hold a threadpool worker.
+    With stream=True the awaited result is an async iterator of text deltas.
+    """
+    messages = _messages(prompt)
+
+    # The cache is SQLite: open, read and write it off the event loop
+    cache, key, cached = None, None, None
+    if use_cache and llm_cache_enabled():
+        cache, key, cached = await run_in_stage("db", _lookup, prompt, model, temperature, json_mode)
+    if cached is not None:
+        return _aiter_once(cached) if stream else _parse(cached, json_mode)
+
+    kwargs: Dict[str, Any] = {"model": model, "messages": messages, "temperature": temperature}
+    if json_mode:
+        kwargs["response_format"] = {"type": "json_object"}
+
+    if stream:
+        return _aiter_deltas(cache, key, model, kwargs, timeout)
+
+    t0 = time.perf_counter()
+    resp = await _acreate(kwargs, timeout)
+    content = resp.choices[0].message.content or ""
+    await _astore(cache, key, model, content, resp.usage, time.perf_counter() - t0)
+    return _parse(content, json_mode)
+
+
+def _iter_deltas(cache, key, model: str, kwargs: Dict[str, Any], timeout: Optional[float]) -> Iterator[str]:
+    t0 = time.perf_counter()
+    parts, usage = [], None
+    kwargs = {**kwargs, "stream": True, "stream_options": {"include_usage": True}}
+    for chunk in _create(kwargs, timeout):
+        usage = chunk.usage or usage
+        delta = chunk.choices[0].delta.content if chunk.choices else None
+        if delta:
+            parts.append(delta)
+            yield delta
+    _store(cache, key, model, "".join(parts), usage, time.perf_counter() - t0)
+
+
+async def _aiter_deltas(cache, key, model: str, kwargs: Dict[str, Any], timeout: Optional[float]) -> AsyncIterator[str]:
+    t0 = time.perf_counter()
+    parts, usage = [], None
+    kwargs = {**kwargs, "stream": True, "stream_options": {"include_usage": True}}
+    async for chunk in await _acreate(kwargs, timeout):
+        usage = chunk.usage or usage
+        delta = chunk.choices[0].delta.content if chunk.choices else None
+        if delta:
+            parts.append(delta)
+            yield delta
+    await _astore(cache, key, model, "".join(parts), usage, time.perf_counter() - t0)
+
+
+async def _aiter_once(content: str) -> AsyncIterator[str]:
+    yield content
+
+
+def _estimate_tokens(kwargs: Dict[str, Any]) -> int:
+    # ~4 characters per token for English prompts, plus the completion we expect back
+    chars = sum(len(m["content"]) for m in kwargs["messages"])
+    return chars // 4 + LLM_EXPECTED_COMPLETION_TOKENS
+
+
+def _retry_after(exc: Exception) -> Optional[float]:
+    response = getattr(exc, "response", None)
+    value = response.headers.get("retry-after") if response is not None else None
+    try:
+        return float(value) if value else None
+    except ValueError:
+        return None
+
+
+def _is_retryable(exc: Exception) -> bool:
+    import openai
+
+    if isinstance(exc, (openai.APIConnectionError, openai.RateLimitError)):  # includes timeouts
+        return True
+    return isinstance(exc, openai.APIStatusError) and exc.status_code >= 500
+
+
+def _next_delay(exc: Exception, attempt: int, started: float, deadline: float) -> Optional[float]:
+    """Seconds to wait before retrying `exc`, or None if the error should be raised."""
+    import openai
+
+    if not _is_retryable(exc):
+        # Only an HTTP 4xx proves the upstream is healthy; anything else (a local bug, a decode
+        # error) says nothing about it, and the caller's finally just releases a trial slot
+        if isinstance(exc, openai.APIStatusError) and exc.status_code < 500:
+            breaker.record_success()
+        return None
+
+    # 429s are a quota signal, not an outage: back off but don't trip the breaker
+    if not isinstance(exc, openai.RateLimitError):
+        breaker.record_failure()
+    _client_stats["failures"] += 1
+    if attempt >= LLM_MAX_RETRIES:
+        return None
+    delay = backoff_delay(attempt, LLM_BACKOFF_BASE, LLM_BACKOFF_CAP, _retry_after(exc))
+    if time.monotonic() - started + delay >= deadline:
+        return None
+    _client_stats["retries"] += 1
+    return delay
+
+
+def _attempt_timeout(started: float, deadline: float) -> float:
+    remaining = deadline - (time.monotonic() - started)
+    if remaining <= 0:
+        import openai
+
+        raise openai.APITimeoutError(request=httpx.Request("POST", "chat/completions"))
+    return min(LLM_TIMEOUT, remaining)
+
+
+def _create(kwargs: Dict[str, Any], timeout: Optional[float]):
+    """chat.completions.create with rate limiting, circuit breaking, deadlines and jittered retries."""
+    backend = get_backend()
+    if not backend.remote:
+        return backend.create(LLM_TIMEOUT, **kwargs)
+    deadline = timeout or LLM_DEADLINE
+    started = time.monotonic()
+    estimate = _estimate_tokens(kwargs)
+    for attempt in range(LLM_MAX_RETRIES + 1):
+        trial = breaker.before_call()
+        try:
+            wait = limiter.reserve(estimate)
+            if wait:
+                _client_stats["throttled_seconds"] += wait
+                time.sleep(min(wait, max(0.0, deadline - (time.monotonic() - started))))
+            # Running out of our own deadline is raised as-is: it says nothing about the upstream
+            attempt_timeout = _attempt_timeout(started, deadline)
+            _client_stats["calls"] += 1
+            try:
+                resp = backend.create(attempt_timeout, **kwargs)
+            except Exception as e:
+                delay = _next_delay(e, attempt, started, deadline)
+                if delay is None:
+                    raise
+            else:
+                breaker.record_success()
+                _settle(estimate, resp)
+                return resp
+        finally:
+            breaker.release(trial)
+        time.sleep(delay)
+
+
+async def _acreate(kwargs: Dict[str, Any], timeout: Optional[float]):
+    """Async twin of _create."""
+    backend = get_backend()
+    if not backend.remote:
+        return await backend.acreate(LLM_TIMEOUT, **kwargs)
+    deadline = timeout or LLM_DEADLINE
+    started = time.monotonic()
+    estimate = _estimate_tokens(kwargs)
+    for attempt in range(LLM_MAX_RETRIES + 1):
+        trial = breaker.before_call()
+        try:
+            wait = limiter.reserve(estimate)
+            if wait:
+                _client_stats["throttled_seconds"] += wait
+                await asyncio.sleep(min(wait, max(0.0, deadline - (time.monotonic() - started))))
+            # Running out of our own deadline is raised as-is: it says nothing about the upstream
+            attempt_timeout = _attempt_timeout(started, deadline)
+            _client_stats["calls"] += 1
+            try:
+                resp = await backend.acreate(attempt_timeout, **kwargs)
+            except Exception as e:
+                delay = _next_delay(e, attempt, started, deadline)
+                if delay is None:
+                    raise
+            else:
+                breaker.record_success()
+                _settle(estimate, resp)
+                return resp
+        finally:
+            breaker.release(trial)
+        await asyncio.sleep(delay)
+
+
+def _settle(estimate: int, resp):
+    # Streams report usage in their last chunk; only whole responses can be reconciled here
+    usage = getattr(resp, "usage", None)
+    if usage is not None:
+        limiter.settle(estimate, int(getattr(usage, "total_tokens", 0) or 0))
+
+
+def llm_client_stats() -> dict:
+    return {
+        "backend": backend_kind(),
+        **_client_stats,
+        "throttled_seconds": round(_client_stats["throttled_seconds"], 3),
+        "breaker_state": breaker.state,
+        "consecutive_failures": breaker.failures,
+    }
+
+
+def _cache_for(prompt: str, model: str, temperature: float, json_mode: bool, use_cache: bool):
+    cache = get_llm_cache() if use_cache else None
+    if cache is None:
+        return None, None
+    return cache, cache.key(model, temperature, json_mode, prompt)
+
+
+def _lookup(prompt: str, model: str, temperature: float, json_mode: bool):
+    cache, key = _cache_for(prompt, model, temperature, json_mode, True)
+    return cache, key, cache.get(key) if cache else None
+
+
+async def _astore(cache, key, model: str, content: str, usage, latency: float):
+    if cache and content:
+        await run_in_stage("db", _store, cache, key, model, content, usage, latency)
+    else:
+        _store(None, key, model, content, usage, latency)
+
+
+def _store(cache, key, model: str, content: str, usage, latency: float):
+    # Every completed (non-cached) call ends here, streamed or not: record latency and token usage
+    observe_stage("llm", latency)
+    if usage is not None:
+        inc("llm_tokens_total", int(getattr(usage, "prompt_tokens", 0) or 0), model=model, kind="prompt")
+        inc("llm_tokens_total", int(getattr(usage, "completion_tokens", 0) or 0), model=model, kind="completion")
+    if cache and content:
+        cache.put(key, model, content, latency, int(getattr(usage, "total_tokens", 0) or 0))
+
+
+def _parse(content: str, json_mode: bool) -> Union[str, Dict[str, Any]]:
+    if json_mode:
+        return json.loads(content or "{}")
+    return content
+
+
+def _messages(prompt: str) -> list[dict]:
     if not prompt or not isinstance(prompt, str):
         raise ValueError("prompt must be a non-empty string")
 
-    messages = [
+    return [
         {
             "role": "system",
             "content": (
@@ -43,25 +369,6 @@ def call_llm(
         {"role": "user", "content": prompt},
     ]
 
-    # JSON Mode (recommended for your question generation + scoring)
-    if json_mode:
-        resp = client.chat.completions.create(
-            model=model,
-            messages=messages,
-            temperature=temperature,
-            response_format={"type": "json_object"},  # forces valid JSON
-        )
-        content = resp.choices[0].message.content or "{}"
-        return json.loads(content)
-
-    # Normal text mode
-    resp = client.chat.completions.create(
-        model=model,
-        messages=messages,
-        temperature=temperature,
-    )
-    return resp.choices[0].message.content or ""
-
 
 def safe_json(text: str) -> Dict[str, Any]:
     """
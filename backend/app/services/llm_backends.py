@@ -0,0 +1,229 @@
+import asyncio
+import hashlib
+import json
+import os
+import re
+import time
+from typing import TYPE_CHECKING, Any, AsyncIterator, Dict, Iterator
+
+import httpx
+
+# The openai SDK is imported when a backend first needs it, not when the app is imported
+if TYPE_CHECKING:
+    from openai.types.chat import ChatCompletion, ChatCompletionChunk
+
+
+class OpenAIBackend:
+    """
+    OpenAI, or any server speaking the OpenAI chat completions protocol (vLLM, llama.cpp,
+    Ollama, LM Studio, ...). Remote: calls go through the limiter, breaker and retries in llm.py.
+    """
+
+    remote = True
+
+    def __init__(
+        self,
+        name: str,
+        default_model: str,
+        api_key: str | None,
+        base_url: str | None,
+        timeout: httpx.Timeout,
+        limits: httpx.Limits,
+        stream_usage: bool = True,
+    ):
+        self.name = name
+        self.default_model = default_model
+        self.stream_usage = stream_usage
+        from openai import OpenAI, AsyncOpenAI, DefaultHttpxClient, DefaultAsyncHttpxClient
+
+        # Retries are handled in llm.py (jittered, deadline-aware, circuit-broken),
+        # so the SDK's own retry loop is disabled.
+        kwargs = dict(api_key=api_key, base_url=base_url, timeout=timeout, max_retries=0)
+        self.client = OpenAI(http_client=DefaultHttpxClient(limits=limits), **kwargs)
+        self.async_client = AsyncOpenAI(http_client=DefaultAsyncHttpxClient(limits=limits), **kwargs)
+
+    def _prepare(self, kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        if kwargs.get("stream") and not self.stream_usage:
+            kwargs = {k: v for k, v in kwargs.items() if k != "stream_options"}
+        return kwargs
+
+    def create(self, timeout: float, **kwargs):
+        return self.client.chat.completions.create(timeout=timeout, **self._prepare(kwargs))
+
+    async def acreate(self, timeout: float, **kwargs):
+        return await self.async_client.chat.completions.create(timeout=timeout, **self._prepare(kwargs))
+
+
+class StubBackend:
+    """
+    Deterministic in-process backend for offline benchmarks and CI perf runs.
+
+    Returns schema-valid JSON for QUESTION_PROMPT and SCORE_PROMPT derived only from the
+    prompt text, so identical prompts always produce identical completions.
+    """
+
+    remote = False
+    name = "stub"
+    default_model = "stub"
+
+    def __init__(self, latency: float = 0.0, stream_chunk_chars: int = 8):
+        self.latency = latency
+        self.stream_chunk_chars = stream_chunk_chars
+
+    def create(self, timeout: float, **kwargs):
+        if self.latency:
+            time.sleep(self.latency)
+        content = stub_completion(kwargs["messages"][-1]["content"], "response_format" in kwargs)
+        if kwargs.get("stream"):
+            return self._chunks(kwargs, content)
+        return _completion(kwargs, content)
+
+    async def acreate(self, timeout: float, **kwargs):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        content = stub_completion(kwargs["messages"][-1]["content"], "response_format" in kwargs)
+        if kwargs.get("stream"):
+            return _aiter(self._chunks(kwargs, content))
+        return _completion(kwargs, content)
+
+    def _chunks(self, kwargs: Dict[str, Any], content: str) -> Iterator["ChatCompletionChunk"]:
+        step = self.stream_chunk_chars
+        for i in range(0, len(content), step):
+            yield _chunk(kwargs, {"content": content[i:i + step]}, None)
+        yield _chunk(kwargs, {}, "stop", usage=_usage(kwargs, content))
+
+
+QUESTION_TYPES = ["technical", "behavioral", "project", "general"]
+BREAKDOWN_KEYS = ["relevance", "clarity", "technical_correctness", "structure", "impact"]
+
+
+def _field(prompt: str, name: str) -> str:
+    m = re.search(rf"^{name}:[ \t]*(.*)$", prompt, flags=re.MULTILINE)
+    return m.group(1).strip() if m else ""
+
+
+def _context_terms(prompt: str, limit: int = 8) -> list[str]:
+    context = prompt.split("CONTEXT:", 1)[1] if "CONTEXT:" in prompt else ""
+    terms = []
+    for word in re.findall(r"[A-Za-z][A-Za-z0-9+#.\-]{2,}", context):
+        if (word[0].isupper() or any(ch.isdigit() for ch in word)) and word not in terms:
+            terms.append(word)
+        if len(terms) == limit:
+            break
+    return terms
+
+
+def stub_completion(prompt: str, json_mode: bool = True) -> str:
+    """The stub's answer to `prompt`; also used by benchmarks/fake_openai.py."""
+    seed = int(hashlib.sha256(prompt.encode("utf-8")).hexdigest(), 16)
+
+    if "interview evaluator" in prompt:
+        answer = _field(prompt, "ANSWER")
+        words = len(answer.split())
+        # Longer, more specific answers score higher; the hash adds stable variety
+        base = 1 if words < 10 else 2 if words < 40 else 3
+        breakdown = {k: min(5, base + (seed >> (i * 3)) % 3) for i, k in enumerate(BREAKDOWN_KEYS)}
+        return json.dumps({
+            "breakdown": breakdown,
+            "strengths": ["Answers the question asked.", "Stays relevant to the role."],
+            "improvements": ["Add a concrete, measurable outcome.", "Name the specific tools you used."],
+            "improved_answer": (
+                f"In a recent project I faced a similar problem. {answer[:200]} "
+                "I measured the result and shared what I learned with the team."
+            ).strip(),
+        })
+
+    if "Generate interview questions" in prompt:
+        role = _field(prompt, "ROLE") or "this role"
+        terms = _context_terms(prompt) or ["your main project"]
+        questions = []
+        for i in range(8):
+            qtype = QUESTION_TYPES[(seed + i) % len(QUESTION_TYPES)]
+            term = terms[i % len(terms)]
+            questions.append({"type": qtype, "question": f"As a {role} candidate, how have you used {term}? (Q{i + 1})"})
+        return json.dumps({"questions": questions})
+
+    return "{}" if json_mode else f"stub response ({seed % 10_000})"
+
+
+def _usage(kwargs: Dict[str, Any], content: str) -> dict:
+    prompt_tokens = sum(len(m["content"]) for m in kwargs["messages"]) // 4
+    completion_tokens = len(content) // 4
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens,
+    }
+
+
+def _completion(kwargs: Dict[str, Any], content: str) -> "ChatCompletion":
+    from openai.types.chat import ChatCompletion
+
+    return ChatCompletion.model_validate({
+        "id": "stub",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": kwargs.get("model", "stub"),
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+        "usage": _usage(kwargs, content),
+    })
+
+
+def _chunk(kwargs: Dict[str, Any], delta: dict, finish_reason: str | None, usage: dict | None = None) -> "ChatCompletionChunk":
+    from openai.types.chat import ChatCompletionChunk
+
+    return ChatCompletionChunk.model_validate({
+        "id": "stub",
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": kwargs.get("model", "stub"),
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+        "usage": usage,
+    })
+
+
+async def _aiter(items: Iterator) -> AsyncIterator:
+    for item in items:
+        yield item
+
+
+def backend_kind() -> str:
+    kind = os.getenv("LLM_BACKEND", "openai").lower()
+    if kind not in ("openai", "local", "stub"):
+        raise ValueError(f"Unknown LLM_BACKEND: {kind!r} (expected openai, local or stub)")
+    return kind
+
+
+def default_model_name() -> str:
+    """Default model of the configured backend, known without constructing it."""
+    kind = backend_kind()
+    if kind == "stub":
+        return StubBackend.default_model
+    if kind == "local":
+        return os.getenv("LOCAL_LLM_MODEL", "llama3.1:8b")
+    return os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+
+
+def make_backend(timeout: httpx.Timeout, limits: httpx.Limits):
+    """Build the backend selected by LLM_BACKEND (openai | local | stub)."""
+    kind = backend_kind()
+    if kind == "stub":
+        return StubBackend(latency=float(os.getenv("STUB_LLM_LATENCY_MS", "0")) / 1000)
+    if kind == "local":
+        return OpenAIBackend(
+            name="local",
+            default_model=default_model_name(),
+            api_key=os.getenv("LOCAL_LLM_API_KEY", "local"),
+            base_url=os.getenv("LOCAL_LLM_BASE_URL", "http://127.0.0.1:11434/v1"),
+            timeout=timeout,
+            limits=limits,
+            stream_usage=os.getenv("LOCAL_LLM_STREAM_USAGE", "0") == "1",
+        )
+    return OpenAIBackend(
+        name="openai",
+        default_model=default_model_name(),
+        api_key=os.getenv("OPENAI_API_KEY"),
+        base_url=os.getenv("OPENAI_BASE_URL") or None,
+        timeout=timeout,
+        limits=limits,
+    )
@@ -0,0 +1,145 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+
+class LLMCache:
+    """
+    SQLite-backed cache of raw LLM completions keyed by (model, temperature, json_mode, prompt hash).
+
+    Entries expire after `ttl` seconds; past `max_entries` the least recently used rows are evicted.
+    Each entry remembers the latency and token usage of the original call so hits can report
+    what they saved.
+    """
+
+    def __init__(self, path: str, ttl: float = 86400, max_entries: int = 5000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._writes = 0
+        self.hits = 0
+        self.misses = 0
+        self.saved_seconds = 0.0
+        self.saved_tokens = 0
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+        CREATE TABLE IF NOT EXISTS llm_cache (
+            key TEXT PRIMARY KEY,
+            model TEXT,
+            content TEXT,
+            latency REAL,
+            tokens INTEGER,
+            created_at REAL,
+            last_used REAL
+        )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_last_used ON llm_cache(last_used)")
+        self._conn.commit()
+
+    @staticmethod
+    def key(model: str, temperature: float, json_mode: bool, prompt: str) -> str:
+        prompt_hash = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+        return f"{model}|{temperature:.4f}|{int(json_mode)}|{prompt_hash}"
+
+    def get(self, key: str) -> str | None:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT content, latency, tokens, created_at FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or now - row[3] > self.ttl:
+                if row is not None:
+                    self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                    self._conn.commit()
+                self.misses += 1
+                return None
+            content, latency, tokens, _ = row
+            self._conn.execute("UPDATE llm_cache SET last_used = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+            self.saved_seconds += latency or 0.0
+            self.saved_tokens += tokens or 0
+            return content
+
+    def put(self, key: str, model: str, content: str, latency: float, tokens: int):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache(key, model, content, latency, tokens, created_at, last_used) VALUES(?,?,?,?,?,?,?)",
+                (key, model, content, latency, tokens, now, now),
+            )
+            self._writes += 1
+            if self._writes >= 100:
+                self._writes = 0
+                self._evict(now)
+            self._conn.commit()
+
+    def _evict(self, now: float):
+        self._conn.execute("DELETE FROM llm_cache WHERE created_at < ?", (now - self.ttl,))
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()
+        extra = count - self.max_entries
+        if extra > 0:
+            self._conn.execute(
+                "DELETE FROM llm_cache WHERE key IN (SELECT key FROM llm_cache ORDER BY last_used LIMIT ?)",
+                (extra,),
+            )
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def stats(self) -> dict:
+        with self._lock:
+            (entries,) = self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "enabled": True,
+            "entries": entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "saved_seconds": round(self.saved_seconds, 3),
+            "saved_tokens": self.saved_tokens,
+        }
+
+
+_cache: LLMCache | None = None
+_cache_lock = threading.Lock()
+
+
+def llm_cache_enabled() -> bool:
+    return os.getenv("LLM_CACHE_ENABLED", "0") == "1"
+
+
+def get_llm_cache() -> LLMCache | None:
+    """The shared cache, or None unless LLM_CACHE_ENABLED=1 (the cache is opt-in)."""
+    global _cache
+    if not llm_cache_enabled():
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                data_dir = os.getenv("DATA_DIR", "backend/app/data")
+                _cache = LLMCache(
+                    path=os.getenv("LLM_CACHE_PATH", os.path.join(data_dir, "llm_cache.db")),
+                    ttl=float(os.getenv("LLM_CACHE_TTL", "86400")),
+                    max_entries=int(os.getenv("LLM_CACHE_MAX", "5000")),
+                )
+    return _cache
+
+
+def close_llm_cache():
+    global _cache
+    with _cache_lock:
+        if _cache is not None:
+            _cache.close()
+            _cache = None
+
+
+def llm_cache_stats() -> dict:
+    cache = get_llm_cache()
+    return cache.stats() if cache else {"enabled": False}
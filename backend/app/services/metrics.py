@@ -0,0 +1,138 @@
+import contextvars
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+PREFIX = "interview_"
+
+# Upper bounds in seconds: a cached lookup (~1 ms) up to a slow LLM call
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_lock = threading.Lock()
+_histograms: dict[str, dict[tuple, "Histogram"]] = {}
+_counters: dict[str, dict[tuple, float]] = {}
+
+# Stage seconds of the request being served, for its Server-Timing header; None outside requests.
+# run_in_stage copies the context into executor threads, so blocking stages report here too.
+_request_timings: contextvars.ContextVar[dict | None] = contextvars.ContextVar("request_timings", default=None)
+
+
+class Histogram:
+    def __init__(self, buckets: tuple = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.sum += value
+        self.count += 1
+
+
+def _key(labels: dict) -> tuple:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def observe(name: str, value: float, **labels):
+    with _lock:
+        series = _histograms.setdefault(name, {})
+        hist = series.get(_key(labels))
+        if hist is None:
+            hist = series[_key(labels)] = Histogram()
+        hist.observe(value)
+
+
+def inc(name: str, value: float = 1.0, **labels):
+    with _lock:
+        series = _counters.setdefault(name, {})
+        series[_key(labels)] = series.get(_key(labels), 0.0) + value
+
+
+def observe_stage(stage: str, seconds: float):
+    """Record time spent in a pipeline stage (parse, chunk, encode, upsert, query, llm, db_write)."""
+    observe("stage_seconds", seconds, stage=stage)
+    timings = _request_timings.get()
+    if timings is not None:
+        with _lock:
+            timings[stage] = timings.get(stage, 0.0) + seconds
+
+
+@contextmanager
+def stage(name: str):
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(name, time.perf_counter() - t0)
+
+
+def begin_request() -> tuple[dict, contextvars.Token]:
+    timings: dict = {}
+    return timings, _request_timings.set(timings)
+
+
+def end_request(token: contextvars.Token):
+    _request_timings.reset(token)
+
+
+def server_timing(timings: dict, total: float) -> str:
+    """Server-Timing header value, durations in milliseconds."""
+    with _lock:
+        parts = [f"{name};dur={seconds * 1000:.1f}" for name, seconds in timings.items()]
+    parts.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(parts)
+
+
+def _labels(key: tuple, extra: str = "") -> str:
+    pairs = [f'{k}="{v}"' for k, v in key]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _flatten(prefix: str, value, out: dict):
+    # Numeric leaves of nested stats dicts become gauges; strings and lists are skipped
+    if isinstance(value, dict):
+        for k, v in value.items():
+            _flatten(f"{prefix}_{k}" if prefix else str(k), v, out)
+    elif isinstance(value, bool):
+        out[prefix] = float(value)
+    elif isinstance(value, (int, float)) and math.isfinite(value):
+        out[prefix] = float(value)
+
+
+def render(gauges: dict | None = None) -> str:
+    """Prometheus text exposition of all histograms and counters, plus gauges from a stats dict."""
+    lines = []
+    with _lock:
+        for name, series in sorted(_histograms.items()):
+            full = PREFIX + name
+            lines.append(f"# TYPE {full} histogram")
+            for key, hist in sorted(series.items()):
+                cumulative = 0
+                for bound, n in zip(hist.buckets, hist.counts):
+                    cumulative += n
+                    le = 'le="%s"' % bound
+                    lines.append(f"{full}_bucket{_labels(key, le)} {cumulative}")
+                inf = 'le="+Inf"'
+                lines.append(f"{full}_bucket{_labels(key, inf)} {hist.count}")
+                lines.append(f"{full}_sum{_labels(key)} {hist.sum:.6f}")
+                lines.append(f"{full}_count{_labels(key)} {hist.count}")
+        for name, series in sorted(_counters.items()):
+            full = PREFIX + name
+            lines.append(f"# TYPE {full} counter")
+            for key, value in sorted(series.items()):
+                lines.append(f"{full}{_labels(key)} {value:g}")
+
+    flat: dict = {}
+    _flatten("", gauges or {}, flat)
+    for name, value in sorted(flat.items()):
+        full = PREFIX + "".join(c if c.isalnum() else "_" for c in name)
+        lines.append(f"# TYPE {full} gauge")
+        lines.append(f"{full} {value:g}")
+    return "\n".join(lines) + "\n"
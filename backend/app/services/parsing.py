@@ -1,9 +1,95 @@
+import os
+from typing import Iterator
+
 from pypdf import PdfReader
 
+from app.db import connection
+from app.services.concurrency import get_process_pool
+
+# Each worker process keeps the last PDF it opened, so a page range doesn't re-read the file
+_reader: tuple[str, PdfReader] | None = None
+
+
+def _open(file_path: str) -> PdfReader:
+    global _reader
+    if _reader is None or _reader[0] != file_path:
+        _reader = (file_path, PdfReader(file_path))
+    return _reader[1]
+
+
+def _extract_range(file_path: str, indices: list[int]) -> list[tuple[int, str]]:
+    reader = _open(file_path)
+    return [(i, reader.pages[i].extract_text() or "") for i in indices]
+
+
+def parallel_min_pages() -> int:
+    return int(os.getenv("PARSE_PARALLEL_MIN_PAGES", "16"))
+
+
+def pages_per_task() -> int:
+    return int(os.getenv("PARSE_PAGES_PER_TASK", "4"))
+
+
+def cached_pages(file_hash: str) -> dict[int, str]:
+    with connection() as conn:
+        rows = conn.execute("SELECT page, text FROM page_texts WHERE content_hash = ?", (file_hash,)).fetchall()
+    return dict(rows)
+
+
+def _store_pages(file_hash: str, pages: list[tuple[int, str]]):
+    with connection() as conn:
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO page_texts(content_hash, page, text) VALUES(?,?,?)",
+                [(file_hash, i, text) for i, text in pages],
+            )
+
+
+def _extract(file_path: str, indices: list[int]) -> Iterator[list[tuple[int, str]]]:
+    """Yield extracted (index, text) batches in page order."""
+    step = pages_per_task()
+    batches = [indices[i:i + step] for i in range(0, len(indices), step)]
+    pool = get_process_pool() if len(indices) >= parallel_min_pages() else None
+    if pool is None:
+        reader = PdfReader(file_path)
+        for batch in batches:
+            yield [(i, reader.pages[i].extract_text() or "") for i in batch]
+        return
+    # Fan page ranges out across processes; consume them in order so callers see a page stream
+    futures = [pool.submit(_extract_range, file_path, batch) for batch in batches]
+    try:
+        for fut in futures:
+            yield fut.result()
+    finally:
+        for fut in futures:
+            fut.cancel()
+
+
+def iter_pages(file_path: str, file_hash: str | None = None) -> Iterator[dict]:
+    """
+    Yield {"page", "text"} dicts in page order as soon as each page is extracted.
+
+    With `file_hash`, page texts are cached by (file hash, page index): pages parsed before
+    (a re-upload, a resumed ingest) are read back instead of extracted again.
+    Large documents are extracted across a process pool.
+    """
+    total = len(PdfReader(file_path).pages)
+    cached = cached_pages(file_hash) if file_hash else {}
+    missing = [i for i in range(total) if i not in cached]
+    extracted = _extract(file_path, missing)
+    ready: dict[int, str] = {}
+    try:
+        for i in range(total):
+            while i not in cached and i not in ready:
+                batch = next(extracted)
+                if file_hash:
+                    _store_pages(file_hash, batch)
+                ready.update(batch)
+            text = cached.pop(i) if i in cached else ready.pop(i)
+            yield {"page": i + 1, "text": text}
+    finally:
+        extracted.close()
+
+
 def pdf_to_text(file_path: str) -> list[dict]:
-    reader = PdfReader(file_path)
-    pages = []
-    for i, page in enumerate(reader.pages):
-        text = page.extract_text() or ""
-        pages.append({"page": i + 1, "text": text})
-    return pages
\ No newline at end of file
+    return list(iter_pages(file_path))
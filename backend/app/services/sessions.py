@@ -0,0 +1,133 @@
+import os
+import uuid
+from datetime import datetime, timedelta
+
+from app.db import connection
+from app.services.concurrency import run_in_stage
+from app.services.vectorstore import default_collection, delete_documents
+
+
+def session_ttl() -> timedelta:
+    return timedelta(hours=float(os.getenv("SESSION_TTL_HOURS", "24")))
+
+
+def new_session_id() -> str:
+    return uuid.uuid4().hex
+
+
+def attach_document(session_id: str, doc_type: str, doc_id: str):
+    """
+    Make `doc_id` this session's resume or JD and refresh its TTL. The document it replaces
+    is deleted (rows, vectors, file) unless another session still uses it.
+    """
+    now = datetime.utcnow().isoformat()
+    with connection() as conn:
+        with conn:
+            conn.execute(
+                "INSERT INTO sessions(session_id, created_at, last_seen) VALUES(?,?,?) "
+                "ON CONFLICT(session_id) DO UPDATE SET last_seen = excluded.last_seen",
+                (session_id, now, now),
+            )
+            row = conn.execute(
+                "SELECT doc_id FROM session_documents WHERE session_id = ? AND doc_type = ?", (session_id, doc_type)
+            ).fetchone()
+            conn.execute(
+                "INSERT OR REPLACE INTO session_documents(session_id, doc_type, doc_id) VALUES(?,?,?)",
+                (session_id, doc_type, doc_id),
+            )
+            orphans = _collect_orphans(conn, [row[0]]) if row and row[0] != doc_id else []
+    remove_orphans(orphans)
+
+
+def detach_document(doc_id: str):
+    """Unlink `doc_id` from every session that uses it."""
+    with connection() as conn:
+        with conn:
+            conn.execute("DELETE FROM session_documents WHERE doc_id = ?", (doc_id,))
+
+
+def session_doc_ids(session_id: str, doc_type: str | None = None) -> list[str]:
+    """Documents a session may search; empty for unknown or expired sessions. Refreshes the TTL."""
+    with connection() as conn:
+        with conn:
+            cur = conn.execute(
+                "UPDATE sessions SET last_seen = ? WHERE session_id = ?",
+                (datetime.utcnow().isoformat(), session_id),
+            )
+            if cur.rowcount == 0:
+                return []
+        sql = "SELECT doc_id FROM session_documents WHERE session_id = ?"
+        params = [session_id]
+        if doc_type:
+            sql += " AND doc_type = ?"
+            params.append(doc_type)
+        return [r[0] for r in conn.execute(sql, params).fetchall()]
+
+
+async def session_scope(session_id: str | None) -> list[str] | None:
+    """doc_ids a request may search: None (everything) without a session, else that session's documents."""
+    if not session_id:
+        return None
+    return await run_in_stage("db", session_doc_ids, session_id)
+
+
+def expire_sessions() -> list[dict]:
+    """
+    Delete sessions idle for longer than SESSION_TTL_HOURS, and finished ingest jobs as old.
+
+    Returns the documents (doc_id, file_path) no remaining session refers to; their
+    `documents` rows are already gone, the caller removes vectors and files.
+    """
+    cutoff = (datetime.utcnow() - session_ttl()).isoformat()
+    with connection() as conn:
+        with conn:
+            conn.execute("DELETE FROM ingest_jobs WHERE status IN ('done', 'failed') AND updated_at < ?", (cutoff,))
+            expired = [r[0] for r in conn.execute("SELECT session_id FROM sessions WHERE last_seen < ?", (cutoff,))]
+            if not expired:
+                return []
+            marks = ",".join("?" * len(expired))
+            doc_ids = [r[0] for r in conn.execute(
+                f"SELECT DISTINCT doc_id FROM session_documents WHERE session_id IN ({marks})", expired
+            )]
+            conn.execute(f"DELETE FROM session_documents WHERE session_id IN ({marks})", expired)
+            conn.execute(f"DELETE FROM sessions WHERE session_id IN ({marks})", expired)
+            return _collect_orphans(conn, doc_ids)
+
+
+def _collect_orphans(conn, doc_ids: list[str]) -> list[dict]:
+    """
+    Delete the rows of documents no session refers to any more (and that aren't still being
+    ingested); returns their doc_id and file_path for remove_orphans().
+    """
+    orphans = []
+    for doc_id in doc_ids:
+        if conn.execute("SELECT 1 FROM session_documents WHERE doc_id = ? LIMIT 1", (doc_id,)).fetchone():
+            continue
+        if conn.execute(
+            "SELECT 1 FROM ingest_jobs WHERE doc_id = ? AND status IN ('queued', 'running') LIMIT 1", (doc_id,)
+        ).fetchone():
+            continue
+        row = conn.execute("SELECT file_path, content_hash FROM documents WHERE doc_id = ?", (doc_id,)).fetchone()
+        conn.execute("DELETE FROM documents WHERE doc_id = ?", (doc_id,))
+        conn.execute("DELETE FROM document_digests WHERE doc_id = ?", (doc_id,))
+        if row and not conn.execute("SELECT 1 FROM documents WHERE content_hash = ?", (row[1],)).fetchone():
+            conn.execute("DELETE FROM page_texts WHERE content_hash = ?", (row[1],))
+        orphans.append({"doc_id": doc_id, "file_path": row[0] if row else None})
+    return orphans
+
+
+def remove_orphans(orphans: list[dict]):
+    """Drop the chunks (vector and BM25) and files of documents _collect_orphans() deleted."""
+    if not orphans:
+        return
+    delete_documents(default_collection(), [d["doc_id"] for d in orphans])
+    for d in orphans:
+        if d["file_path"] and os.path.exists(d["file_path"]):
+            os.remove(d["file_path"])
+
+
+def cleanup_expired_sessions() -> int:
+    """Expire idle sessions and remove the chunks and files of documents nobody uses any more."""
+    orphans = expire_sessions()
+    remove_orphans(orphans)
+    return len(orphans)
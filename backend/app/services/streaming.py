@@ -0,0 +1,124 @@
+import json
+from typing import Any
+
+
+def sse_event(event: str, data: Any) -> str:
+    """Format one Server-Sent Events message."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+class JsonStreamParser:
+    """
+    Incremental parser for a streamed top-level JSON object (the LLM's JSON-mode output).
+
+    feed() accepts the next text delta and returns the events that became available:
+    - ("value", key, value)  when a top-level member is complete
+    - ("item", key, value)   when an object inside a top-level array listed in `array_keys` is complete
+    - ("delta", key, text)   decoded text of a top-level string listed in `string_keys`, as it arrives
+    """
+
+    def __init__(self, array_keys=(), string_keys=()):
+        self.array_keys = set(array_keys)
+        self.string_keys = set(string_keys)
+        self.buf = ""
+        self.i = 0
+        self.depth = 0
+        self.in_string = False
+        self.escape_at = None      # index of a pending backslash escape
+        self.unicode_left = 0      # hex digits still expected after \u
+        self.expect_key = False
+        self.reading_key = False
+        self.await_value = False
+        self.key = None
+        self.key_start = None
+        self.value_start = None
+        self.value_is_array = False
+        self.item_start = None
+        self.emit_from = None      # start of not-yet-emitted text in a streamed string value
+
+    def feed(self, text: str) -> list[tuple]:
+        self.buf += text
+        buf, events = self.buf, []
+        while self.i < len(buf):
+            i, c = self.i, buf[self.i]
+            self.i += 1
+
+            if self.in_string:
+                if self.unicode_left:
+                    self.unicode_left -= 1
+                    if not self.unicode_left:
+                        self.escape_at = None
+                elif self.escape_at is not None:
+                    if c == "u":
+                        self.unicode_left = 4
+                    else:
+                        self.escape_at = None
+                elif c == "\\":
+                    self.escape_at = i
+                elif c == '"':
+                    self.in_string = False
+                    if self.reading_key:
+                        self.reading_key = False
+                        self.key = json.loads(buf[self.key_start:i + 1])
+                    elif self.depth == 1 and self.value_start is not None:
+                        self._flush_delta(i, events)
+                        self.emit_from = None
+                        events.append(("value", self.key, json.loads(buf[self.value_start:i + 1])))
+                        self.value_start = None
+                continue
+
+            if c.isspace():
+                continue
+
+            if self.await_value and self.depth == 1:
+                self.await_value = False
+                self.value_start = i
+                self.value_is_array = c == "["
+                if c == '"' and self.key in self.string_keys:
+                    self.emit_from = i + 1
+
+            if c == '"':
+                self.in_string = True
+                if self.depth == 1 and self.expect_key:
+                    self.expect_key = False
+                    self.reading_key = True
+                    self.key_start = i
+            elif c in "{[":
+                if c == "{" and self.depth == 2 and self.value_is_array and self.key in self.array_keys:
+                    self.item_start = i
+                self.depth += 1
+                if self.depth == 1:
+                    self.expect_key = True
+            elif c in "}]":
+                if self.depth == 1 and self.value_start is not None:
+                    # primitive value closing the top-level object
+                    self._emit_primitive(i, events)
+                self.depth -= 1
+                if self.depth == 2 and self.item_start is not None and c == "}":
+                    events.append(("item", self.key, json.loads(buf[self.item_start:i + 1])))
+                    self.item_start = None
+                elif self.depth == 1 and self.value_start is not None:
+                    events.append(("value", self.key, json.loads(buf[self.value_start:i + 1])))
+                    self.value_start = None
+            elif self.depth == 1:
+                if c == ":":
+                    self.await_value = True
+                elif c == ",":
+                    if self.value_start is not None:
+                        self._emit_primitive(i, events)
+                    self.expect_key = True
+
+        if self.in_string and self.emit_from is not None:
+            self._flush_delta(self.escape_at if self.escape_at is not None else self.i, events)
+        return events
+
+    def _emit_primitive(self, end: int, events: list):
+        events.append(("value", self.key, json.loads(self.buf[self.value_start:end].strip())))
+        self.value_start = None
+
+    def _flush_delta(self, end: int, events: list):
+        if self.emit_from is None or end <= self.emit_from:
+            return
+        raw = self.buf[self.emit_from:end]
+        self.emit_from = end
+        events.append(("delta", self.key, json.loads(f'"{raw}"')))
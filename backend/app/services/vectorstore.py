@@ -1,38 +1,483 @@
+import hashlib
 import os
-import chromadb
-from sentence_transformers import SentenceTransformer
+import threading
+import time
+from typing import TYPE_CHECKING, Iterable
 
-def get_embedder(model_name: str):
-    return SentenceTransformer(model_name)
+import numpy as np
+
+from app.services.embedcache import get_embedding_cache, close_embedding_cache
+from app.services.chunking import chunk_text, chunk_max_tokens
+from app.services.lexical import BM25Index, reciprocal_rank_fusion
+from app.services.metrics import stage
+
+if TYPE_CHECKING:
+    import chromadb
+    from sentence_transformers import SentenceTransformer
+
+# Process-wide resource registry: one embedder per model name, one client per CHROMA_DIR.
+# Loading SentenceTransformer weights and opening the persistent store are the most
+# expensive things a request can do, so they happen once and are shared afterwards.
+_lock = threading.Lock()
+_embedders: dict[str, "SentenceTransformer"] = {}
+_clients: dict[str, "chromadb.ClientAPI"] = {}
+_lexical: dict[str, BM25Index] = {}
+_stats = {"embedder_loads": 0, "embedder_hits": 0, "client_opens": 0, "client_hits": 0, "load_seconds": {}}
+
+
+def embed_model_name() -> str:
+    return os.getenv("EMBED_MODEL", "all-MiniLM-L6-v2")
+
+
+def chroma_dir() -> str:
+    return os.getenv("CHROMA_DIR", "backend/app/data/chroma_db")
+
+
+EMBED_BACKENDS = ("torch", "onnx", "onnx-int8")
+
+
+def embed_backend() -> str:
+    backend = os.getenv("EMBED_BACKEND", "torch").lower()
+    if backend not in EMBED_BACKENDS:
+        raise ValueError(f"Unknown EMBED_BACKEND: {backend!r} (expected one of {', '.join(EMBED_BACKENDS)})")
+    return backend
+
+
+def embed_threads() -> int:
+    # 0 keeps the runtime's default (usually one thread per core)
+    return int(os.getenv("EMBED_THREADS", "0"))
+
+
+def embed_quantization() -> str:
+    # onnxruntime dynamic quantization preset: arm64, avx2, avx512 or avx512_vnni
+    return os.getenv("EMBED_QUANTIZATION", "avx2")
+
+
+def onnx_dir(model_name: str) -> str:
+    """Where exported int8 ONNX models are kept between restarts."""
+    return os.path.join(os.getenv("EMBED_ONNX_DIR", "backend/app/data/onnx"), model_name.replace("/", "__"))
+
+
+def embedder_key(model_name: str, backend: str) -> str:
+    # torch keeps the bare model name, so existing embedding-cache entries stay valid
+    return model_name if backend == "torch" else f"{model_name}[{backend}]"
+
+
+def load_embedder(model_name: str, backend: str = "torch"):
+    """
+    Construct a fresh embedder (no registry). Used by the registry and by benchmarks.
+
+    backend "onnx" runs the model's ONNX export on onnxruntime's CPU provider; "onnx-int8"
+    additionally quantizes the weights to int8 (exported once into EMBED_ONNX_DIR). All
+    backends produce vectors of the same model and dimension, so they share one collection.
+    """
+    # Imported on first use: sentence-transformers pulls in torch, seconds of import time
+    from sentence_transformers import SentenceTransformer
+
+    threads = embed_threads()
+    if backend == "torch":
+        if threads:
+            import torch
+
+            torch.set_num_threads(threads)
+        return SentenceTransformer(model_name)
+
+    model_kwargs = {"provider": "CPUExecutionProvider"}
+    if threads:
+        import onnxruntime
+
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = threads
+        options.inter_op_num_threads = 1
+        model_kwargs["session_options"] = options
+    if backend == "onnx":
+        return SentenceTransformer(model_name, backend="onnx", model_kwargs=model_kwargs)
+
+    from sentence_transformers import export_dynamic_quantized_onnx_model
+
+    config = embed_quantization()
+    local = onnx_dir(model_name)
+    file_name = f"onnx/model_qint8_{config}.onnx"
+    if not os.path.exists(os.path.join(local, file_name)):
+        # One-time export: fp32 ONNX graph -> dynamically quantized int8 weights
+        model = SentenceTransformer(model_name, backend="onnx", model_kwargs={"provider": "CPUExecutionProvider"})
+        model.save(local)
+        export_dynamic_quantized_onnx_model(model, config, local, file_suffix=f"qint8_{config}")
+    return SentenceTransformer(local, backend="onnx", model_kwargs={**model_kwargs, "file_name": file_name})
+
+
+def open_chroma_client(chroma_dir: str):
+    """Open a fresh persistent client (no registry)."""
+    import chromadb
 
-def get_chroma_client(chroma_dir: str):
     os.makedirs(chroma_dir, exist_ok=True)
     return chromadb.PersistentClient(path=chroma_dir)
 
+
+def get_embedder(model_name: str, backend: str | None = None):
+    backend = backend or embed_backend()
+    key = embedder_key(model_name, backend)
+    embedder = _embedders.get(key)
+    if embedder is not None:
+        _stats["embedder_hits"] += 1
+        return embedder
+    with _lock:
+        embedder = _embedders.get(key)
+        if embedder is None:
+            t0 = time.perf_counter()
+            embedder = load_embedder(model_name, backend)
+            _stats["load_seconds"][f"embedder:{key}"] = round(time.perf_counter() - t0, 4)
+            _stats["embedder_loads"] += 1
+            _embedders[key] = embedder
+        else:
+            _stats["embedder_hits"] += 1
+    return embedder
+
+
+def get_chroma_client(chroma_dir: str):
+    key = os.path.abspath(chroma_dir)
+    client = _clients.get(key)
+    if client is not None:
+        _stats["client_hits"] += 1
+        return client
+    with _lock:
+        client = _clients.get(key)
+        if client is None:
+            t0 = time.perf_counter()
+            client = open_chroma_client(chroma_dir)
+            _stats["load_seconds"][f"chroma:{key}"] = round(time.perf_counter() - t0, 4)
+            _stats["client_opens"] += 1
+            _clients[key] = client
+        else:
+            _stats["client_hits"] += 1
+    return client
+
+
 def get_collection(client, name: str = "documents"):
     return client.get_or_create_collection(name=name)
 
-def upsert_document(collection, embedder, doc_type: str, pages: list[dict], doc_id: str):
-    ids, embeddings, metadatas, documents = [], [], [], []
+
+def hybrid_enabled() -> bool:
+    return os.getenv("HYBRID_SEARCH", "1") == "1"
+
+
+def _store_dir(collection) -> str:
+    # The directory of the client this collection came from, which need not be CHROMA_DIR
+    # (benchmarks open their own); in-memory clients fall back to CHROMA_DIR
+    settings = collection._client.get_settings()
+    return settings.persist_directory if settings.is_persistent else chroma_dir()
+
+
+def get_lexical_index(collection) -> BM25Index:
+    """The BM25 index paired with `collection`, stored next to its Chroma data and keyed by the collection's id."""
+    path = os.path.abspath(os.path.join(_store_dir(collection), f"bm25_{collection.id}.db"))
+    index = _lexical.get(path)
+    if index is None:
+        with _lock:
+            index = _lexical.get(path)
+            if index is None:
+                index = _lexical[path] = BM25Index(path)
+                _backfill_lexical(collection, index)
+    return index
+
+
+def _backfill_lexical(collection, index: BM25Index, batch: int = 1000):
+    # Chunks stored before the BM25 index existed are indexed once, on first use
+    if index.stats()["chunks"] or not collection.count():
+        return
+    offset = 0
+    while True:
+        got = collection.get(limit=batch, offset=offset, include=["documents", "metadatas"])
+        ids = got.get("ids") or []
+        if not ids:
+            return
+        index.add(ids, got.get("documents") or [], got.get("metadatas") or [])
+        offset += len(ids)
+
+
+def default_embedder():
+    return get_embedder(embed_model_name())
+
+
+def default_collection():
+    return get_collection(get_chroma_client(chroma_dir()))
+
+
+def warmup():
+    """Load the configured embedder and open the configured store ahead of the first request."""
+    embedder = default_embedder()
+    default_collection()
+    # First encode triggers lazy tokenizer/kernel setup; pay for it at boot, not per request.
+    embedder.encode("warmup")
+
+
+def close_resources():
+    """Drop every shared embedder and client (called on application shutdown)."""
+    with _lock:
+        _embedders.clear()
+        _clients.clear()
+        for index in _lexical.values():
+            index.close()
+        _lexical.clear()
+    close_embedding_cache()
+
+
+def resource_stats() -> dict:
+    return {
+        "embedders": sorted(_embedders),
+        "chroma_dirs": sorted(_clients),
+        "lexical_indexes": [index.stats() for index in _lexical.values()],
+        **_stats,
+        "embedding_cache": get_embedding_cache().stats(),
+    }
+
+
+def embed_batch_size() -> int:
+    return int(os.getenv("EMBED_BATCH_SIZE", "32"))
+
+
+def upsert_batch_size() -> int:
+    return int(os.getenv("CHROMA_UPSERT_BATCH", "256"))
+
+
+def _model_key(embedder) -> str | None:
+    """Cache key of an embedder from get_embedder(); None for any other, which isn't cached."""
+    for name, e in _embedders.items():
+        if e is embedder:
+            return name
+    # id() changes every run (and can be reused within one), so it can't key persisted vectors
+    return None
+
+
+def encode_texts(embedder, texts: list[str], batch_size: int | None = None, use_cache: bool = True) -> np.ndarray:
+    """
+    Encode many texts in batched forward passes; returns a (len(texts), dim) float32 matrix.
+    Vectors are served from / stored in the shared embedding cache unless use_cache=False.
+    """
+    if not texts:
+        return np.zeros((0, 0), dtype=np.float32)
+
+    model = _model_key(embedder)
+    cache = get_embedding_cache() if use_cache and model else None
+    found = cache.get_many(model, texts) if cache else {}
+    missing = [i for i in range(len(texts)) if i not in found]
+
+    fresh = None
+    if missing:
+        with stage("encode"):
+            fresh = np.asarray(
+                embedder.encode(
+                    [texts[i] for i in missing],
+                    batch_size=batch_size or embed_batch_size(),
+                    convert_to_numpy=True,
+                    show_progress_bar=False,
+                ),
+                dtype=np.float32,
+            )
+        if cache:
+            cache.put_many(model, [texts[i] for i in missing], fresh)
+    if not found:
+        return fresh
+
+    dim = next(iter(found.values())).shape[0]
+    out = np.empty((len(texts), dim), dtype=np.float32)
+    for i, vec in found.items():
+        out[i] = vec
+    if missing:
+        out[missing] = fresh
+    return out
+
+
+def chunk_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _existing_embeddings(collection, hashes: list[str]) -> dict[str, np.ndarray]:
+    """Look up vectors already stored for these chunk texts (partially overlapping documents)."""
+    wanted = sorted(set(hashes))
+    if not wanted:
+        return {}
+    res = collection.get(where={"chunk_hash": {"$in": wanted}}, include=["embeddings", "metadatas"])
+    embeddings = res.get("embeddings")
+    if embeddings is None:
+        return {}
+    found = {}
+    for meta, emb in zip(res.get("metadatas") or [], embeddings):
+        h = (meta or {}).get("chunk_hash")
+        if h and h not in found:
+            found[h] = np.asarray(emb, dtype=np.float32)
+    return found
+
+
+def upsert_document(collection, embedder, doc_type: str, pages: Iterable[dict], doc_id: str) -> int:
+    """
+    Chunk, embed and store a document's pages; returns the number of chunks.
+
+    `pages` may be a generator (parsing.iter_pages): chunks are embedded in windows of
+    EMBED_BATCH_SIZE as pages arrive, so encoding starts before the last page is parsed, and
+    written to Chroma once CHROMA_UPSERT_BATCH of them are ready.
+    """
+    window, write_batch = embed_batch_size(), upsert_batch_size()
+    total = 0
+    ids, metadatas, documents, hashes = [], [], [], []  # chunked, not embedded yet
+    ready, ready_count = [], 0  # embedded windows, not written yet
     for p in pages:
         page_num = p["page"]
-        for idx, chunk in enumerate(_safe_chunks(p["text"])):
-            emb = embedder.encode(chunk).tolist()
+        with stage("chunk"):
+            chunks = _safe_chunks(p["text"], embedder)
+        for idx, chunk in enumerate(chunks):
+            h = chunk_hash(chunk)
             ids.append(f"{doc_id}_{doc_type}_p{page_num}_c{idx}")
-            embeddings.append(emb)
-            metadatas.append({"source": doc_type, "page": page_num, "doc_id": doc_id})
+            metadatas.append({"source": doc_type, "page": page_num, "doc_id": doc_id, "chunk_hash": h})
             documents.append(chunk)
+            hashes.append(h)
+        if len(ids) >= window:
+            ready.append((ids, _embed_chunks(collection, embedder, documents, hashes), metadatas, documents))
+            ready_count += len(ids)
+            ids, metadatas, documents, hashes = [], [], [], []
+        if ready_count >= write_batch:
+            total += _write_chunks(collection, ready)
+            ready, ready_count = [], 0
     if ids:
-        collection.upsert(ids=ids, embeddings=embeddings, metadatas=metadatas, documents=documents)
-
-def query(collection, embedder, query_text: str, k: int = 6, source_filter: str | None = None):
-    emb = embedder.encode(query_text).tolist()
-    where = {"source": source_filter} if source_filter else None
-    res = collection.query(query_embeddings=[emb], n_results=k, where=where)
-    docs = res.get("documents", [[]])[0]
-    metas = res.get("metadatas", [[]])[0]
-    return [{"text": d, "meta": m} for d, m in zip(docs, metas)]
-
-def _safe_chunks(text: str):
-    from app.services.chunking import chunk_text
-    return chunk_text(text)
\ No newline at end of file
+        ready.append((ids, _embed_chunks(collection, embedder, documents, hashes), metadatas, documents))
+    if ready:
+        total += _write_chunks(collection, ready)
+    return total
+
+def _embed_chunks(collection, embedder, documents: list, hashes: list) -> np.ndarray:
+    # Only encode chunk texts we have never embedded before (and each distinct text once).
+    known = _existing_embeddings(collection, hashes)
+    missing = [h for h in dict.fromkeys(hashes) if h not in known]
+    if missing:
+        text_by_hash = dict(zip(hashes, documents))
+        fresh = encode_texts(embedder, [text_by_hash[h] for h in missing])
+        known.update(zip(missing, fresh))
+    return np.stack([known[h] for h in hashes])
+
+def _write_chunks(collection, windows: list[tuple]) -> int:
+    ids = [i for w in windows for i in w[0]]
+    embeddings = np.concatenate([w[1] for w in windows])
+    metadatas = [m for w in windows for m in w[2]]
+    documents = [d for w in windows for d in w[3]]
+
+    # Bounded upserts so a huge JD doesn't turn into one giant Chroma write.
+    step = upsert_batch_size()
+    with stage("upsert"):
+        for i in range(0, len(ids), step):
+            collection.upsert(
+                ids=ids[i:i + step],
+                embeddings=embeddings[i:i + step],
+                metadatas=metadatas[i:i + step],
+                documents=documents[i:i + step],
+            )
+        get_lexical_index(collection).add(ids, documents, metadatas)
+    return len(ids)
+
+def query(collection, embedder, query_text: str, k: int = 6, source_filter: str | None = None,
+          doc_ids: list[str] | None = None):
+    return query_many(collection, embedder, [query_text], k=k, source_filter=source_filter, doc_ids=doc_ids)[0]
+
+def query_many(collection, embedder, query_texts: list[str], k: int = 6, source_filter: str | None = None,
+               doc_ids: list[str] | None = None):
+    """
+    Run several searches with one encode call and one Chroma round trip; returns one hit list per text.
+    `doc_ids` restricts the search to those documents (e.g. one session's resume + JD).
+
+    With HYBRID_SEARCH=1 (default) each text is also searched in the BM25 index and the two
+    rankings are merged with reciprocal rank fusion, so exact skill names ("Kubernetes") rank
+    where embeddings alone might not. Hits carry `score` (higher is better) and, when the
+    vector search found them, `distance`.
+    """
+    if not query_texts:
+        return []
+    if doc_ids is not None and not doc_ids:
+        return [[] for _ in query_texts]
+    embs = encode_texts(embedder, query_texts)
+    with stage("query"):
+        return _search_many(collection, embs, query_texts, k, source_filter, doc_ids)
+
+
+def _search_many(collection, embs: np.ndarray, query_texts: list[str], k: int, source_filter: str | None,
+                 doc_ids: list[str] | None) -> list[list[dict]]:
+    # Over-fetch so that identical chunks from re-uploaded documents can be collapsed
+    res = collection.query(query_embeddings=embs.tolist(), n_results=k * 2, where=_where(source_filter, doc_ids))
+    all_ids = res.get("ids") or [[] for _ in query_texts]
+    all_docs = res.get("documents") or [[] for _ in query_texts]
+    all_metas = res.get("metadatas") or [[] for _ in query_texts]
+    all_dists = res.get("distances") or [[None] * len(docs) for docs in all_docs]
+
+    dense = []
+    for ids, docs, metas, dists in zip(all_ids, all_docs, all_metas, all_dists):
+        dense.append([
+            {"id": i, "text": d, "meta": m, "distance": dist, "score": -dist if dist is not None else 0.0}
+            for i, d, m, dist in zip(ids, docs, metas, dists)
+        ])
+    if not hybrid_enabled():
+        return [_dedupe_hits(hits, k) for hits in dense]
+
+    index = get_lexical_index(collection)
+    lexical = [index.search(text, k * 2, source_filter=source_filter, doc_ids=doc_ids) for text in query_texts]
+    known = {h["id"]: h for hits in dense for h in hits}
+    missing = sorted({cid for ranking in lexical for cid, _ in ranking if cid not in known})
+    if missing:
+        got = collection.get(ids=missing, include=["documents", "metadatas"])
+        for cid, d, m in zip(got.get("ids") or [], got.get("documents") or [], got.get("metadatas") or []):
+            known[cid] = {"id": cid, "text": d, "meta": m, "distance": None}
+
+    out = []
+    for hits, ranking in zip(dense, lexical):
+        fused = reciprocal_rank_fusion([[h["id"] for h in hits], [cid for cid, _ in ranking]])
+        out.append(_dedupe_hits([{**known[cid], "score": score} for cid, score in fused if cid in known], k))
+    return out
+
+
+def _where(source_filter: str | None, doc_ids: list[str] | None) -> dict | None:
+    clauses = []
+    if source_filter:
+        clauses.append({"source": source_filter})
+    if doc_ids is not None:
+        clauses.append({"doc_id": {"$in": list(doc_ids)}})
+    if len(clauses) > 1:
+        return {"$and": clauses}
+    return clauses[0] if clauses else None
+
+def delete_documents(collection, doc_ids: list[str]):
+    """Drop every chunk belonging to these documents."""
+    if doc_ids:
+        collection.delete(where={"doc_id": {"$in": list(doc_ids)}})
+        get_lexical_index(collection).delete_documents(list(doc_ids))
+
+def _dedupe_hits(hits: list[dict], k: int) -> list[dict]:
+    out, seen = [], set()
+    for h in hits:
+        key = (h["meta"] or {}).get("chunk_hash") or chunk_hash(h["text"] or "")
+        if key in seen:
+            continue
+        seen.add(key)
+        out.append(h)
+        if len(out) == k:
+            break
+    return out
+
+def token_counter(embedder):
+    """Per-word token counts from the embedder's own tokenizer (approximate if it has none)."""
+    tokenizer = getattr(embedder, "tokenizer", None)
+    if tokenizer is None:
+        return None
+
+    def count(words: list[str]) -> list[int]:
+        if not words:
+            return []
+        ids = tokenizer(words, add_special_tokens=False)["input_ids"]
+        return [max(1, len(x)) for x in ids]
+    return count
+
+def chunk_token_limit(embedder) -> int:
+    # Leave room for the [CLS]/[SEP] special tokens so no chunk is silently truncated at encode time
+    max_seq = getattr(embedder, "max_seq_length", None)
+    return min(chunk_max_tokens(), max_seq - 2) if max_seq else chunk_max_tokens()
+
+def _safe_chunks(text: str, embedder=None):
+    if embedder is None:
+        return chunk_text(text)
+    return chunk_text(text, max_tokens=chunk_token_limit(embedder), count_tokens=token_counter(embedder))
@@ -0,0 +1,111 @@
+"""
+Chunking: the original fixed 900/150-character windows vs the token-aware sentence chunker.
+
+For every sample PDF in backend/app/data/uploads it reports chunks per document, how much
+text gets embedded relative to the source (overlap redundancy), chunks over the model's
+max sequence length, encode time, and retrieval recall@k.
+
+Recall: sentences sampled from each document become queries (with a third of their words
+dropped), searched against that document's own chunks; a hit is a top-k chunk that holds
+at least 80% of the sentence's words.
+
+Run from backend/:
+    python -m benchmarks.bench_chunking --k 3 --queries 20
+"""
+import argparse
+import glob
+import random
+import re
+import time
+
+import numpy as np
+from pypdf import PdfReader
+
+from app.services import vectorstore
+
+
+def _legacy_chunks(text: str, chunk_size: int = 900, overlap: int = 150) -> list[str]:
+    # The original chunker, kept here as the baseline
+    text = (text or "").strip()
+    if not text:
+        return []
+    chunks = []
+    start = 0
+    while start < len(text):
+        end = min(len(text), start + chunk_size)
+        chunks.append(text[start:end])
+        start = max(end - overlap, start + 1)
+    return chunks
+
+
+def _words(text: str) -> list[str]:
+    return re.findall(r"\w+", text.lower())
+
+
+def _queries(text: str, n: int, rng: random.Random) -> list[list[str]]:
+    sentences = [_words(s) for s in re.split(r"(?<=[.!?])\s+|\n", text)]
+    sentences = [s for s in sentences if len(s) >= 8]
+    return rng.sample(sentences, min(n, len(sentences)))
+
+
+def _recall(embedder, chunks: list[str], queries: list[list[str]], k: int) -> float:
+    if not queries or not chunks:
+        return 0.0
+    rng = random.Random(1)
+    chunk_vecs = vectorstore.encode_texts(embedder, chunks, use_cache=False)
+    query_texts = [" ".join(w for w in q if rng.random() > 0.33) for q in queries]
+    query_vecs = vectorstore.encode_texts(embedder, query_texts, use_cache=False)
+    chunk_vecs = chunk_vecs / np.linalg.norm(chunk_vecs, axis=1, keepdims=True)
+    query_vecs = query_vecs / np.linalg.norm(query_vecs, axis=1, keepdims=True)
+    chunk_words = [set(_words(c)) for c in chunks]
+    hits = 0
+    for q, vec in zip(queries, query_vecs):
+        top = np.argsort(-(chunk_vecs @ vec))[:k]
+        if any(sum(w in chunk_words[i] for w in q) >= 0.8 * len(q) for i in top):
+            hits += 1
+    return hits / len(queries)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--k", type=int, default=3)
+    ap.add_argument("--queries", type=int, default=20, help="sampled query sentences per document")
+    args = ap.parse_args()
+
+    embedder = vectorstore.default_embedder()
+    count = vectorstore.token_counter(embedder)
+    limit = getattr(embedder, "max_seq_length", 256) - 2
+    chunkers = {
+        "fixed 900/150 chars": _legacy_chunks,
+        "token-aware": lambda t: vectorstore._safe_chunks(t, embedder),
+    }
+
+    docs = []
+    for path in sorted(glob.glob("backend/app/data/uploads/*.pdf")):
+        docs.append("\n".join(p.extract_text() or "" for p in PdfReader(path).pages))
+    if not docs:
+        raise SystemExit("no sample PDFs in backend/app/data/uploads")
+    source_chars = sum(len(d) for d in docs)
+    rng = random.Random(0)
+    queries = [_queries(d, args.queries, rng) for d in docs]
+
+    print(f"{len(docs)} documents, {source_chars} chars; model limit {limit} tokens; recall@{args.k}")
+    for label, chunker in chunkers.items():
+        per_doc = [chunker(d) for d in docs]
+        flat = [c for chunks in per_doc for c in chunks]
+        tokens = [sum(count(c.split())) if count else len(c.split()) for c in flat]
+        over = sum(t > limit for t in tokens)
+
+        t0 = time.perf_counter()
+        vectorstore.encode_texts(embedder, flat, use_cache=False)
+        encode_s = time.perf_counter() - t0
+
+        recall = np.mean([_recall(embedder, chunks, q, args.k) for chunks, q in zip(per_doc, queries)])
+        print(
+            f"{label:<20} chunks/doc={len(flat) / len(docs):6.1f}  embedded/source={sum(map(len, flat)) / source_chars:5.2f}x  "
+            f"max tokens={max(tokens):4d}  over limit={over:3d}  encode={encode_s * 1000:8.1f} ms  recall={recall:.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
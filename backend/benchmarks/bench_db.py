@@ -0,0 +1,116 @@
+"""
+SQLite write throughput and read latency under concurrent writes.
+
+Compares the old access pattern (fresh connection, default journal, one commit per insert)
+with the pooled WAL layer and its batched background writer.
+
+Run from backend/:
+    python -m benchmarks.bench_db --writers 16 --inserts 200 --readers 4
+"""
+import argparse
+import json
+import os
+import sqlite3
+import statistics
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+from app import db
+
+
+def _row(i: int) -> tuple:
+    breakdown = {"relevance": 3, "clarity": 4, "technical_correctness": 3, "structure": 2, "impact": 3}
+    return (
+        datetime.utcnow().isoformat(), "ML Engineer", "Acme", f"question {i}", "answer " * 40, 15,
+        json.dumps(breakdown), *breakdown.values(),
+    )
+
+
+def _legacy_insert(path: str, row: tuple):
+    # The original get_conn() pattern: new connection + CREATE TABLE check + commit per insert
+    conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+    conn.execute(db.MIGRATIONS[0])
+    conn.execute(f"INSERT INTO attempts({', '.join(db.ATTEMPT_COLUMNS[:7])}) VALUES(?,?,?,?,?,?,?)", row[:7])
+    conn.commit()
+    conn.close()
+
+
+def _legacy_read(path: str):
+    conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+    conn.execute("SELECT COUNT(*), AVG(total_score) FROM attempts").fetchone()
+    conn.close()
+
+
+def _pooled_insert(row: tuple):
+    db.submit_attempts([row]).result()
+
+
+def _pooled_read():
+    with db.connection() as conn:
+        conn.execute("SELECT COUNT(*), AVG(total_score) FROM attempts").fetchone()
+
+
+def _run(label: str, insert, read, writers: int, inserts: int, readers: int):
+    done = threading.Event()
+    read_latencies: list[float] = []
+
+    def writer(w: int):
+        for i in range(inserts):
+            insert(_row(w * inserts + i))
+
+    def reader():
+        while not done.is_set():
+            t0 = time.perf_counter()
+            read()
+            read_latencies.append(time.perf_counter() - t0)
+
+    reader_threads = [threading.Thread(target=reader) for _ in range(readers)]
+    writer_threads = [threading.Thread(target=writer, args=(w,)) for w in range(writers)]
+    for t in reader_threads:
+        t.start()
+    t0 = time.perf_counter()
+    for t in writer_threads:
+        t.start()
+    for t in writer_threads:
+        t.join()
+    elapsed = time.perf_counter() - t0
+    done.set()
+    for t in reader_threads:
+        t.join()
+
+    total = writers * inserts
+    lat = sorted(read_latencies) or [0.0]
+    p95 = lat[min(len(lat) - 1, int(len(lat) * 0.95))]
+    print(
+        f"{label:<22} {total / elapsed:10.1f} inserts/sec   "
+        f"reads={len(lat):<6} read p50={statistics.median(lat) * 1000:7.2f} ms  p95={p95 * 1000:7.2f} ms"
+    )
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--writers", type=int, default=16)
+    ap.add_argument("--inserts", type=int, default=200, help="inserts per writer thread")
+    ap.add_argument("--readers", type=int, default=4)
+    args = ap.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="bench_db_")
+
+    legacy_path = os.path.join(tmp, "legacy.db")
+    sqlite3.connect(legacy_path).execute(db.MIGRATIONS[0]).connection.close()
+    _run("legacy (conn/insert)", lambda r: _legacy_insert(legacy_path, r), lambda: _legacy_read(legacy_path),
+         args.writers, args.inserts, args.readers)
+
+    os.environ["SQLITE_PATH"] = os.path.join(tmp, "pooled.db")
+    db.init_db()
+    try:
+        _run("pooled WAL + batching", _pooled_insert, _pooled_read, args.writers, args.inserts, args.readers)
+        print(f"writer: {db.db_stats()['writer']}")
+    finally:
+        db.close_db()
+
+
+if __name__ == "__main__":
+    main()
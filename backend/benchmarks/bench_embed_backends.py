@@ -0,0 +1,141 @@
+"""
+Embedding backends: torch (fp32) vs onnx vs onnx-int8 (EMBED_BACKEND) on CPU.
+
+Every backend runs in its own process so load time and memory are measured from a clean
+start. Each one encodes the chunks of the sample PDFs in backend/app/data/uploads plus a
+set of query sentences (a third of their words dropped), then the parent compares:
+
+  load      seconds to construct the embedder (int8: includes the one-time export if the
+            quantized model isn't in EMBED_ONNX_DIR yet)
+  chunks/s  encode throughput over all chunks (after one warm-up batch)
+  rss       resident memory after encoding, and the process peak (MB)
+  cosine    mean / min cosine between each chunk's vector and the torch vector for it
+  top-k     average overlap of each query's top-k chunks with torch's top-k (1.0 = same hits)
+
+The onnx backends need `pip install "sentence-transformers[onnx]"`.
+
+Run from backend/:
+    python -m benchmarks.bench_embed_backends --backends torch onnx onnx-int8 --threads 4
+"""
+import argparse
+import glob
+import json
+import os
+import random
+import re
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+from pypdf import PdfReader
+
+
+def _rss_mb() -> float:
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def _corpus(n_queries: int) -> tuple[list[str], list[str]]:
+    from app.services.chunking import chunk_text
+
+    docs = ["\n".join(p.extract_text() or "" for p in PdfReader(path).pages)
+            for path in sorted(glob.glob("backend/app/data/uploads/*.pdf"))]
+    if not docs:
+        raise SystemExit("no sample PDFs in backend/app/data/uploads")
+    chunks = sorted({c for d in docs for c in chunk_text(d)})
+    rng = random.Random(0)
+    sentences = [s.split() for d in docs for s in re.split(r"(?<=[.!?])\s+|\n", d)]
+    sentences = [s for s in sentences if len(s) >= 8]
+    queries = [" ".join(w for w in s if rng.random() > 0.33) for s in rng.sample(sentences, min(n_queries, len(sentences)))]
+    return chunks, queries
+
+
+def child(backend: str, out: str, n_queries: int, repeat: int):
+    from app.services import vectorstore
+
+    chunks, queries = _corpus(n_queries)
+    t0 = time.perf_counter()
+    embedder = vectorstore.load_embedder(vectorstore.embed_model_name(), backend)
+    load_s = time.perf_counter() - t0
+
+    encode = lambda texts: vectorstore.encode_texts(embedder, texts, use_cache=False)
+    encode(chunks[:32])
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        chunk_vecs = encode(chunks)
+    encode_s = (time.perf_counter() - t0) / repeat
+    query_vecs = encode(queries)
+
+    np.savez(out, chunks=chunk_vecs, queries=query_vecs)
+    print(json.dumps({
+        "load_s": load_s,
+        "chunks": len(chunks),
+        "chunks_per_s": len(chunks) / encode_s,
+        "rss_mb": _rss_mb(),
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }))
+
+
+def _normalize(m: np.ndarray) -> np.ndarray:
+    return m / np.linalg.norm(m, axis=1, keepdims=True)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--backends", nargs="+", default=["torch", "onnx", "onnx-int8"])
+    ap.add_argument("--threads", type=int, default=0, help="EMBED_THREADS for every backend (0 = runtime default)")
+    ap.add_argument("--queries", type=int, default=50)
+    ap.add_argument("--k", type=int, default=5)
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--child", help=argparse.SUPPRESS)
+    ap.add_argument("--out", help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.child:
+        child(args.child, args.out, args.queries, args.repeat)
+        return
+
+    backends = ["torch"] + [b for b in args.backends if b != "torch"]
+    env = {**os.environ, "EMBED_THREADS": str(args.threads)}
+    results, vectors = {}, {}
+    with tempfile.TemporaryDirectory(prefix="bench_embed_") as tmp:
+        for backend in backends:
+            out = os.path.join(tmp, f"{backend}.npz")
+            proc = subprocess.run(
+                [sys.executable, "-m", "benchmarks.bench_embed_backends", "--child", backend, "--out", out,
+                 "--queries", str(args.queries), "--repeat", str(args.repeat)],
+                env=env, capture_output=True, text=True,
+            )
+            if proc.returncode != 0:
+                print(f"{backend}: failed\n{proc.stderr.strip().splitlines()[-1] if proc.stderr else ''}")
+                continue
+            results[backend] = json.loads(proc.stdout.strip().splitlines()[-1])
+            with np.load(out) as data:
+                vectors[backend] = {k: _normalize(data[k]) for k in ("chunks", "queries")}
+
+    if "torch" not in vectors:
+        raise SystemExit("the torch baseline failed; nothing to compare against")
+    ref = vectors["torch"]
+    ref_top = np.argsort(-(ref["queries"] @ ref["chunks"].T), axis=1)[:, :args.k]
+    first = next(iter(results.values()))
+    print(f"{first['chunks']} chunks, {len(ref['queries'])} queries, threads={args.threads or 'default'}, top-{args.k}")
+    print(f"{'backend':<11}{'load s':>8}{'chunks/s':>10}{'rss MB':>8}{'peak MB':>9}{'cos mean':>10}{'cos min':>9}{'top-k':>7}")
+    for backend, r in results.items():
+        vec = vectors[backend]
+        cos = np.sum(vec["chunks"] * ref["chunks"], axis=1)
+        top = np.argsort(-(vec["queries"] @ vec["chunks"].T), axis=1)[:, :args.k]
+        overlap = np.mean([len(set(a) & set(b)) / args.k for a, b in zip(top, ref_top)])
+        print(
+            f"{backend:<11}{r['load_s']:>8.2f}{r['chunks_per_s']:>10.1f}{r['rss_mb']:>8.0f}{r['peak_rss_mb']:>9.0f}"
+            f"{cos.mean():>10.4f}{cos.min():>9.4f}{overlap:>7.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Ingest throughput: per-chunk encode loop (old upsert_document) vs batched matrix encode.
+
+Run from backend/:
+    python -m benchmarks.bench_ingest --pages 10 --batch-sizes 8 32 64
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from app.services import vectorstore
+from app.services.embedcache import get_embedding_cache
+
+
+def _sample_pages(n_pages: int) -> list[dict]:
+    para = (
+        "Built and deployed machine learning pipelines in Python with PyTorch and scikit-learn. "
+        "Designed REST APIs with FastAPI, containerised services with Docker and Kubernetes, "
+        "and improved model latency by 35% through batching and quantisation. "
+    )
+    return [{"page": i + 1, "text": para * 20} for i in range(n_pages)]
+
+
+def _loop_upsert(collection, embedder, doc_type, pages, doc_id):
+    # Baseline: the original one-forward-pass-per-chunk implementation.
+    ids, embeddings, metadatas, documents = [], [], [], []
+    for p in pages:
+        for idx, chunk in enumerate(vectorstore._safe_chunks(p["text"])):
+            ids.append(f"{doc_id}_{doc_type}_p{p['page']}_c{idx}")
+            embeddings.append(embedder.encode(chunk).tolist())
+            metadatas.append({"source": doc_type, "page": p["page"], "doc_id": doc_id})
+            documents.append(chunk)
+    if ids:
+        collection.upsert(ids=ids, embeddings=embeddings, metadatas=metadatas, documents=documents)
+    return len(ids)
+
+
+def _run(label, fn, client, embedder, pages, doc_id):
+    # Fresh collection and empty cache so every run pays for every chunk it encodes
+    collection = vectorstore.get_collection(client, name=f"bench_{doc_id}")
+    get_embedding_cache().clear()
+    t0 = time.perf_counter()
+    n = fn(collection, embedder, "resume", pages, doc_id)
+    dt = time.perf_counter() - t0
+    print(f"{label:<28} chunks={n:<5} {dt:8.3f}s  {n / dt:10.1f} chunks/sec")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--pages", type=int, default=10)
+    ap.add_argument("--batch-sizes", type=int, nargs="+", default=[8, 32, 64])
+    args = ap.parse_args()
+
+    embedder = vectorstore.get_embedder(vectorstore.embed_model_name())
+    client = vectorstore.get_chroma_client(tempfile.mkdtemp(prefix="bench_chroma_"))
+    pages = _sample_pages(args.pages)
+    embedder.encode("warmup")
+
+    _run("per-chunk loop", _loop_upsert, client, embedder, pages, "loop")
+    for bs in args.batch_sizes:
+        os.environ["EMBED_BATCH_SIZE"] = str(bs)
+        _run(f"batched (batch_size={bs})", vectorstore.upsert_document, client, embedder, pages, f"b{bs}")
+
+
+if __name__ == "__main__":
+    main()
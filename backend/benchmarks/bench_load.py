@@ -0,0 +1,346 @@
+"""
+End-to-end load test: drives /upload/{doc_type}, /interview/generate and /evaluation/score on
+a real uvicorn process at several concurrency levels.
+
+By default it starts everything itself: the fake OpenAI server (benchmarks/fake_openai.py,
+with --llm-latency-ms per call) and the app pointed at it, both on free local ports with
+throwaway Chroma/SQLite/upload directories. --llm stub uses the in-process stub backend
+instead; --base-url targets an already running app and skips both.
+
+Uploads cycle through the sample PDFs in backend/app/data/uploads with wait=true, so their
+latency covers parsing and embedding. Each upload gets a unique trailing PDF comment so it
+isn't served by content-hash dedup (--dedup keeps the files as they are). Generate/score
+requests run against one session holding a sample resume and JD.
+
+Per endpoint and concurrency level it reports p50/p95/p99 latency, time to first byte,
+throughput and the server's peak RSS (app process + its children, Linux /proc). --output
+writes the results as JSON; --compare prints the p95/throughput change against an earlier
+results file, e.g. one written on another commit.
+
+Run from backend/:
+    python -m benchmarks.bench_load --concurrency 1 4 16 --requests 40 --output load.json
+    python -m benchmarks.bench_load --concurrency 1 4 16 --requests 40 --compare load.json
+"""
+import argparse
+import asyncio
+import glob
+import json
+import os
+import platform
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+import httpx
+
+ENDPOINTS = ("upload", "generate", "score")
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait_ready(url: str, proc: subprocess.Popen, timeout: float = 120.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise SystemExit(f"server exited with code {proc.returncode} before becoming ready: {url}")
+        try:
+            if httpx.get(url, timeout=1.0).status_code < 500:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise SystemExit(f"timed out waiting for {url}")
+
+
+def _rss_bytes(pid: int) -> int:
+    """Resident memory of `pid` plus its direct children (e.g. the PDF parse process pool)."""
+    total = 0
+    pids = [pid]
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children") as f:
+            pids += [int(p) for p in f.read().split()]
+    except OSError:
+        pass
+    for p in pids:
+        try:
+            with open(f"/proc/{p}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        total += int(line.split()[1]) * 1024
+        except OSError:
+            continue
+    return total
+
+
+class RssSampler:
+    """Polls the server's RSS in a thread; peak() returns the maximum since the last reset()."""
+
+    def __init__(self, pid: int | None, interval: float = 0.05):
+        self.pid = pid
+        self.interval = interval
+        self._peak = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        if self.pid is not None:
+            self._thread.start()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._peak = max(self._peak, _rss_bytes(self.pid))
+            time.sleep(self.interval)
+
+    def reset(self):
+        self._peak = _rss_bytes(self.pid) if self.pid is not None else 0
+
+    def peak(self) -> int | None:
+        return self._peak if self.pid is not None else None
+
+    def stop(self):
+        self._stop.set()
+
+
+def _start_servers(args, workdir: str) -> tuple[str, list[subprocess.Popen]]:
+    procs = []
+    env = {
+        **os.environ,
+        "CHROMA_DIR": os.path.join(workdir, "chroma"),
+        "SQLITE_PATH": os.path.join(workdir, "app.db"),
+        "DATA_DIR": os.path.join(workdir, "data"),
+    }
+    if args.llm == "fake":
+        port = _free_port()
+        fake = subprocess.Popen(
+            [sys.executable, "-m", "benchmarks.fake_openai", "--port", str(port),
+             "--latency-ms", str(args.llm_latency_ms), "--jitter-ms", str(args.llm_latency_ms / 5)],
+            env=env,
+        )
+        procs.append(fake)
+        _wait_ready(f"http://127.0.0.1:{port}/stats", fake)
+        env.update(LLM_BACKEND="openai", OPENAI_BASE_URL=f"http://127.0.0.1:{port}/v1", OPENAI_API_KEY="fake")
+    else:
+        env.update(LLM_BACKEND="stub", STUB_LLM_LATENCY_MS=str(args.llm_latency_ms))
+
+    port = _free_port()
+    app = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning"],
+        env=env,
+    )
+    procs.append(app)
+    base_url = f"http://127.0.0.1:{port}"
+    _wait_ready(base_url + "/", app)
+    return base_url, procs
+
+
+class Workload:
+    def __init__(self, client: httpx.AsyncClient, pdfs: list[str], dedup: bool):
+        self.client = client
+        self.files = {path: open(path, "rb").read() for path in pdfs}
+        self.dedup = dedup
+        self.session_id = None
+        self._n = 0
+
+    def _pdf(self, doc_type: str) -> tuple[str, bytes]:
+        paths = [p for p in self.files if p.endswith(f"_{doc_type}.pdf")] or list(self.files)
+        self._n += 1
+        path = paths[self._n % len(paths)]
+        data = self.files[path]
+        if not self.dedup:
+            # Bytes after %%EOF are ignored by PDF readers but change the content hash
+            data += f"\n% bench {os.getpid()} {self._n} {time.time_ns()}\n".encode()
+        return os.path.basename(path), data
+
+    async def setup(self):
+        """One session with a resume and a JD for the generate/score requests."""
+        for doc_type in ("jd", "resume"):
+            name, data = self._pdf(doc_type)
+            resp = await self.client.post(
+                f"/upload/{doc_type}", files={"file": (name, data, "application/pdf")},
+                params={"wait": "true", **({"session_id": self.session_id} if self.session_id else {})},
+            )
+            resp.raise_for_status()
+            self.session_id = resp.json()["session_id"]
+
+    def request(self, endpoint: str, i: int) -> tuple[str, str, dict]:
+        if endpoint == "upload":
+            doc_type = "resume" if i % 2 else "jd"
+            name, data = self._pdf(doc_type)
+            return "POST", f"/upload/{doc_type}", {
+                "files": {"file": (name, data, "application/pdf")},
+                "params": {"wait": "true"},
+            }
+        if endpoint == "generate":
+            return "POST", "/interview/generate", {
+                "json": {"role": "Data Analyst", "company": "Acme", "num_questions": 5, "session_id": self.session_id},
+            }
+        return "POST", "/evaluation/score", {
+            "json": {
+                "role": "Data Analyst",
+                "company": "Acme",
+                "question": "How would you build a dashboard for weekly sales?",
+                "answer": f"I would model the data in SQL, validate it in pandas and publish it in Tableau ({i}).",
+                "session_id": self.session_id,
+            },
+        }
+
+
+async def _one(client: httpx.AsyncClient, method: str, path: str, kwargs: dict) -> tuple[float, float, bool]:
+    t0 = time.perf_counter()
+    try:
+        async with client.stream(method, path, **kwargs) as resp:
+            ttfb = time.perf_counter() - t0
+            body = await resp.aread()
+            ok = resp.status_code < 400 and b'"error"' not in body[:200]
+    except httpx.HTTPError:
+        return time.perf_counter() - t0, time.perf_counter() - t0, False
+    return time.perf_counter() - t0, ttfb, ok
+
+
+def _pct(values: list[float], p: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(p * len(values)))] if values else 0.0
+
+
+async def run_level(workload: Workload, endpoint: str, concurrency: int, requests: int, rss: RssSampler) -> dict:
+    sem = asyncio.Semaphore(concurrency)
+    results = []
+
+    async def worker(i: int):
+        async with sem:
+            method, path, kwargs = workload.request(endpoint, i)
+            results.append(await _one(workload.client, method, path, kwargs))
+
+    rss.reset()
+    t0 = time.perf_counter()
+    await asyncio.gather(*[worker(i) for i in range(requests)])
+    wall = time.perf_counter() - t0
+
+    latencies = [r[0] for r in results if r[2]]
+    ttfbs = [r[1] for r in results if r[2]]
+    peak = rss.peak()
+    return {
+        "endpoint": endpoint,
+        "concurrency": concurrency,
+        "requests": requests,
+        "errors": sum(not r[2] for r in results),
+        "p50_ms": _pct(latencies, 0.50) * 1000,
+        "p95_ms": _pct(latencies, 0.95) * 1000,
+        "p99_ms": _pct(latencies, 0.99) * 1000,
+        "mean_ms": statistics.mean(latencies) * 1000 if latencies else 0.0,
+        "ttfb_p50_ms": _pct(ttfbs, 0.50) * 1000,
+        "throughput_rps": len(latencies) / wall if wall else 0.0,
+        "peak_rss_mb": peak / 2**20 if peak is not None else None,
+    }
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _print_row(r: dict, baseline: dict | None = None):
+    rss = f"{r['peak_rss_mb']:8.1f}" if r["peak_rss_mb"] is not None else "       -"
+    line = (
+        f"{r['endpoint']:<9}{r['concurrency']:>4}{r['requests']:>6}{r['errors']:>5}"
+        f"{r['p50_ms']:>10.1f}{r['p95_ms']:>10.1f}{r['p99_ms']:>10.1f}{r['ttfb_p50_ms']:>10.1f}"
+        f"{r['throughput_rps']:>9.2f}{rss}"
+    )
+    if baseline:
+        dp95 = (r["p95_ms"] / baseline["p95_ms"] - 1) * 100 if baseline["p95_ms"] else 0.0
+        drps = (r["throughput_rps"] / baseline["throughput_rps"] - 1) * 100 if baseline["throughput_rps"] else 0.0
+        line += f"   p95 {dp95:+6.1f}%  rps {drps:+6.1f}%"
+    print(line)
+
+
+async def _run(args, base_url: str, pid: int | None) -> list[dict]:
+    pdfs = sorted(glob.glob("backend/app/data/uploads/*.pdf"))
+    if not pdfs:
+        raise SystemExit("no sample PDFs in backend/app/data/uploads")
+    baseline = {}
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = {(r["endpoint"], r["concurrency"]): r for r in json.load(f)["results"]}
+
+    rss = RssSampler(pid)
+    rss.start()
+    limits = httpx.Limits(max_connections=max(args.concurrency) * 2)
+    async with httpx.AsyncClient(base_url=base_url, timeout=args.timeout, limits=limits) as client:
+        workload = Workload(client, pdfs, args.dedup)
+        await workload.setup()
+        # Warm-up: model load, first Chroma query and LLM connection happen outside the measurements
+        for endpoint in args.endpoints:
+            await run_level(workload, endpoint, 1, 2, rss)
+
+        print(f"{'endpoint':<9}{'conc':>4}{'reqs':>6}{'err':>5}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+              f"{'ttfb ms':>10}{'req/s':>9}{'rss MB':>8}")
+        results = []
+        for endpoint in args.endpoints:
+            for concurrency in args.concurrency:
+                r = await run_level(workload, endpoint, concurrency, args.requests, rss)
+                results.append(r)
+                _print_row(r, baseline.get((endpoint, concurrency)))
+    rss.stop()
+    return results
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--endpoints", nargs="+", choices=ENDPOINTS, default=list(ENDPOINTS))
+    ap.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    ap.add_argument("--requests", type=int, default=40, help="requests per endpoint and concurrency level")
+    ap.add_argument("--llm", choices=["fake", "stub"], default="fake", help="fake OpenAI server or in-process stub")
+    ap.add_argument("--llm-latency-ms", type=float, default=300)
+    ap.add_argument("--base-url", help="load an already running app instead of starting one (no RSS then)")
+    ap.add_argument("--dedup", action="store_true", help="upload the sample PDFs unchanged (dedup fast path)")
+    ap.add_argument("--timeout", type=float, default=120)
+    ap.add_argument("--output", help="write results as JSON")
+    ap.add_argument("--compare", help="earlier --output file to diff p95/throughput against")
+    args = ap.parse_args()
+
+    procs = []
+    with tempfile.TemporaryDirectory(prefix="bench_load_") as workdir:
+        try:
+            if args.base_url:
+                base_url, pid = args.base_url, None
+            else:
+                base_url, procs = _start_servers(args, workdir)
+                pid = procs[-1].pid
+            results = asyncio.run(_run(args, base_url, pid))
+        finally:
+            for p in procs:
+                p.terminate()
+            for p in procs:
+                try:
+                    p.wait(timeout=30)
+                except subprocess.TimeoutExpired:
+                    p.kill()
+
+    if args.output:
+        report = {
+            "commit": _git_commit(),
+            "timestamp": datetime.utcnow().isoformat(),
+            "python": platform.python_version(),
+            "cpus": os.cpu_count(),
+            "config": {k: v for k, v in vars(args).items() if k not in ("output", "compare")},
+            "results": results,
+        }
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+PDF parsing: sequential pypdf vs the process pool, time to first page, and the page-text cache.
+
+Builds a large PDF by repeating the sample uploads' pages, then runs iter_pages three ways:
+single process, process pool, and a second pass served from the page cache.
+
+Run from backend/:
+    python -m benchmarks.bench_parse --pages 120
+"""
+import argparse
+import glob
+import os
+import tempfile
+import time
+
+from pypdf import PdfReader, PdfWriter
+
+from app import db
+from app.services import parsing
+from app.services.concurrency import shutdown_executor
+from app.services.documents import content_hash
+
+
+def _build_pdf(path: str, pages: int):
+    sources = sorted(glob.glob("backend/app/data/uploads/*.pdf"))
+    if not sources:
+        raise SystemExit("no sample PDFs in backend/app/data/uploads")
+    source_pages = [p for src in sources for p in PdfReader(src).pages]
+    writer = PdfWriter()
+    for i in range(pages):
+        writer.add_page(source_pages[i % len(source_pages)])
+    with open(path, "wb") as f:
+        writer.write(f)
+
+
+def _run(label: str, path: str, file_hash: str | None):
+    t0 = time.perf_counter()
+    first = None
+    count = 0
+    for _ in parsing.iter_pages(path, file_hash):
+        if first is None:
+            first = time.perf_counter() - t0
+        count += 1
+    total = time.perf_counter() - t0
+    print(f"{label:<20} pages={count:<5} first page={first * 1000:8.1f} ms   total={total * 1000:8.1f} ms   "
+          f"{count / total:7.1f} pages/sec")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--pages", type=int, default=120)
+    ap.add_argument("--workers", type=int, default=min(4, os.cpu_count() or 1))
+    args = ap.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="bench_parse_")
+    path = os.path.join(tmp, "big.pdf")
+    _build_pdf(path, args.pages)
+    os.environ["SQLITE_PATH"] = os.path.join(tmp, "bench.db")
+    db.init_db()
+
+    try:
+        os.environ["PARSE_WORKERS"] = "1"
+        _run("sequential", path, None)
+
+        # PARSE_WORKERS=1 means no pool at all (the default on 1-CPU hosts), so the parallel
+        # run always uses at least 2 workers
+        workers = max(2, args.workers)
+        os.environ["PARSE_WORKERS"] = str(workers)
+        os.environ["PARSE_PARALLEL_MIN_PAGES"] = "1"
+        parsing.get_process_pool().submit(os.getpid).result()  # spawn workers outside the timed run
+        _run(f"process pool ({workers})", path, None)
+
+        digest = content_hash(open(path, "rb").read())
+        _run("pool + fill cache", path, digest)
+        _run("page cache", path, digest)
+    finally:
+        shutdown_executor()
+        db.close_db()
+
+
+if __name__ == "__main__":
+    main()
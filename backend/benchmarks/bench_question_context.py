@@ -0,0 +1,73 @@
+"""
+Question-generation context: per-request retrieval vs the digest stored at ingestion.
+
+Ingests one sample resume and one sample JD (backend/app/data/uploads) into throwaway
+Chroma/SQLite directories, then builds the /interview/generate context both ways for
+--rounds requests and reports p50/p95 build time and prompt tokens. Retrieval is measured
+with the query embedding cache cleared each round, as for a new role/session.
+
+Run from backend/:
+    python -m benchmarks.bench_question_context --rounds 50
+"""
+import argparse
+import glob
+import os
+import tempfile
+import time
+
+from pypdf import PdfReader
+
+
+def _pct(values: list[float], p: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(p * len(values)))]
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rounds", type=int, default=50)
+    ap.add_argument("--role", default="Data Analyst")
+    args = ap.parse_args()
+
+    paths = {t: sorted(glob.glob(f"backend/app/data/uploads/*_{t}.pdf")) for t in ("resume", "jd")}
+    if not all(paths.values()):
+        raise SystemExit("need a sample resume and JD in backend/app/data/uploads")
+
+    with tempfile.TemporaryDirectory(prefix="bench_qctx_") as tmp:
+        os.environ.update(CHROMA_DIR=os.path.join(tmp, "chroma"), SQLITE_PATH=os.path.join(tmp, "app.db"))
+        from app.db import close_db, init_db
+        from app.routers.interview import _digest_context, _retrieve_context
+        from app.services import vectorstore
+        from app.services.digest import build_digest, store_digest
+        from app.services.embedcache import get_embedding_cache
+
+        init_db()
+        embedder, collection = vectorstore.default_embedder(), vectorstore.default_collection()
+        doc_ids = []
+        for doc_type, files in paths.items():
+            pages = [{"page": i + 1, "text": p.extract_text() or ""} for i, p in enumerate(PdfReader(files[0]).pages)]
+            doc_id = f"bench_{doc_type}"
+            vectorstore.upsert_document(collection, embedder, doc_type=doc_type, pages=pages, doc_id=doc_id)
+            store_digest(doc_id, doc_type, build_digest("\n".join(p["text"] for p in pages), doc_type))
+            doc_ids.append(doc_id)
+
+        def retrieval():
+            get_embedding_cache().clear()
+            return _retrieve_context(args.role, doc_ids)
+
+        modes = {"retrieval": retrieval, "digest": lambda: _digest_context(doc_ids)}
+        print(f"{'context':<10}{'p50 ms':>9}{'p95 ms':>9}{'tokens':>8}")
+        for name, build in modes.items():
+            build()
+            times = []
+            for _ in range(args.rounds):
+                t0 = time.perf_counter()
+                context = build()
+                times.append(time.perf_counter() - t0)
+            print(f"{name:<10}{_pct(times, 0.5) * 1000:>9.2f}{_pct(times, 0.95) * 1000:>9.2f}{context.tokens:>8}")
+        vectorstore.close_resources()
+        close_db()
+
+
+if __name__ == "__main__":
+    main()
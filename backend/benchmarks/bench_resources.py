@@ -0,0 +1,49 @@
+"""
+Per-request resource setup cost: fresh construction vs the shared registry.
+
+Run from backend/:
+    python -m benchmarks.bench_resources --rounds 5
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from app.services import vectorstore
+
+
+def _time(fn, rounds: int) -> float:
+    t0 = time.perf_counter()
+    for _ in range(rounds):
+        fn()
+    return (time.perf_counter() - t0) / rounds
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rounds", type=int, default=5)
+    ap.add_argument("--model", default=vectorstore.embed_model_name())
+    args = ap.parse_args()
+
+    chroma_dir = tempfile.mkdtemp(prefix="bench_chroma_")
+
+    def fresh():
+        vectorstore.load_embedder(args.model)
+        vectorstore.get_collection(vectorstore.open_chroma_client(chroma_dir))
+
+    def shared():
+        vectorstore.get_embedder(args.model)
+        vectorstore.get_collection(vectorstore.get_chroma_client(chroma_dir))
+
+    shared()  # first call populates the registry (this is what warm-up does at boot)
+    fresh_s = _time(fresh, args.rounds)
+    shared_s = _time(shared, args.rounds)
+
+    print(f"model={args.model} chroma_dir={chroma_dir} pid={os.getpid()}")
+    print(f"fresh construction per request : {fresh_s * 1000:10.2f} ms")
+    print(f"shared registry per request    : {shared_s * 1000:10.4f} ms")
+    print(f"latency removed per request    : {(fresh_s - shared_s) * 1000:10.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Retrieval: vector-only vs hybrid (BM25 + vector, reciprocal rank fusion) search.
+
+Indexes every sample PDF in backend/app/data/uploads into a throwaway Chroma directory, then
+runs two query sets against the whole collection in both modes:
+
+  keyword   single skill/tool terms that occur in only a few chunks ("tableau", "pytorch");
+            relevant = the chunks containing the term
+  sentence  sentences sampled from the documents with a third of their words dropped;
+            relevant = the chunks holding at least 80% of the sentence's words
+
+recall@k = distinct relevant chunks found in the top k / min(k, relevant chunks), averaged per query.
+Latency is per query_many() call with one query text (embedding cache warmed first).
+
+Run from backend/:
+    python -m benchmarks.bench_retrieval --keywords 40 --sentences 40
+"""
+import argparse
+import glob
+import os
+import random
+import re
+import statistics
+import tempfile
+import time
+from collections import Counter
+
+from pypdf import PdfReader
+
+
+def _words(text: str) -> list[str]:
+    return re.findall(r"\w+", text.lower())
+
+
+def _keyword_queries(chunks: list[str], n: int, rng: random.Random, tokenize) -> list[tuple[str, set]]:
+    df = Counter(t for text in chunks for t in set(tokenize(text)))
+    terms = sorted(t for t, c in df.items() if c <= 3 and len(t) >= 4 and not t.isdigit())
+    out = []
+    for term in rng.sample(terms, min(n, len(terms))):
+        out.append((term, {text for text in chunks if term in tokenize(text)}))
+    return out
+
+
+def _sentence_queries(docs: list[str], chunks: list[str], n: int, rng: random.Random) -> list[tuple[str, set]]:
+    sentences = [_words(s) for d in docs for s in re.split(r"(?<=[.!?])\s+|\n", d)]
+    sentences = [s for s in sentences if len(s) >= 8]
+    chunk_words = {text: set(_words(text)) for text in chunks}
+    out = []
+    for s in rng.sample(sentences, min(n, len(sentences))):
+        relevant = {text for text, words in chunk_words.items() if sum(w in words for w in s) >= 0.8 * len(s)}
+        if relevant:
+            out.append((" ".join(w for w in s if rng.random() > 0.33), relevant))
+    return out
+
+
+def _run(vectorstore, collection, embedder, queries: list[tuple[str, set]], ks: list[int]) -> tuple[dict, list[float]]:
+    recalls = {k: [] for k in ks}
+    latencies = []
+    for text, relevant in queries:
+        t0 = time.perf_counter()
+        hits = vectorstore.query_many(collection, embedder, [text], k=max(ks))[0]
+        latencies.append(time.perf_counter() - t0)
+        texts = [h["text"] for h in hits]
+        for k in ks:
+            recalls[k].append(len(relevant & set(texts[:k])) / min(k, len(relevant)))
+    return {k: statistics.mean(v) for k, v in recalls.items()}, latencies
+
+
+def _pct(values: list[float], p: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(p * len(values)))]
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--ks", default="3,5,8")
+    ap.add_argument("--keywords", type=int, default=40)
+    ap.add_argument("--sentences", type=int, default=40)
+    args = ap.parse_args()
+    ks = [int(k) for k in args.ks.split(",")]
+
+    paths = sorted(glob.glob("backend/app/data/uploads/*.pdf"))
+    if not paths:
+        raise SystemExit("no sample PDFs in backend/app/data/uploads")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["CHROMA_DIR"] = tmp
+        from app.services import vectorstore
+        from app.services.lexical import tokenize
+
+        embedder = vectorstore.default_embedder()
+        collection = vectorstore.default_collection()
+        docs = []
+        t0 = time.perf_counter()
+        for i, path in enumerate(paths):
+            pages = [{"page": n + 1, "text": p.extract_text() or ""} for n, p in enumerate(PdfReader(path).pages)]
+            docs.append("\n".join(p["text"] for p in pages))
+            doc_type = "jd" if path.endswith("_jd.pdf") else "resume"
+            vectorstore.upsert_document(collection, embedder, doc_type=doc_type, pages=pages, doc_id=f"doc{i}")
+        index_s = time.perf_counter() - t0
+
+        got = collection.get(include=["documents"])
+        # Chunks are compared by text: re-uploaded samples repeat chunks that search collapses into one hit
+        chunks = sorted(set(got["documents"]))
+        rng = random.Random(0)
+        query_sets = {
+            "keyword": _keyword_queries(chunks, args.keywords, rng, tokenize),
+            "sentence": _sentence_queries(docs, chunks, args.sentences, rng),
+        }
+        lexical = vectorstore.get_lexical_index(collection).stats()
+        print(
+            f"{len(docs)} documents, {len(got['ids'])} chunks ({len(chunks)} distinct), {lexical['terms']} BM25 terms; "
+            f"indexed in {index_s:.1f} s"
+        )
+
+        # Warm the query embedding cache so both modes pay the same encode cost
+        os.environ["HYBRID_SEARCH"] = "0"
+        for queries in query_sets.values():
+            _run(vectorstore, collection, embedder, queries, ks)
+
+        header = "  ".join(f"recall@{k}" for k in ks)
+        print(f"{'queries':<10}{'mode':<8}{header}  p50 ms  p95 ms")
+        for name, queries in query_sets.items():
+            for mode, flag in (("vector", "0"), ("hybrid", "1")):
+                os.environ["HYBRID_SEARCH"] = flag
+                recalls, latencies = _run(vectorstore, collection, embedder, queries, ks)
+                cols = "  ".join(f"{recalls[k]:8.3f}" for k in ks)
+                print(
+                    f"{name:<10}{mode:<8}{cols}  {_pct(latencies, 0.5) * 1000:6.2f}  {_pct(latencies, 0.95) * 1000:6.2f}"
+                    f"   (n={len(queries)})"
+                )
+        vectorstore.close_resources()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Cold start: time from spawning uvicorn to the first successful health check, per warm-up mode.
+
+For each WARMUP_ON_STARTUP mode it starts a fresh app process (stub LLM backend, throwaway
+data directories) and measures:
+
+  import    `import app.main` in a fresh interpreter (separate process, no server)
+  live      spawn -> first 200 from GET /        (process accepts traffic)
+  ready     spawn -> first 200 from GET /ready   (preload finished, if any)
+  first     latency of the first /interview/generate after /ready; lazy mode pays the
+            embedder/Chroma load here instead
+
+Run from backend/:
+    python -m benchmarks.bench_startup --rounds 3 --modes 0 background 1
+"""
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _import_seconds() -> float:
+    code = "import time; t = time.perf_counter(); import app.main; print(time.perf_counter() - t)"
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def _poll(url: str, proc: subprocess.Popen, started: float, timeout: float) -> float:
+    while time.perf_counter() - started < timeout:
+        if proc.poll() is not None:
+            raise SystemExit(f"server exited with code {proc.returncode}")
+        try:
+            if httpx.get(url, timeout=1.0).status_code == 200:
+                return time.perf_counter() - started
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.02)
+    raise SystemExit(f"timed out waiting for {url}")
+
+
+def _boot(mode: str, timeout: float) -> dict:
+    with tempfile.TemporaryDirectory(prefix="bench_startup_") as workdir:
+        port = _free_port()
+        env = {
+            **os.environ,
+            "WARMUP_ON_STARTUP": mode,
+            "LLM_BACKEND": "stub",
+            "CHROMA_DIR": os.path.join(workdir, "chroma"),
+            "SQLITE_PATH": os.path.join(workdir, "app.db"),
+            "DATA_DIR": os.path.join(workdir, "data"),
+        }
+        base = f"http://127.0.0.1:{port}"
+        started = time.perf_counter()
+        proc = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port),
+             "--log-level", "warning"],
+            env=env,
+        )
+        try:
+            live = _poll(base + "/", proc, started, timeout)
+            ready = _poll(base + "/ready", proc, started, timeout)
+            t0 = time.perf_counter()
+            httpx.post(base + "/interview/generate", json={"role": "Data Analyst"}, timeout=timeout).raise_for_status()
+            first = time.perf_counter() - t0
+        finally:
+            proc.terminate()
+            proc.wait(timeout=30)
+    return {"live": live, "ready": ready, "first": first}
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rounds", type=int, default=3)
+    ap.add_argument("--modes", nargs="+", default=["0", "background", "1"], help="WARMUP_ON_STARTUP values")
+    ap.add_argument("--timeout", type=float, default=180)
+    args = ap.parse_args()
+
+    imports = [_import_seconds() for _ in range(args.rounds)]
+    print(f"import app.main: median {statistics.median(imports) * 1000:.0f} ms over {args.rounds} runs")
+    print(f"{'WARMUP_ON_STARTUP':<18}{'live ms':>10}{'ready ms':>10}{'first req ms':>14}")
+    for mode in args.modes:
+        runs = [_boot(mode, args.timeout) for _ in range(args.rounds)]
+        med = {k: statistics.median(r[k] for r in runs) * 1000 for k in ("live", "ready", "first")}
+        print(f"{mode:<18}{med['live']:>10.0f}{med['ready']:>10.0f}{med['first']:>14.0f}")
+
+
+if __name__ == "__main__":
+    main()
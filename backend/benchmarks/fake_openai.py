@@ -0,0 +1,113 @@
+"""
+Local fake of the OpenAI chat completions API, for exercising the LLM client offline.
+
+Answers question-generation and scoring prompts with the same schema-valid JSON as the
+in-process stub backend (LLM_BACKEND=stub), supports streaming, and can inject latency and
+429/500 errors so retries, deadlines, rate limiting and the circuit breaker can be observed.
+
+Run from backend/:
+    python -m benchmarks.fake_openai --port 8911 --latency-ms 300 --error-rate 0.1
+and point the app at it:
+    OPENAI_BASE_URL=http://127.0.0.1:8911/v1 OPENAI_API_KEY=fake uvicorn app.main:app
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from app.services.llm_backends import stub_completion
+
+app = FastAPI(title="Fake OpenAI")
+
+CONFIG = {
+    "latency_ms": float(os.getenv("FAKE_LATENCY_MS", "200")),
+    "jitter_ms": float(os.getenv("FAKE_JITTER_MS", "50")),
+    "error_rate": float(os.getenv("FAKE_ERROR_RATE", "0")),
+    "rate_limit_rate": float(os.getenv("FAKE_RATE_LIMIT_RATE", "0")),
+    "stream_chunk_chars": int(os.getenv("FAKE_STREAM_CHUNK_CHARS", "8")),
+}
+STATS = {"requests": 0, "errors": 0, "rate_limited": 0}
+
+
+def _usage(prompt: str, content: str) -> dict:
+    p, c = len(prompt) // 4, len(content) // 4
+    return {"prompt_tokens": p, "completion_tokens": c, "total_tokens": p + c}
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    STATS["requests"] += 1
+    body = await request.json()
+    prompt = body["messages"][-1]["content"]
+
+    await asyncio.sleep(max(0.0, random.gauss(CONFIG["latency_ms"], CONFIG["jitter_ms"])) / 1000)
+
+    roll = random.random()
+    if roll < CONFIG["rate_limit_rate"]:
+        STATS["rate_limited"] += 1
+        return JSONResponse(
+            status_code=429,
+            content={"error": {"message": "Rate limit reached", "type": "rate_limit_error"}},
+            headers={"retry-after": "0.2"},
+        )
+    if roll < CONFIG["rate_limit_rate"] + CONFIG["error_rate"]:
+        STATS["errors"] += 1
+        return JSONResponse(status_code=500, content={"error": {"message": "Injected failure", "type": "server_error"}})
+
+    content = stub_completion(prompt, "response_format" in body)
+    base = {"id": f"fake-{STATS['requests']}", "created": int(time.time()), "model": body.get("model", "fake")}
+
+    if body.get("stream"):
+        step = CONFIG["stream_chunk_chars"]
+
+        async def chunks():
+            for i in range(0, len(content), step):
+                delta = {"index": 0, "delta": {"content": content[i:i + step]}, "finish_reason": None}
+                yield "data: " + json.dumps({**base, "object": "chat.completion.chunk", "choices": [delta]}) + "\n\n"
+                await asyncio.sleep(0)
+            last = {**base, "object": "chat.completion.chunk",
+                    "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}], "usage": _usage(prompt, content)}
+            yield "data: " + json.dumps(last) + "\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(chunks(), media_type="text/event-stream")
+
+    return {
+        **base,
+        "object": "chat.completion",
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+        "usage": _usage(prompt, content),
+    }
+
+
+@app.get("/stats")
+def stats():
+    return {**STATS, "config": CONFIG}
+
+
+def main():
+    import uvicorn
+
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--port", type=int, default=8911)
+    ap.add_argument("--latency-ms", type=float, default=CONFIG["latency_ms"])
+    ap.add_argument("--jitter-ms", type=float, default=CONFIG["jitter_ms"])
+    ap.add_argument("--error-rate", type=float, default=CONFIG["error_rate"], help="fraction of 500 responses")
+    ap.add_argument("--rate-limit-rate", type=float, default=CONFIG["rate_limit_rate"], help="fraction of 429 responses")
+    args = ap.parse_args()
+    CONFIG.update(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+    )
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
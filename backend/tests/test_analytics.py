@@ -0,0 +1,36 @@
+import pytest
+
+from app import db
+from app.routers.analytics import _attempt_filter, _export_rows
+
+
+@pytest.fixture
+def database(tmp_path, monkeypatch):
+    monkeypatch.setenv("SQLITE_PATH", str(tmp_path / "app.db"))
+    db.close_db()
+    db.init_db()
+    with db.connection() as conn:
+        with conn:
+            conn.executemany(
+                "INSERT INTO attempts(created_at, role, company, total_score) VALUES(?,?,?,?)",
+                [(f"2024-05-01T10:{i % 60:02d}:00", "Analyst" if i % 2 else "Engineer", "Acme", i) for i in range(1203)],
+            )
+    yield
+    db.close_db()
+
+
+def test_export_pages_without_holding_a_connection(database):
+    where, params = _attempt_filter("Analyst", None, None, None)
+    batches = _export_rows(where, params, batch=250)
+    first = next(batches)
+    # Between batches (e.g. a slow client) no pooled connection is checked out
+    assert db._pool.stats()["in_use"] == 0
+    rows = first + [r for b in batches for r in b]
+    ids = [r[0] for r in rows]
+    assert len(ids) == 601
+    assert ids == sorted(ids)
+    assert all(r[2] == "Analyst" for r in rows)
+
+
+def test_export_without_filters(database):
+    assert sum(len(b) for b in _export_rows("", [], batch=500)) == 1203
@@ -0,0 +1,63 @@
+import random
+
+import pytest
+
+from app.services import vectorstore
+from app.services.chunking import approx_token_counts, chunk_text
+
+
+def _tokens(chunk: str) -> int:
+    return sum(approx_token_counts(chunk.split()))
+
+
+def _document(rng: random.Random) -> str:
+    words = [f"w{i}" for i in range(300)] + ["Python,", "SQL.", "(ETL)", "e.g.", "3.5"]
+    lines = []
+    for _ in range(rng.randint(1, 30)):
+        kind = rng.random()
+        if kind < 0.15:
+            lines.append(rng.choice(["EXPERIENCE", "KEY SKILLS", "Requirements:", "## Projects"]))
+        elif kind < 0.2:
+            lines.append("")
+        else:
+            n = rng.choice([3, 12, 40, 400])  # 400: one sentence far over any limit
+            sentence = " ".join(rng.choice(words) for _ in range(n)).capitalize() + "."
+            lines.append(("- " if kind < 0.6 else "") + sentence)
+    return "\n".join(lines)
+
+
+@pytest.mark.parametrize("max_tokens,overlap", [(16, 0), (50, 0), (50, 20), (200, 60)])
+def test_chunks_never_exceed_the_limit(max_tokens, overlap):
+    rng = random.Random(max_tokens * 100 + overlap)
+    for _ in range(200):
+        text = _document(rng)
+        chunks = chunk_text(text, max_tokens=max_tokens, overlap_tokens=overlap)
+        assert all(0 < _tokens(c) <= max_tokens for c in chunks)
+        if overlap == 0:
+            # Nothing dropped or repeated: the chunks are the text's words, in order
+            source = [w for w in text.split() if w not in ("-", "##")]
+            assert [w for c in chunks for w in c.split() if w not in ("-", "##")] == source
+
+
+def test_headings_start_chunks_and_long_sentences_split_on_words():
+    text = "SKILLS\n" + "Python SQL Spark. " * 3 + "\nEXPERIENCE\n" + " ".join(f"w{i}" for i in range(30)) + "."
+    chunks = chunk_text(text, max_tokens=12, overlap_tokens=0)
+    assert chunks[0].startswith("SKILLS")
+    assert any(c.startswith("EXPERIENCE") for c in chunks)
+    assert all(_tokens(c) <= 12 for c in chunks)
+    assert "w29." in chunks[-1]
+
+
+def test_empty_text():
+    assert chunk_text("") == []
+    assert chunk_text("   \n\n ") == []
+
+
+def test_chunk_limit_leaves_room_for_special_tokens(monkeypatch):
+    class Embedder:
+        max_seq_length = 128
+
+    monkeypatch.setenv("CHUNK_MAX_TOKENS", "400")
+    assert vectorstore.chunk_token_limit(Embedder()) == 126
+    monkeypatch.setenv("CHUNK_MAX_TOKENS", "100")
+    assert vectorstore.chunk_token_limit(Embedder()) == 100
@@ -0,0 +1,23 @@
+from app.services.context import build_context, estimate_tokens, interleave
+
+
+def _hits(source: str, scores: list[float]) -> list[dict]:
+    # Same length for every chunk, distinct words so none is dropped as overlapping
+    return [{"text": f"{source}-{i} " + f"{source}{i}w " * 40, "score": s} for i, s in enumerate(scores)]
+
+
+def test_tight_budget_keeps_both_sources():
+    resume, jd = _hits("cv", [0.9, 0.85, 0.8]), _hits("jd", [0.4, 0.3, 0.2])
+    budget = 2 * estimate_tokens(resume[0]["text"]) + 5
+
+    ranked = build_context(resume + jd, budget_tokens=budget)
+    assert "jd" not in ranked.text  # one score scale for two searches: the resume crowds the JD out
+
+    ctx = build_context(interleave(resume, jd), budget_tokens=budget, keep_order=True)
+    assert ctx.chunks == 2
+    assert "cv-0" in ctx.text and "jd-0" in ctx.text
+
+
+def test_interleave_orders_each_source_by_score():
+    resume, jd = _hits("cv", [0.1, 0.9]), _hits("jd", [0.5])
+    assert [h["text"].split()[0] for h in interleave(resume, jd)] == ["cv-1", "jd-0", "cv-0"]
@@ -0,0 +1,93 @@
+import json
+import sqlite3
+
+import pytest
+
+from app import db
+
+LEGACY_SCHEMA = """
+CREATE TABLE attempts (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created_at TEXT,
+    role TEXT,
+    company TEXT,
+    question TEXT,
+    answer TEXT,
+    total_score INTEGER,
+    breakdown_json TEXT
+)
+"""
+
+
+def _tables(conn) -> set[str]:
+    return {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type IN ('table', 'trigger')")}
+
+
+def test_migrates_legacy_database(tmp_path):
+    # A database written by the original app: one `attempts` table, no user_version
+    conn = sqlite3.connect(tmp_path / "legacy.db")
+    conn.execute(LEGACY_SCHEMA)
+    breakdown = {"relevance": 8, "clarity": 7, "technical_correctness": 6, "structure": 5, "impact": 4}
+    conn.execute(
+        "INSERT INTO attempts(created_at, role, company, question, answer, total_score, breakdown_json) VALUES(?,?,?,?,?,?,?)",
+        ("2024-05-01T10:00:00", "Data Analyst", "Acme", "q", "a", 30, json.dumps(breakdown)),
+    )
+    conn.commit()
+
+    db.migrate(conn)
+
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == len(db.MIGRATIONS)
+    assert {
+        "attempts", "documents", "attempt_rollups", "attempts_rollup", "sessions", "session_documents",
+        "page_texts", "ingest_jobs", "document_digests",
+    } <= _tables(conn)
+    assert conn.execute("SELECT relevance, impact FROM attempts").fetchone() == (8, 4)
+    assert conn.execute("SELECT attempts, total_sum FROM attempt_rollups").fetchone() == (1, 30)
+
+    # The rollup trigger keeps working for new rows, and migrating again is a no-op
+    conn.execute("INSERT INTO attempts(created_at, role, company, total_score) VALUES('2024-05-01T11:00:00', 'Data Analyst', 'Acme', 10)")
+    assert conn.execute("SELECT attempts, total_sum FROM attempt_rollups").fetchone() == (2, 40)
+    db.migrate(conn)
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == len(db.MIGRATIONS)
+
+
+def test_failed_migration_rolls_back(tmp_path, monkeypatch):
+    conn = sqlite3.connect(tmp_path / "app.db")
+    monkeypatch.setattr(db, "MIGRATIONS", ["CREATE TABLE a (x INTEGER)", "CREATE TABLE b (x INTEGER); CREATE TABLE a (y)"])
+    with pytest.raises(sqlite3.OperationalError):
+        db.migrate(conn)
+    assert not conn.in_transaction
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == 1
+    assert _tables(conn) == {"a"}
+
+
+def test_pool_close_with_connections_checked_out(tmp_path):
+    pool = db.ConnectionPool(str(tmp_path / "app.db"), size=2)
+    busy, idle = pool.acquire(), pool.acquire()
+    pool.release(idle)
+    pool.close()
+    assert pool.stats()["open"] == 1
+    pool.release(busy)
+    assert pool.stats()["open"] == 0
+    assert pool.stats()["idle"] == 0
+    with pytest.raises(sqlite3.ProgrammingError):
+        busy.execute("SELECT 1")
+    with pytest.raises(RuntimeError):
+        pool.acquire()
+
+
+def test_connection_returns_to_its_own_pool_across_reinit(tmp_path, monkeypatch):
+    monkeypatch.setenv("SQLITE_PATH", str(tmp_path / "app.db"))
+    monkeypatch.setenv("SQLITE_POOL_SIZE", "2")
+    db.close_db()
+    try:
+        with db.connection() as conn:
+            old_pool = db._pool
+            db.close_db()
+            db.init_db()
+            conn.execute("SELECT 1")
+        assert old_pool.stats()["open"] == 0
+        assert db._pool.stats()["open"] <= db._pool.size
+        assert db._pool.stats()["idle"] == db._pool.stats()["open"]
+    finally:
+        db.close_db()
@@ -0,0 +1,59 @@
+import pytest
+
+from app import db
+from app.services.context import estimate_tokens
+from app.services.digest import build_digest, load_digests, render_digest
+from app.services.documents import register_document
+from app.services.parsing import _store_pages
+
+JD = """Senior Data Analyst
+About the role
+We are a fintech startup building payment analytics for small businesses.
+Requirements:
+- 3+ years of experience with **SQL** and **Python** (pandas, numpy)
+- Build dashboards in **Power BI** or Tableau
+- Knowledge of data governance
+TECH STACK
+Snowflake, dbt, Airflow, AWS
+Contact:
+hr@example.com
+"""
+
+
+def test_jd_digest_has_skills_and_requirements():
+    digest = build_digest(JD, "jd")
+    assert digest["title"] == "Senior Data Analyst"
+    assert {"SQL", "Python", "Power BI", "Snowflake", "dbt", "Airflow", "AWS"} <= set(digest["skills"])
+    assert "Knowledge of data governance" not in digest["skills"]
+    assert any("dashboards" in r for r in digest["requirements"])
+    assert all("hr@example.com" not in s["items"] for s in digest["sections"])
+
+
+def test_digest_respects_token_cap(monkeypatch):
+    monkeypatch.setenv("DIGEST_MAX_TOKENS", "40")
+    long_jd = JD + "Responsibilities:\n" + "\n".join(f"- Own reporting stream {i} end to end" for i in range(50))
+    digest = build_digest(long_jd, "jd")
+    assert estimate_tokens(render_digest(digest)) <= 40
+    assert digest["skills"]  # skills are the last thing trimmed
+
+
+@pytest.fixture
+def database(tmp_path, monkeypatch):
+    monkeypatch.setenv("SQLITE_PATH", str(tmp_path / "app.db"))
+    db.close_db()
+    db.init_db()
+    yield
+    db.close_db()
+
+
+def test_load_digests_backfills_from_cached_pages(database):
+    # A document ingested before digests existed: its page text is cached, its digest isn't
+    register_document("hash1", "jd", "doc1", None, 1, 3)
+    _store_pages("hash1", [(0, JD)])
+    register_document("hash2", "resume", "doc2", None, 1, 2)  # no cached text: stays missing
+
+    digests = load_digests(["doc1", "doc2"])
+    assert list(digests) == ["doc1"]
+    assert "SQL" in digests["doc1"]["skills"]
+    with db.connection() as conn:
+        assert conn.execute("SELECT doc_id FROM document_digests").fetchall() == [("doc1",)]
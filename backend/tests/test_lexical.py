@@ -0,0 +1,97 @@
+import numpy as np
+import pytest
+
+from app.services.lexical import BM25Index, reciprocal_rank_fusion, tokenize
+
+CHUNKS = {
+    "a_resume_p1_c0": ("Built Kubernetes deployments and CI/CD pipelines in Python", {"doc_id": "a", "source": "resume"}),
+    "a_jd_p1_c0": ("Requirements: Kubernetes, Terraform and node.js experience", {"doc_id": "a_jd", "source": "jd"}),
+    "b_resume_p1_c0": ("Kubernetes operator written in Go; C++ and C# tooling", {"doc_id": "b", "source": "resume"}),
+    "b_resume_p1_c1": ("Led a data team doing SQL reporting", {"doc_id": "b", "source": "resume"}),
+}
+
+
+@pytest.fixture
+def index(tmp_path):
+    idx = BM25Index(str(tmp_path / "bm25.db"))
+    ids = list(CHUNKS)
+    idx.add(ids, [CHUNKS[i][0] for i in ids], [CHUNKS[i][1] for i in ids])
+    yield idx
+    idx.close()
+
+
+def _ids(hits):
+    return [cid for cid, _ in hits]
+
+
+def test_tokenize_keeps_skill_tokens():
+    assert tokenize("C++, C#, Node.js and the CI/CD") == ["c++", "c#", "node.js", "ci", "cd"]
+
+
+def test_search_is_scoped_by_documents_and_source(index):
+    assert set(_ids(index.search("kubernetes", 10))) == {"a_resume_p1_c0", "a_jd_p1_c0", "b_resume_p1_c0"}
+    assert _ids(index.search("kubernetes", 10, doc_ids=["a"])) == ["a_resume_p1_c0"]
+    assert _ids(index.search("kubernetes", 10, source_filter="jd")) == ["a_jd_p1_c0"]
+    assert index.search("kubernetes", 10, doc_ids=[]) == []
+    assert index.search("kubernetes", 10, source_filter="jd", doc_ids=["b"]) == []
+
+
+def test_rarer_terms_score_higher(index):
+    hits = index.search("kubernetes terraform", 10)
+    assert hits[0][0] == "a_jd_p1_c0"
+    assert all(a[1] >= b[1] for a, b in zip(hits, hits[1:]))
+
+
+def test_delete_documents_removes_postings_and_frequencies(index):
+    index.delete_documents(["b"])
+    assert "b_resume_p1_c0" not in _ids(index.search("kubernetes", 10))
+    assert index.search("sql reporting", 10) == []
+    assert index.stats()["chunks"] == 2
+    df = dict(index._conn.execute("SELECT term, df FROM terms"))
+    assert df["kubernetes"] == 2
+    assert "sql" not in df and "go" not in df
+
+
+def test_re_adding_a_chunk_does_not_double_count(index):
+    text, meta = CHUNKS["a_resume_p1_c0"]
+    index.add(["a_resume_p1_c0"], [text], [meta])
+    assert index.stats()["chunks"] == len(CHUNKS)
+    assert dict(index._conn.execute("SELECT term, df FROM terms"))["kubernetes"] == 3
+
+
+def test_reciprocal_rank_fusion():
+    fused = reciprocal_rank_fusion([["x", "y", "z"], ["y", "w"]], k=60)
+    assert [cid for cid, _ in fused] == ["y", "x", "w", "z"]
+    assert fused[0][1] == pytest.approx(1 / 62 + 1 / 61)
+
+
+def test_hybrid_search_fuses_and_respects_scope(tmp_path, monkeypatch):
+    pytest.importorskip("chromadb")
+    from app.services import vectorstore
+
+    # CHROMA_DIR points elsewhere: the index must follow the collection's own client
+    monkeypatch.setenv("CHROMA_DIR", str(tmp_path / "default"))
+    monkeypatch.setenv("HYBRID_SEARCH", "1")
+    collection = vectorstore.get_collection(vectorstore.open_chroma_client(str(tmp_path / "chroma")))
+    ids = list(CHUNKS)
+    # Dense vectors that know nothing about "Kubernetes": only BM25 can rank the b resume first
+    embeddings = np.eye(len(ids), dtype=np.float32)
+    collection.add(ids=ids, embeddings=embeddings, documents=[CHUNKS[i][0] for i in ids],
+                   metadatas=[CHUNKS[i][1] for i in ids])
+    index = vectorstore.get_lexical_index(collection)  # backfilled from the collection
+    assert index.stats()["chunks"] == len(ids)
+    assert index.path == str(tmp_path / "chroma" / f"bm25_{collection.id}.db")
+
+    query = embeddings[3:4]  # closest to b_resume_p1_c1 (SQL reporting)
+    hits = vectorstore._search_many(collection, query, ["go operator"], 2, "resume", ["b"])[0]
+    assert {h["id"] for h in hits} == {"b_resume_p1_c0", "b_resume_p1_c1"}
+    assert hits[0]["id"] == "b_resume_p1_c0"  # found by both rankings
+    assert hits[0]["score"] > hits[1]["score"]
+
+    scoped = vectorstore._search_many(collection, query, ["kubernetes"], 5, None, ["a"])[0]
+    assert {h["meta"]["doc_id"] for h in scoped} == {"a"}
+
+    vectorstore.delete_documents(collection, ["b"])
+    after = vectorstore._search_many(collection, query, ["go operator"], 5, "resume", None)[0]
+    assert {h["id"] for h in after} == {"a_resume_p1_c0"}
+    index.close()
@@ -0,0 +1,148 @@
+import asyncio
+import time
+
+import httpx
+import openai
+import pytest
+
+from app.services import llm
+from app.services.resilience import CircuitBreaker, CircuitOpenError
+
+
+def _status_error(cls, status: int):
+    response = httpx.Response(status, request=httpx.Request("POST", "https://api.test/chat/completions"))
+    return cls("upstream error", response=response, body=None)
+
+
+class FakeBackend:
+    remote = True
+
+    def __init__(self, *outcomes):
+        self.outcomes = list(outcomes)
+        self.calls = 0
+
+    def _next(self):
+        self.calls += 1
+        outcome = self.outcomes.pop(0) if self.outcomes else "ok"
+        if isinstance(outcome, BaseException):
+            raise outcome
+        return outcome
+
+    def create(self, timeout, **kwargs):
+        return self._next()
+
+    async def acreate(self, timeout, **kwargs):
+        if self.outcomes and self.outcomes[0] == "hang":
+            self.outcomes.pop(0)
+            await asyncio.sleep(3600)
+        return self._next()
+
+
+@pytest.fixture
+def client(monkeypatch):
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.05)
+    monkeypatch.setattr(llm, "breaker", breaker)
+    monkeypatch.setattr(llm, "LLM_MAX_RETRIES", 0)
+
+    def use(*outcomes):
+        backend = FakeBackend(*outcomes)
+        monkeypatch.setattr(llm, "_backend", backend)
+        return backend
+
+    return breaker, use
+
+
+KWARGS = {"model": "m", "messages": [{"role": "user", "content": "hi"}]}
+
+
+def _open(breaker: CircuitBreaker):
+    for _ in range(breaker.failure_threshold):
+        breaker.before_call()
+        breaker.record_failure()
+    assert breaker.state == "open"
+    time.sleep(breaker.reset_timeout)
+    assert breaker.state == "half_open"
+
+
+def test_opens_after_threshold_and_closes_after_trial_success():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.05)
+    breaker.record_failure()
+    assert breaker.state == "closed"
+    breaker.record_failure()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    time.sleep(0.05)
+    assert breaker.before_call() is True
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()  # only one trial at a time
+    breaker.record_success()
+    assert breaker.state == "closed"
+    assert breaker.before_call() is False
+
+
+def test_failed_trial_reopens():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.05)
+    _open(breaker)
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == "open"
+
+
+def test_half_open_trial_429_releases_slot(client):
+    breaker, use = client
+    _open(breaker)
+    use(_status_error(openai.RateLimitError, 429))
+    with pytest.raises(openai.RateLimitError):
+        llm._create(KWARGS, timeout=5)
+    assert breaker.state == "half_open"
+    assert not breaker.trial_in_flight
+    use("ok")
+    assert llm._create(KWARGS, timeout=5) == "ok"
+    assert breaker.state == "closed"
+
+
+def test_cancelled_trial_releases_slot(client):
+    breaker, use = client
+    _open(breaker)
+    use("hang")
+
+    async def cancel_trial():
+        task = asyncio.create_task(llm._acreate(KWARGS, timeout=5))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(cancel_trial())
+    assert not breaker.trial_in_flight
+    use("ok")
+    assert asyncio.run(llm._acreate(KWARGS, timeout=5)) == "ok"
+
+
+def test_client_error_closes_half_open_breaker(client):
+    breaker, use = client
+    _open(breaker)
+    use(_status_error(openai.BadRequestError, 400))
+    with pytest.raises(openai.BadRequestError):
+        llm._create(KWARGS, timeout=5)
+    assert breaker.state == "closed"
+
+
+def test_own_deadline_is_not_an_upstream_failure(client, monkeypatch):
+    breaker, use = client
+    backend = use()
+    monkeypatch.setattr(llm.limiter, "reserve", lambda tokens: 10.0)
+    with pytest.raises(openai.APITimeoutError):
+        llm._create(KWARGS, timeout=0.01)
+    assert backend.calls == 0
+    assert breaker.failures == 0
+
+
+def test_local_error_does_not_close_breaker(client):
+    breaker, use = client
+    _open(breaker)
+    use(TypeError("bad kwargs"))
+    with pytest.raises(TypeError):
+        llm._create(KWARGS, timeout=5)
+    assert breaker.state == "half_open"
+    assert not breaker.trial_in_flight
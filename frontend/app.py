@@ -1,4 +1,5 @@
 import os
+import time
 import requests
 import streamlit as st
 from dotenv import load_dotenv
@@ -6,6 +7,7 @@ from dotenv import load_dotenv
 load_dotenv()
 
 API = os.getenv("API_BASE", "http://127.0.0.1:8000")
+INGEST_TIMEOUT = float(os.getenv("INGEST_TIMEOUT", "300"))
 
 st.set_page_config(page_title="AI Interview Assistant", page_icon="🧠", layout="wide")
 
@@ -30,6 +32,31 @@ def safe_post(url: str, **kwargs):
         st.text(str(e))
         st.stop()
 
+def wait_for_ingest(resp: dict) -> dict:
+    """
+    Poll the upload's ingestion job until it finishes; returns the final job (or resp if nothing
+    was queued). Gives up with status "failed" on an error response or after INGEST_TIMEOUT seconds.
+    """
+    job_id = resp.get("job_id")
+    if not job_id:
+        return resp
+    status = st.empty()
+    deadline = time.monotonic() + INGEST_TIMEOUT
+    try:
+        while time.monotonic() < deadline:
+            r = safe_get(f"{API}/upload/jobs/{job_id}")
+            job = r.json() if r.text else {}
+            if r.status_code != 200:
+                return {**resp, "status": "failed", "error": job.get("error") or f"job status request failed ({r.status_code})"}
+            if job.get("status") in ("done", "failed"):
+                # The job may belong to another upload of the same file: keep this upload's session
+                return {**job, "session_id": resp.get("session_id")}
+            status.info(f"⏳ Processing document ({job.get('stage', 'queued')}, {job.get('pages', 0)} pages so far)...")
+            time.sleep(0.5)
+    finally:
+        status.empty()
+    return {**resp, "status": "failed", "error": f"still processing after {INGEST_TIMEOUT:.0f}s, try again later"}
+
 # ----------------------------
 # Session State init
 # ----------------------------
@@ -46,6 +73,9 @@ if "answers" not in st.session_state:
     st.session_state["answers"] = {}
 if "overall_result" not in st.session_state:
     st.session_state["overall_result"] = None
+# Backend session: scopes retrieval to this candidate's resume + JD
+if "session_id" not in st.session_state:
+    st.session_state["session_id"] = None
 
 # ----------------------------
 # Header
@@ -73,28 +103,44 @@ if selected == "Upload":
     with c1:
         resume = st.file_uploader("Resume (PDF)", type=["pdf"], key="resume_file")
         if st.button("Upload Resume", use_container_width=False) and resume:
-            r = safe_post(f"{API}/upload/resume", files={"file": resume.getvalue()})
+            r = safe_post(
+                f"{API}/upload/resume",
+                files={"file": resume.getvalue()},
+                params={"session_id": st.session_state["session_id"]} if st.session_state["session_id"] else None,
+            )
 
             if r.status_code != 200:
                 st.error(f"Upload failed ({r.status_code})")
                 st.text(r.text)
             else:
-                resp = r.json() if r.text else {}
+                resp = wait_for_ingest(r.json() if r.text else {})
+                if resp.get("status") == "failed":
+                    st.error(f"Processing failed: {resp.get('error')}")
+                    st.stop()
                 st.session_state["resume_uploaded"] = True
+                st.session_state["session_id"] = resp.get("session_id") or st.session_state["session_id"]
                 st.success("✅ Resume uploaded successfully!")
                 st.caption(f"File: **{resume.name}**  |  Pages: **{resp.get('pages', '-') }**")
 
     with c2:
         jd = st.file_uploader("Job Description (PDF)", type=["pdf"], key="jd_file")
         if st.button("Upload JD", use_container_width=False) and jd:
-            r = safe_post(f"{API}/upload/jd", files={"file": jd.getvalue()})
+            r = safe_post(
+                f"{API}/upload/jd",
+                files={"file": jd.getvalue()},
+                params={"session_id": st.session_state["session_id"]} if st.session_state["session_id"] else None,
+            )
 
             if r.status_code != 200:
                 st.error(f"Upload failed ({r.status_code})")
                 st.text(r.text)
             else:
-                resp = r.json() if r.text else {}
+                resp = wait_for_ingest(r.json() if r.text else {})
+                if resp.get("status") == "failed":
+                    st.error(f"Processing failed: {resp.get('error')}")
+                    st.stop()
                 st.session_state["jd_uploaded"] = True
+                st.session_state["session_id"] = resp.get("session_id") or st.session_state["session_id"]
                 st.success("✅ Job Description uploaded successfully!")
                 st.caption(f"File: **{jd.name}**  |  Pages: **{resp.get('pages', '-') }**")
 
@@ -130,7 +176,7 @@ elif selected == "Interview":
                 st.warning("Please enter a role (ex: Machine Learning Intern).")
                 st.stop()
 
-            payload = {"role": role, "company": company, "num_questions": 8}
+            payload = {"role": role, "company": company, "num_questions": 8, "session_id": st.session_state["session_id"]}
             r = safe_post(f"{API}/interview/generate", json=payload)
 
             if r.status_code != 200:
@@ -171,53 +217,47 @@ elif selected == "Interview":
     st.subheader("Overall Evaluation")
 
     if st.button("Score Overall", type="primary", use_container_width=False):
-        results = []
-
+        answered = []
         for idx, q in enumerate(questions):
             q_text = (q.get("question") or "").strip()
             ans = (st.session_state["answers"].get(idx) or "").strip()
-            if not ans:
-                continue
-
-            payload = {"role": role, "company": company, "question": q_text, "answer": ans}
-            r = safe_post(f"{API}/evaluation/score", json=payload)
-
-            if r.status_code != 200:
-                st.error(f"Scoring failed for Q{idx+1} ({r.status_code})")
-                st.text(r.text)
-                st.stop()
-
-            out = r.json() if r.text else {}
-            results.append(
-                {
-                    "q_no": idx + 1,
-                    "question": q_text,
-                    "total_score": out.get("total_score", 0),
-                    "breakdown": out.get("breakdown", {}),
-                }
-            )
+            if q_text and ans:
+                answered.append((idx, q_text, ans))
 
-        if not results:
+        if not answered:
             st.warning("Please answer at least one question before scoring.")
             st.stop()
 
-        total_sum = sum(r["total_score"] for r in results)
-        avg_score = round(total_sum / len(results), 2)
+        # One request for the whole interview; the backend scores answers concurrently
+        payload = {
+            "role": role,
+            "company": company,
+            "session_id": st.session_state["session_id"],
+            "items": [{"question": q_text, "answer": ans} for _, q_text, ans in answered],
+        }
+        r = safe_post(f"{API}/evaluation/score_batch", json=payload)
 
-        keys = ["relevance", "clarity", "technical_correctness", "structure", "impact"]
-        cat_totals = {k: 0 for k in keys}
-        for r in results:
-            bd = r.get("breakdown") or {}
-            for k in keys:
-                cat_totals[k] += int(bd.get(k, 0))
+        if r.status_code != 200:
+            st.error(f"Scoring failed ({r.status_code})")
+            st.text(r.text)
+            st.stop()
 
-        cat_avgs = {k: round(cat_totals[k] / len(results), 2) for k in keys}
+        out = r.json() if r.text else {}
+        results = [
+            {
+                "q_no": idx + 1,
+                "question": q_text,
+                "total_score": item.get("total_score", 0),
+                "breakdown": item.get("breakdown", {}),
+            }
+            for (idx, q_text, _), item in zip(answered, out.get("results", []))
+        ]
 
         st.session_state["overall_result"] = {
-            "answered": len(results),
-            "total_sum": total_sum,
-            "avg_score": avg_score,
-            "cat_avgs": cat_avgs,
+            "answered": out.get("answered", len(results)),
+            "total_sum": out.get("total_sum", 0),
+            "avg_score": out.get("avg_score", 0),
+            "cat_avgs": out.get("cat_avgs", {}),
             "results": results,
         }
 
@@ -306,4 +346,8 @@ elif selected == "Dashboard":
         }
         for h in history
     ]
-    st.dataframe(table_data, use_container_width=False, hide_index=True)
\ No newline at end of file
+    st.dataframe(table_data, use_container_width=False, hide_index=True)
+
+    if isinstance(history_data, dict) and history_data.get("next_cursor"):
+        st.caption("Showing the 20 most recent attempts.")
+    st.link_button("⬇️ Export all attempts (CSV)", f"{API}/analytics/export?format=csv")
\ No newline at end of file